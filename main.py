@@ -19,6 +19,7 @@ import socket
 import secrets
 import copy
 import asyncio
+import concurrent.futures
 import aiohttp
 import urllib3
 import time
@@ -87,7 +88,26 @@ from modules.tip_ad_manager import (
     get_tip_ad_by_id
 )
 from modules.maimai_manager import *
+from modules.sega_session_manager import get_sega_loop, get_sega_job_stats, run_sega_coroutine, submit_sega_coroutine, sega_session
+from modules.login_cache_manager import store_login_cookies, invalidate_login_cookies, cleanup_login_cache
+from modules.friend_cache_manager import get_cached_friend, store_friend_data, begin_friend_refresh, end_friend_refresh, cleanup_friend_cache, get_friend_cache_stats
+from modules.update_fingerprint import load_fingerprints, play_signature, page_fingerprints, fingerprint, build_fingerprints
+from modules.bulk_update_manager import start_bulk_update, cancel_bulk_update, get_bulk_update_status
 from modules.dxdata_manager import update_dxdata_with_comparison
+from modules.song_catalog import get_song_catalog
+from modules.record_filter import compile_filter
+from modules.record_ranking import RecordRanking, top_by_ra
+from modules.summary_manager import (
+    cache_ranking,
+    get_cached_ranking,
+    get_user_summary,
+    refresh_user_summary,
+    select_ranking_records,
+    select_summary_records,
+    summary_generation,
+    RANKING_TYPES,
+    SUMMARY_TYPES
+)
 from modules.record_manager import *
 from modules.devtoken_manager import (
     verify_dev_token,
@@ -116,12 +136,15 @@ from modules.backup_manager import create_backup
 from modules.message_manager import *
 
 # Image processing
+from modules.image_cache import preload_icon_atlas, get_icon_atlas_stats, get_cover_cache_stats
+from modules.tile_cache import cleanup_tile_disk, get_tile_cache_stats
+from modules.render_pool import start_render_pool, get_render_pool_stats
 from modules.image_uploader import smart_upload
 from modules.image_manager import *
 
 # System utilities
 from modules.system_checker import run_system_check, clean_unbound_users
-from modules.rate_limiter import check_rate_limit
+from modules.rate_limiter import check_rate_limit, sega_limiter
 from modules.line_messenger import smart_reply, smart_push, notify_admins_error
 from modules.song_matcher import find_matching_songs, is_exact_song_match, normalize_text
 from modules.memory_manager import memory_manager, cleanup_user_caches, cleanup_rate_limiter_tracking
@@ -766,7 +789,17 @@ Token not provided. <br />
             }
             return render_template("error.html", message=missing_fields_messages.get(user_language, missing_fields_messages["ja"]), language=user_language), 400
 
-        result = asyncio.run(process_sega_credentials(user_id, segaid, password, user_version, user_language))
+        try:
+            result = run_sega_coroutine(process_sega_credentials(user_id, segaid, password, user_version, user_language), TASK_TIMEOUT_SECONDS)
+        except concurrent.futures.TimeoutError:
+            logger.warning(f"[Auth] ⚠ Bind timed out: user_id={user_id}, timeout={TASK_TIMEOUT_SECONDS}s")
+            timeout_messages = {
+                "ja": "公式サイトからの応答がありません。しばらくしてからもう一度お試しください。",
+                "en": "The official website is not responding. Please try again later.",
+                "zh": "官方网站没有响应。请稍后再试。"
+            }
+            return render_template("error.html", message=timeout_messages.get(user_language, timeout_messages["ja"]), language=user_language), 504
+
         if result == "MAINTENANCE":
             maintenance_messages = {
                 "ja": "公式サイトがメンテナンス中です。しばらくしてからもう一度お試しください。",
@@ -804,15 +837,17 @@ async def process_sega_credentials(user_id, segaid, password, ver="jp", language
         return False
 
     # 验证登录是否成功
-    connector = aiohttp.TCPConnector(ssl=False, limit=10)
     timeout = aiohttp.ClientTimeout(total=30, connect=10)
-    async with aiohttp.ClientSession(cookies=cookies, connector=connector, timeout=timeout) as session:
+    async with sega_session(ver, cookies, timeout) as session:
         session_id = id(session)
         dom = await fetch_dom(session, f"{base}/home/", session_id, ver)
 
         if dom is None:
             return False
 
+    # 绑定后首次更新可直接复用本次登录
+    store_login_cookies(user_id, ver, segaid, cookies)
+
     user_bind_sega_id(user_id, segaid)
     user_bind_sega_pwd(user_id, password)
     user_set_version(user_id, ver)
@@ -831,6 +866,7 @@ async def process_sega_credentials(user_id, segaid, password, ver="jp", language
 def user_unbind(user_id):
     msg = unbind_msg(user_id)
     delete_user(user_id)
+    invalidate_login_cookies(user_id)
     return msg
 
 def user_bind_sega_id(user_id, sega_id):
@@ -914,109 +950,202 @@ def async_admin_maimai_update_task(event):
 
 # ==================== 主程序入口 ====================
 
-def maimai_update(user_id, ver="jp"):
-    # 记录开始时间
-    start_time = time.time()
+def load_update_fingerprints(user_id, ver="jp"):
+    """上次成功更新的页面指纹（数据库中已没有成绩时不使用）"""
+    fingerprints = load_fingerprints(USERS[user_id], ver)
+    if fingerprints and not has_best_records(user_id):
+        return {}
+    return fingerprints
 
-    messages = []
-    func_status = {
-        "User Info": True,
-        "Best Records": True,
-        "Recent Records": True,
-        "Favorite Friends": 0
-    }
-
-    if user_id not in USERS:
-        return segaid_error(user_id)
+async def fetch_update_data(user_id, ver, fingerprints):
+    """
+    登录并抓取更新所需的页面（在 SEGA 事件循环中执行）
 
-    elif 'sega_id' not in USERS[user_id] or 'sega_pwd' not in USERS[user_id]:
-        return segaid_error(user_id)
+    Returns:
+        tuple: (cookies, (user_info, maimai_records, recent_records, friends_list, signature))，
+               登录失败或维护时第二项为 None
+    """
+    cookies = await login_with_cache(user_id, USERS[user_id]['sega_id'], USERS[user_id]['sega_pwd'], ver)
+    if cookies is None or cookies == "MAINTENANCE":
+        return cookies, None
+    user_info, recent_records, friends_list = await asyncio.gather(
+        get_maimai_info(cookies, ver),
+        get_recent_records(cookies, ver),
+        get_friends_list(cookies, ver)
+    )
 
-    sega_id = USERS[user_id]['sega_id']
-    sega_pwd = USERS[user_id]['sega_pwd']
+    # 游玩次数与最近记录都未变化时，成绩页面也不会变化
+    signature = play_signature(user_info, recent_records)
+    if signature and signature == fingerprints.get("play"):
+        maimai_records = "UNCHANGED"
+    else:
+        maimai_records = await get_maimai_records(cookies, ver)
 
-    # 定义数据获取函数（在重试循环外定义一次）
-    async def fetch_all_data(cookies):
-        return await asyncio.gather(
-            get_maimai_info(cookies, ver),
-            get_maimai_records(cookies, ver),
-            get_recent_records(cookies, ver),
-            get_friends_list(cookies, ver)
-        )
+    return cookies, (user_info, maimai_records, recent_records, friends_list, signature)
 
-    user_info = maimai_records = recent_records = friends_list = None
+def is_update_maintenance(fetched):
+    user_info = fetched[0]
+    if isinstance(user_info, dict) and user_info.get("error") == "MAINTENANCE":
+        return True
+    return any(data == "MAINTENANCE" for data in fetched[:4])
 
-    cookies = asyncio.run(login_to_maimai(sega_id, sega_pwd, ver))
-    if cookies is None:
-        logger.warning(f"[User] ⚠ Login failed: user_id={user_id}")
-        return segaid_error(user_id)
-    if cookies == "MAINTENANCE":
-        return maintenance_error(user_id)
+def plan_update_writes(user_id, ver, fingerprints, fetched):
+    """
+    根据抓取结果决定需要写入的内容
 
-    # 使用异步函数并发获取所有数据
-    user_info, maimai_records, recent_records, friends_list = asyncio.run(fetch_all_data(cookies))
+    Returns:
+        tuple: (func_status, writes)
+               writes 中各项为 None 时不写入；last_update 为 None 表示本次更新不完整
+    """
+    user_info, maimai_records, recent_records, friends_list, signature = fetched
 
-    if (user_info == "MAINTENANCE" or
-        maimai_records == "MAINTENANCE" or
-        recent_records == "MAINTENANCE" or
-        friends_list == "MAINTENANCE"):
-        return maintenance_error(user_id)
+    func_status = {
+        "User Info": True,
+        "Best Records": True,
+        "Recent Records": True,
+        "Favorite Friends": 0
+    }
+    writes = dict.fromkeys(("personal_info", "best", "recent", "mai_friends", "update_fingerprints", "last_update"))
 
     if not user_info or not maimai_records or not recent_records:
         logger.warning(f"[User] ⚠ Data fetch incomplete: user_id={user_id}, user_info={bool(user_info)}, records={bool(maimai_records)}, recent={bool(recent_records)}")
+        # 缓存的登录可能在获取途中失效，下次更新重新登录
+        invalidate_login_cookies(user_id, ver)
 
     error = False
 
     if user_info and user_info['rating'] != "ERROR":
-        edit_user_value(user_id, "personal_info", user_info)
+        writes["personal_info"] = user_info
     else:
         func_status["User Info"] = False
         error = True
 
-    if maimai_records:
-        write_record(user_id, maimai_records)
+    record_fingerprints = fingerprints.get("records")
+    if maimai_records == "UNCHANGED":
+        logger.info(f"[User] → No new plays, record pages skipped: user_id={user_id}")
+    elif maimai_records:
+        new_fingerprints = page_fingerprints(maimai_records)
+        if new_fingerprints == record_fingerprints:
+            logger.info(f"[User] → Record pages unchanged, write skipped: user_id={user_id}")
+        else:
+            writes["best"] = maimai_records
+        record_fingerprints = new_fingerprints
     else:
         func_status["Best Records"] = False
         error = True
 
+    recent_fingerprint = None
     if recent_records:
-        write_record(user_id, recent_records, recent=True)
+        recent_fingerprint = fingerprint(recent_records)
+        if recent_fingerprint != fingerprints.get("recent"):
+            writes["recent"] = recent_records
     else:
         func_status["Recent Records"] = False
         error = True
 
     if friends_list:
-        edit_user_value(user_id, "mai_friends", friends_list)
+        if friends_list != USERS[user_id].get("mai_friends"):
+            writes["mai_friends"] = friends_list
         func_status["Favorite Friends"] = len(friends_list)
 
+    # 只在完整成功的更新后保存指纹和更新时间
+    if not error:
+        writes["update_fingerprints"] = build_fingerprints(ver, signature, recent_fingerprint, record_fingerprints)
+        writes["last_update"] = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+
+    return func_status, writes
+
+def refresh_summary_after_write(user_id):
+    """Best 成绩写入后重新生成成绩摘要"""
+    generation = summary_generation(user_id)
+    try:
+        song_record = read_record(user_id)
+    except Exception as e:
+        # 摘要已失效，下次读取时重新生成
+        logger.warning(f"[Summary] ⚠ Refresh after write failed: user_id={user_id}, error={e}")
+        return
+    refresh_user_summary(user_id, song_record, USERS[user_id].get('version', "jp"), generation)
+
+def apply_update_writes(user_id, ver, writes):
+    """
+    执行单个用户的更新写入
+
+    Returns:
+        dict or None: Best 成绩变化统计，未写入 Best 成绩时为 None
+    """
+    if writes["personal_info"] is not None:
+        edit_user_value(user_id, "personal_info", writes["personal_info"])
+
+    record_changes = None
+    if writes["best"] is not None:
+        record_changes = write_record(user_id, writes["best"])
+        if best_rows_changed(record_changes):
+            # Best 成绩有变化时立即重新生成成绩摘要，供 b50 / API 等读取路径直接使用
+            refresh_summary_after_write(user_id)
+
+    if writes["recent"] is not None:
+        write_record(user_id, writes["recent"], recent=True)
+
+    for key in ("mai_friends", "update_fingerprints", "last_update"):
+        if writes[key] is not None:
+            edit_user_value(user_id, key, writes[key])
+
+    return record_changes
+
+def maimai_update(user_id, ver="jp"):
+    # 记录开始时间
+    start_time = time.time()
+
+    messages = []
+
+    if user_id not in USERS:
+        return segaid_error(user_id)
+
+    elif 'sega_id' not in USERS[user_id] or 'sega_pwd' not in USERS[user_id]:
+        return segaid_error(user_id)
+
+    fingerprints = load_update_fingerprints(user_id, ver)
+
+    # 登录与数据获取作为一个任务提交到 SEGA 事件循环
+    try:
+        cookies, fetched = run_sega_coroutine(fetch_update_data(user_id, ver, fingerprints), TASK_TIMEOUT_SECONDS)
+    except concurrent.futures.TimeoutError:
+        # SEGA 响应慢或任务排队过久（任务已取消），不是维护
+        logger.warning(f"[User] ⚠ Update timed out: user_id={user_id}, timeout={TASK_TIMEOUT_SECONDS}s")
+        return timeout_error(user_id)
+    if cookies is None:
+        logger.warning(f"[User] ⚠ Login failed: user_id={user_id}")
+        return segaid_error(user_id)
+    if cookies == "MAINTENANCE":
+        return maintenance_error(user_id)
+
+    if is_update_maintenance(fetched):
+        return maintenance_error(user_id)
+
+    func_status, writes = plan_update_writes(user_id, ver, fingerprints, fetched)
+    record_changes = apply_update_writes(user_id, ver, writes)
+
     # 计算耗时
     elapsed_time = time.time() - start_time
 
-    if not error:
-        # 记录更新时间
-        current_time = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-        edit_user_value(user_id, "last_update", current_time)
-
-        # 获取用户信息
-        user_data = USERS[user_id]
-        username = user_data.get('personal_info', {}).get('name', 'N/A')
-        rating = user_data.get('personal_info', {}).get('rating', 'N/A')
+    # 获取用户信息
+    user_data = USERS[user_id]
+    username = user_data.get('personal_info', {}).get('name', 'N/A')
+    rating = user_data.get('personal_info', {}).get('rating', 'N/A')
 
+    if writes["last_update"] is not None:
         # 使用 flex message 显示更新结果
         messages.append(generate_update_result_flex(
             user_id=user_id,
             username=username,
             rating=rating,
-            update_time=current_time,
+            update_time=writes["last_update"],
             elapsed_time=elapsed_time,
             func_status=func_status,
-            success=True
+            success=True,
+            record_changes=record_changes
         ))
     else:
-        # 获取用户信息
-        user_data = USERS[user_id]
-        username = user_data.get('personal_info', {}).get('name', 'N/A')
-        rating = user_data.get('personal_info', {}).get('rating', 'N/A')
         current_time = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
 
         # 使用 flex message 显示错误结果
@@ -1035,6 +1164,65 @@ def maimai_update(user_id, ver="jp"):
 
     return messages
 
+# ==================== 批量更新 ====================
+
+async def bulk_fetch_update(user_id, ver):
+    """批量更新的抓取回调，返回 (状态, writes)"""
+    user = USERS.get(user_id)
+    if not user or 'sega_id' not in user or 'sega_pwd' not in user:
+        return "failed", "not bound"
+
+    fingerprints = await asyncio.to_thread(load_update_fingerprints, user_id, ver)
+    cookies, fetched = await fetch_update_data(user_id, ver, fingerprints)
+    if cookies is None:
+        return "failed", "login failed"
+    if cookies == "MAINTENANCE" or is_update_maintenance(fetched):
+        return "maintenance", None
+
+    _, writes = plan_update_writes(user_id, ver, fingerprints, fetched)
+    return ("ok" if writes["last_update"] is not None else "retry"), writes
+
+def bulk_write_updates(items):
+    """
+    批量更新的写入回调：成绩合并为一个事务写入，用户数据只保存一次
+
+    Returns:
+        dict: {user_id: 错误信息}
+    """
+    results, failed = write_records_batch([
+        (user_id, writes["best"], writes["recent"]) for user_id, _, writes in items
+    ])
+
+    for user_id, changes in results.items():
+        if best_rows_changed(changes):
+            refresh_summary_after_write(user_id)
+
+    for user_id, _, writes in items:
+        user = USERS.get(user_id)
+        if user is None or user_id in failed:
+            continue
+        for key in ("personal_info", "mai_friends", "update_fingerprints", "last_update"):
+            if writes[key] is not None:
+                user[key] = writes[key]
+
+    mark_user_dirty()
+    write_user()
+    return failed
+
+def start_admin_bulk_update(user_ids):
+    """按上次更新时间从旧到新（未更新过的最先）开始批量更新"""
+    user_ids = [
+        user_id for user_id in user_ids
+        if user_id in USERS and 'sega_id' in USERS[user_id] and 'sega_pwd' in USERS[user_id]
+    ]
+    user_ids.sort(key=lambda user_id: USERS[user_id].get("last_update") or "")
+    return start_bulk_update(
+        user_ids,
+        bulk_fetch_update,
+        bulk_write_updates,
+        lambda user_id: "intl" if USERS.get(user_id, {}).get("version") == "intl" else "jp"
+    )
+
 def handle_rc_command(msg: str, user_id: str):
     """
     处理 RC 命令，验证输入并生成 Rating 对照表
@@ -1095,20 +1283,13 @@ def get_rc(level: float, user_id=None):
     Returns:
         FlexMessage: Rating对照表
     """
-    rc_data = []
-    last_ra = 0
-
-    for score in np.arange(97, 100.5001, 0.0001):
-        ra = get_single_ra(level, score)
-        if ra != last_ra:
-            rc_data.append((score, ra))
-            last_ra = ra
+    # 边界由系数表直接求解，并按定数缓存
+    rc_data = list(get_ra_boundaries(level))
 
     return generate_rc_flex(level, rc_data, user_id)
 
 def random_song(user_id, key="", ver="jp"):
-    read_dxdata(ver)
-    length = len(SONGS)
+    songs = get_song_catalog(ver).songs
     is_exit = False
     valid_songs = []
     result = []
@@ -1118,7 +1299,7 @@ def random_song(user_id, key="", ver="jp"):
         if not level_values:
             return song_error(user_id)
 
-    for song in SONGS:
+    for song in songs:
         for sheet in song['sheets']:
             if sheet['regions']['jp']:
                 if not key or sheet['internalLevelValue'] in level_values:
@@ -1148,10 +1329,10 @@ def search_song(user_id, acronym, ver="jp"):
     Returns:
         搜索结果消息列表 或搜索结果flex message 或错误消息
     """
-    read_dxdata(ver)
+    songs = get_song_catalog(ver).songs
 
     # 使用优化的歌曲匹配函数
-    matching_songs = find_matching_songs(acronym, SONGS, max_results=MAX_SEARCH_RESULTS, threshold=0.85)
+    matching_songs = find_matching_songs(acronym, songs, max_results=MAX_SEARCH_RESULTS, threshold=0.85)
 
     # 没有匹配结果
     if not matching_songs:
@@ -1184,14 +1365,7 @@ def search_song_by_id(user_id, song_id, ver="jp"):
     Returns:
         歌曲信息图片消息 或错误消息
     """
-    read_dxdata(ver)
-
-    # 在SONGS中查找匹配的歌曲
-    matching_song = None
-    for song in SONGS:
-        if song.get('id') == song_id:
-            matching_song = song
-            break
+    matching_song = get_song_catalog(ver).get_song_by_id(song_id)
 
     # 没有匹配结果
     if not matching_song:
@@ -1214,14 +1388,7 @@ def calc_by_id(user_id, song_id, ver="jp"):
     Returns:
         歌曲信息图片消息和calc结果列表 或错误消息
     """
-    read_dxdata(ver)
-
-    # 在SONGS中查找匹配的歌曲
-    matching_song = None
-    for song in SONGS:
-        if song.get('id') == song_id:
-            matching_song = song
-            break
+    matching_song = get_song_catalog(ver).get_song_by_id(song_id)
 
     # 没有匹配结果
     if not matching_song:
@@ -1342,7 +1509,7 @@ def get_song_record(user_id, id_use, acronym, ver="jp"):
     if "personal_info" not in USERS[id_use]:
         return mention_error(user_id) if id_use != user_id else info_error(user_id)
     
-    read_dxdata(ver)
+    songs = get_song_catalog(ver).songs
 
     song_record = read_record(id_use)
 
@@ -1350,7 +1517,7 @@ def get_song_record(user_id, id_use, acronym, ver="jp"):
         return record_error(user_id)
 
     # 使用优化的歌曲匹配函数
-    matching_songs = find_matching_songs(acronym, SONGS, max_results=MAX_SEARCH_RESULTS, threshold=0.85)
+    matching_songs = find_matching_songs(acronym, songs, max_results=MAX_SEARCH_RESULTS, threshold=0.85)
 
     if not matching_songs:
         return song_error(user_id)
@@ -1409,19 +1576,14 @@ def get_song_record_by_id(user_id, id_use, song_id, ver="jp"):
     if "personal_info" not in USERS[id_use]:
         return mention_error(user_id) if id_use != user_id else info_error(user_id)
 
-    read_dxdata(ver)
+    catalog = get_song_catalog(ver)
 
     song_record = read_record(id_use)
 
     if not len(song_record):
         return record_error(user_id)
 
-    # 在SONGS中查找匹配的歌曲
-    matching_song = None
-    for song in SONGS:
-        if song.get('id') == song_id:
-            matching_song = song
-            break
+    matching_song = catalog.get_song_by_id(song_id)
 
     # 没有匹配结果
     if not matching_song:
@@ -1453,7 +1615,7 @@ def generate_plate_rcd(user_id, id_use, title, ver="jp"):
     if not (len(title) == 2 or len(title) == 3):
         return plate_error(user_id)
 
-    read_dxdata(ver)
+    catalog = get_song_catalog(ver)
 
     song_record = read_record(id_use)
 
@@ -1470,7 +1632,7 @@ def generate_plate_rcd(user_id, id_use, title, ver="jp"):
     if version_name in TEMP_VERSION["abbr"]:
         target_version.append(TEMP_VERSION["title"])
 
-    for version in VERSIONS:
+    for version in catalog.versions:
         if version_name in version['abbr']:
             target_version.append(version['version'])
 
@@ -1526,7 +1688,7 @@ def generate_plate_rcd(user_id, id_use, title, ver="jp"):
         key2 = (normalized_name, difficulty, type)
         rcd_map[key2] = rcd
 
-    for song in SONGS:
+    for song in catalog.songs:
         if song['version'] not in target_version or song['type'] == 'utage':
             continue
 
@@ -1647,7 +1809,7 @@ def generate_level_rank_progress(user_id, id_use, level, rank, ver="jp", page=1)
         return song_error(user_id)
 
     target_type, target_icons = rank_mapping[rank]
-    read_dxdata(ver)
+    songs = get_song_catalog(ver).songs
     song_record = read_record(id_use)
 
     if not len(song_record):
@@ -1657,7 +1819,7 @@ def generate_level_rank_progress(user_id, id_use, level, rank, ver="jp", page=1)
 
     # 先统计该等级在 dxdata 中的总歌曲数
     total_songs_in_dxdata = 0
-    for song in SONGS:
+    for song in songs:
         if song['type'] == 'utage':
             continue
 
@@ -1694,8 +1856,8 @@ def generate_level_rank_progress(user_id, id_use, level, rank, ver="jp", page=1)
         return record_error(user_id)
 
     # 按达成率排序
-    achieved_songs.sort(key=lambda r: float(r['score'][:-1]), reverse=True)
-    unachieved_songs.sort(key=lambda r: float(r['score'][:-1]), reverse=True)
+    achieved_songs.sort(key=lambda r: r['achievement'], reverse=True)
+    unachieved_songs.sort(key=lambda r: r['achievement'], reverse=True)
 
     # 分页处理
     page_size_up = 35
@@ -1771,13 +1933,13 @@ def generate_internallevel_songs(user_id, level, ver="jp"):
         logger.info(f"[LevelList] → Generating level list: user_id={user_id}, level={level}, server={ver.upper()}")
 
         # 读取数据
-        read_dxdata(ver)
+        songs = get_song_catalog(ver).songs
 
         # 收集符合条件的歌曲信息
         song_data_list = []
         region_key = ver
 
-        for song in SONGS:
+        for song in songs:
             if song['type'] == 'utage':
                 continue
 
@@ -1914,8 +2076,7 @@ def generate_profile(user_info, scale=1.7):
     paste_image("cource_rank_url", (322, 54), (69, 28))
     paste_image("trophy_url", (129, 92), (266, 21))
 
-    trophy_content = truncate_text(draw, user_info['trophy_content'], font_small, 253)
-    bbox = draw.textbbox((0, 0), trophy_content, font=font_small)
+    trophy_content, bbox = text_layout(draw, user_info['trophy_content'], font_small, 253)
     text_width = bbox[2] - bbox[0]
     rect_width = 266
     center_x = 129 + (rect_width - text_width) // 2
@@ -1924,104 +2085,55 @@ def generate_profile(user_info, scale=1.7):
     info_img = info_img.resize((int(img_width * scale), int(img_height * scale)), Image.Resampling.LANCZOS)
     return info_img
 
-def select_records(song_record, type="best50", command="", ver="jp"):
-    if not command == "":
-        cmds = re.findall(r"-(\w+)\s+([^ -][^-]*)", command)
-        for cmd, cmd_num in cmds:
-            if cmd == "lv":
-                parts = cmd_num.split()
-                if len(parts) == 1:
-                    lv_start = float(parts[0])
-                    song_record = list(filter(lambda x: x['internalLevelValue'] >= lv_start, song_record))
-                else:
-                    lv_start, lv_stop = map(float, parts[:2])
-                    song_record = list(filter(lambda x: lv_start <= x['internalLevelValue'] <= lv_stop, song_record))
-            elif cmd == "ra":
-                parts = cmd_num.split()
-                if len(parts) == 1:
-                    ra_start = int(parts[0])
-                    song_record = list(filter(lambda x: x['ra'] >= ra_start, song_record))
-                else:
-                    ra_start, ra_stop = map(int, parts[:2])
-                    song_record = list(filter(lambda x: ra_start <= x['ra'] <= ra_stop, song_record))
-            elif cmd == "dx":
-                parts = cmd_num.split()
-                if len(parts) == 1:
-                    dx_score = int(re.sub(r"\D", "", parts[0]))
-                    song_record = list(filter(lambda x: eval(x['dx_score'].replace(",", "")) * 100 >= dx_score, song_record))
-                else:
-                    dx_start = int(re.sub(r"\D", "", parts[0]))
-                    dx_stop = int(re.sub(r"\D", "", parts[1]))
-                    song_record = list(filter(lambda x: dx_start <= eval(x['dx_score'].replace(",", "")) * 100 <= dx_stop, song_record))
-            elif cmd == "scr":
-                parts = cmd_num.split()
-                if len(parts) == 1:
-                    score = float(re.sub(r"[^0-9.]", "", parts[0]))
-                    song_record = list(filter(lambda x: eval(x['score'].replace("%", "")) >= score, song_record))
-                else:
-                    scr_start = float(re.sub(r"[^0-9.]", "", parts[0]))
-                    scr_stop = float(re.sub(r"[^0-9.]", "", parts[1]))
-                    song_record = list(filter(lambda x: scr_start <= eval(x['score'].replace("%", "")) <= scr_stop, song_record))
-            elif cmd == "ver":
-                # 处理版本筛选：-ver [version1] [version2] ...
-                raw_versions = cmd_num.split()
-                versions = []
-                for v in raw_versions:
-                    if v.strip():
-                        # 将 + 替换为 " PLUS"
-                        processed = v.strip().replace("+", " PLUS").lower().replace("dx", "maimaiでらっくす").replace("deluxe", "maimaiでらっくす")
-                        versions.append(processed)
-                # 筛选歌曲版本在指定列表中的记录（忽略大小写）
-                song_record = list(filter(lambda x: (x.get('version') or '').lower() in versions, song_record))
-
-    up_songs = down_songs = []
-
-    up_songs_data = list(filter(lambda x: x['new_song'] == False, song_record))
-    down_songs_data = list(filter(lambda x: x['new_song'] == True, song_record))
-
-    if type == "best50":
-        up_songs = sorted(up_songs_data, key=lambda x: -x["ra"])[:35]
-        down_songs = sorted(down_songs_data, key=lambda x: -x["ra"])[:15]
-
-    elif type == "best40":
-        up_songs = sorted(up_songs_data, key=lambda x: -x["ra"])[:25]
-        down_songs = sorted(down_songs_data, key=lambda x: -x["ra"])[:15]
-
-    elif type == "best100":
-        up_songs = sorted(up_songs_data, key=lambda x: -x["ra"])[:70]
-        down_songs = sorted(down_songs_data, key=lambda x: -x["ra"])[:30]
+def load_summary_records(user_id, type="best50", command=""):
+    """
+    从成绩摘要或缓存的成绩排行中读取 best / allb / apb50 等表格
 
-    elif type == "best35":
-        up_songs = sorted(up_songs_data, key=lambda x: -x["ra"])[:35]
+    只处理无筛选命令的表格类型；摘要和排行都缺失时读取一次成绩，
+    生成的 RecordRanking 按用户缓存，同时用于重新生成摘要。
+    返回 None 表示该请求需要走完整的 read_record + select_records 路径
 
-    elif type == "best15":
-        down_songs = sorted(down_songs_data, key=lambda x: -x["ra"])[:15]
+    Returns:
+        tuple: (up_songs, down_songs) 或 None
+    """
+    if command or (type not in SUMMARY_TYPES and type not in RANKING_TYPES):
+        return None
 
-    elif type == "allb50":
-        up_songs = sorted(song_record, key=lambda x: -x["ra"])[:50]
+    ver = USERS[user_id].get('version', "jp")
+    if type in SUMMARY_TYPES:
+        summary = get_user_summary(user_id, ver)
+        if summary is not None:
+            return select_summary_records(summary, type)
 
-    elif type == "allb100":
-        up_songs = sorted(song_record, key=lambda x: -x["ra"])[:100]
+    recent_type = (type == "best40")
+    generation = summary_generation(user_id)
+    ranking = get_cached_ranking(user_id, ver, recent_type)
+    if ranking is None:
+        song_record = read_record(user_id, recent_type=recent_type)
+        if not song_record:
+            return None
+        ranking = cache_ranking(user_id, song_record, ver, generation, recent_type)
 
-    elif type == "allb200":
-        up_songs = sorted(song_record, key=lambda x: -x["ra"])[:200]
+    if type in SUMMARY_TYPES:
+        refresh_user_summary(user_id, ranking.records, ver, generation, ranking)
 
-    elif type == "allb35":
-        up_songs = sorted(song_record, key=lambda x: -x["ra"])[:35]
+    return select_ranking_records(ranking, type)
 
-    elif type == "apb50":
-        up_songs_data = [x for x in up_songs_data if x.get("combo_icon") in ("ap", "app")]
-        up_songs = sorted(up_songs_data, key=lambda x: x.get("ra", 0), reverse=True)[:35]
+def select_records(song_record, type="best50", command="", ver="jp"):
+    if not command == "":
+        # 命令按文本编译并缓存，单次遍历完成全部筛选
+        song_record = compile_filter(command).apply(song_record)
 
-        down_songs_data = [x for x in down_songs_data if x.get("combo_icon") in ("ap", "app")]
-        down_songs = sorted(down_songs_data, key=lambda x: x.get("ra", 0), reverse=True)[:15]
+    up_songs = down_songs = []
 
-    elif type == "fdxb50":
-        up_songs_data = [x for x in up_songs_data if x.get("sync_icon") in ("fdx", "fdxp")]
-        up_songs = sorted(up_songs_data, key=lambda x: x.get("ra", 0), reverse=True)[:35]
+    # 新旧曲划分与部分排序（无筛选命令的请求通常已由 load_summary_records 的缓存提供）
+    ranking = RecordRanking(song_record)
+    up_songs_data = ranking.old_songs
+    down_songs_data = ranking.new_songs
 
-        down_songs_data = [x for x in down_songs_data if x.get("sync_icon") in ("fdx", "fdxp")]
-        down_songs = sorted(down_songs_data, key=lambda x: x.get("ra", 0), reverse=True)[:15]
+    selected = ranking.select(type)
+    if selected is not None:
+        up_songs, down_songs = selected
 
     elif type == "UNKNOWN":
         up_songs = list(filter(lambda x: x['version'] == "UNKNOWN", song_record))
@@ -2030,26 +2142,33 @@ def select_records(song_record, type="best50", command="", ver="jp"):
         up_songs = song_record
 
     elif type == "idealb50":
-        for rcd in up_songs_data:
-            ideal_score, score_icon = get_ideal_score(float(rcd['score'][:-1]))
-            rcd['score'] = f"{ideal_score:.4f}%"
-            if score_icon:
-                rcd['score_icon'] = score_icon
-            if ideal_score == 101:
-                rcd['combo_icon'] = "app"
-            rcd['ra'] = get_single_ra(rcd['internalLevelValue'], ideal_score, (ideal_score == 101 and ver == "jp"))
-
-        for rcd in down_songs_data:
-            ideal_score, score_icon = get_ideal_score(float(rcd['score'][:-1]))
-            rcd['score'] = f"{ideal_score:.4f}%"
-            if score_icon:
-                rcd['score_icon'] = score_icon
-            if ideal_score == 101:
-                rcd['combo_icon'] = "app"
-            rcd['ra'] = get_single_ra(rcd['internalLevelValue'], ideal_score, (ideal_score == 101 and ver == "jp"))
-
-        up_songs = sorted(up_songs_data, key=lambda x: -x["ra"])[:35]
-        down_songs = sorted(down_songs_data, key=lambda x: -x["ra"])[:15]
+        for songs_data in (up_songs_data, down_songs_data):
+            if not songs_data:
+                continue
+
+            ideal_scores = []
+            for rcd in songs_data:
+                ideal_score, score_icon = get_ideal_score(rcd['achievement'])
+                rcd['score'] = f"{ideal_score:.4f}%"
+                rcd['achievement'] = ideal_score
+                if score_icon:
+                    rcd['score_icon'] = score_icon
+                if ideal_score == 101:
+                    rcd['combo_icon'] = "app"
+                ideal_scores.append(ideal_score)
+
+            # 批量计算理想成绩下的 Rating
+            ideal_scores = np.array(ideal_scores)
+            ras = calc_ra_array(
+                [rcd['internalLevelValue'] for rcd in songs_data],
+                ideal_scores,
+                (ideal_scores == 101) if ver == "jp" else None
+            )
+            for rcd, ra in zip(songs_data, ras.tolist()):
+                rcd['ra'] = ra
+
+        up_songs = top_by_ra(up_songs_data, 35)
+        down_songs = top_by_ra(down_songs_data, 15)
 
     return up_songs, down_songs;
 
@@ -2062,11 +2181,16 @@ def generate_records(user_id, id_use, type="best50", command="", ver="jp"):
 
     recent = (type == "rct50")
     recent_type = (type == "best40")
-    song_record = read_record(id_use, recent, recent_type)
-    if not len(song_record):
-        return record_error(user_id)
+    selected = load_summary_records(id_use, type, command)
+    if selected is None:
+        song_record = read_record(id_use, recent, recent_type)
+        if not len(song_record):
+            return record_error(user_id)
+
+        up_songs, down_songs = select_records(song_record, type, command, ver)
+    else:
+        up_songs, down_songs = selected
 
-    up_songs, down_songs = select_records(song_record, type, command, ver)
     if not up_songs and not down_songs:
         return picture_error(user_id)
 
@@ -2090,6 +2214,43 @@ def generate_records(user_id, id_use, type="best50", command="", ver="jp"):
 
     return message
 
+async def fetch_friend_data(user_id, friend_code, ver="jp"):
+    """
+    以 user_id 的账号登录并获取好友信息与好友成绩（在 SEGA 事件循环中执行）
+
+    Returns:
+        tuple: (error, friend_info, friend_records)，登录失败或维护时 error 为 None / "MAINTENANCE"
+    """
+    cookies = await login_with_cache(user_id, USERS[user_id]['sega_id'], USERS[user_id]['sega_pwd'], ver)
+    if cookies is None or cookies == "MAINTENANCE":
+        return cookies, None, None
+    tasks = [
+        get_friend_info(cookies, friend_code, ver),
+        get_friend_records(cookies, friend_code, ver)
+    ]
+    friend_info, friend_records = await asyncio.gather(*tasks)
+    return None, friend_info, friend_records
+
+def is_friend_data_usable(friend_info, friend_records):
+    """好友数据完整（可以缓存）"""
+    if not isinstance(friend_info, dict) or not friend_info or "error" in friend_info:
+        return False
+    return isinstance(friend_records, list) and bool(friend_records)
+
+async def refresh_friend_data(user_id, friend_code, ver="jp"):
+    """后台刷新过期的好友缓存，失败时保留旧缓存"""
+    try:
+        error, friend_info, friend_records = await fetch_friend_data(user_id, friend_code, ver)
+        if error is None and is_friend_data_usable(friend_info, friend_records):
+            store_friend_data(friend_code, ver, friend_info, friend_records)
+            logger.info(f"[FriendCache] ✓ Refreshed: friend_code={friend_code}, ver={ver}")
+        else:
+            logger.warning(f"[FriendCache] ⚠ Refresh incomplete, keeping cached data: friend_code={friend_code}, ver={ver}")
+    except Exception as e:
+        logger.error(f"[FriendCache] ✗ Refresh failed: friend_code={friend_code}, ver={ver}, error={e}")
+    finally:
+        end_friend_refresh(friend_code, ver)
+
 def generate_friend_b50(user_id, friend_code, ver="jp"):
     if user_id not in USERS:
         return segaid_error(user_id)
@@ -2097,38 +2258,45 @@ def generate_friend_b50(user_id, friend_code, ver="jp"):
     elif 'sega_id' not in USERS[user_id] or 'sega_pwd' not in USERS[user_id]:
         return segaid_error(user_id)
 
-    sega_id = USERS[user_id]['sega_id']
-    sega_pwd = USERS[user_id]['sega_pwd']
-
-    # 使用异步登录和获取好友成绩
-    async def fetch_friend_data():
-        cookies = await login_to_maimai(sega_id, sega_pwd, ver)
-        if cookies is None or cookies == "MAINTENANCE":
-            return cookies, None, None
-        tasks = [
-            get_friend_info(cookies, friend_code, ver),
-            get_friend_records(cookies, friend_code, ver)
-        ]
-        friend_info, friend_records = await asyncio.gather(*tasks)
-        return None, friend_info, friend_records
+    # 同一好友码近期已获取过时直接使用缓存，过期的缓存在后台刷新
+    cached = get_cached_friend(friend_code, ver)
+    if cached is not None:
+        friend_info, friend_records, stale = cached
+        if stale and begin_friend_refresh(friend_code, ver):
+            refresh = refresh_friend_data(user_id, friend_code, ver)
+            try:
+                submit_sega_coroutine(refresh)
+            except Exception as e:
+                # 未能提交时释放刷新标记，否则该好友码在缓存过期前不会再刷新
+                refresh.close()
+                end_friend_refresh(friend_code, ver)
+                logger.error(f"[FriendCache] ✗ Failed to schedule refresh: friend_code={friend_code}, ver={ver}, error={e}")
+    else:
+        try:
+            error, friend_info, friend_records = run_sega_coroutine(fetch_friend_data(user_id, friend_code, ver), TASK_TIMEOUT_SECONDS)
+        except concurrent.futures.TimeoutError:
+            logger.warning(f"[Friend] ⚠ Friend data timed out: user_id={user_id}, friend_code={friend_code}, timeout={TASK_TIMEOUT_SECONDS}s")
+            return timeout_error(user_id)
 
-    error, friend_info, friend_records = asyncio.run(fetch_friend_data())
+        if error == "MAINTENANCE":
+            return maintenance_error(user_id)
+        if error is None and friend_records is None:
+            invalidate_login_cookies(user_id, ver)
+            return segaid_error(user_id)
 
-    if error == "MAINTENANCE":
-        return maintenance_error(user_id)
-    if error is None and friend_records is None:
-        return segaid_error(user_id)
+        # 检查 friend_info 是否包含维护错误
+        if isinstance(friend_info, dict) and friend_info.get("error") == "MAINTENANCE":
+            return maintenance_error(user_id)
 
-    # 检查 friend_info 是否包含维护错误
-    if isinstance(friend_info, dict) and friend_info.get("error") == "MAINTENANCE":
-        return maintenance_error(user_id)
+        # 检查 friend_records 是否为维护模式字符串
+        if friend_records == "MAINTENANCE":
+            return maintenance_error(user_id)
 
-    # 检查 friend_records 是否为维护模式字符串
-    if friend_records == "MAINTENANCE":
-        return maintenance_error(user_id)
+        if not friend_records:
+            return friend_rcd_error(user_id)
 
-    if not friend_records:
-        return friend_rcd_error(user_id)
+        if is_friend_data_usable(friend_info, friend_records):
+            store_friend_data(friend_code, ver, friend_info, friend_records)
 
     friend_records = get_detailed_info(friend_records, ver)
 
@@ -2219,7 +2387,7 @@ def generate_level_records(user_id, id_use, level, ver="jp", page=1):
     return message
 
 def generate_version_songs(user_id, version_title, ver="jp"):
-    read_dxdata(ver)
+    catalog = get_song_catalog(ver)
 
     target_version = []
     target_icon = []
@@ -2227,7 +2395,7 @@ def generate_version_songs(user_id, version_title, ver="jp"):
 
     version_title = version_title.lower().replace("dx", "maimaiでらっくす").replace("deluxe", "maimaiでらっくす")
 
-    for version in VERSIONS:
+    for version in catalog.versions:
         if version_title == version['version'].lower():
             target_version.append(version['version'])
 
@@ -2242,7 +2410,7 @@ def generate_version_songs(user_id, version_title, ver="jp"):
     except Exception as e:
         logger.error(f"[VersionImage] ✗ Failed to load image: file={version_img_path}, error={e}")
 
-    songs_data = list(filter(lambda x: x['version'] in target_version and x['type'] not in ['utage'], SONGS))
+    songs_data = list(filter(lambda x: x['version'] in target_version and x['type'] not in ['utage'], catalog.songs))
     version_list_img = generate_version_list(songs_data)
 
     if version_img is None:
@@ -3049,8 +3217,8 @@ def handle_sync_text_command(event):
     if user_id in ADMIN_ID:
         if user_message == "dxdata update":
             # 使用新的对比更新函数
+            # 写入新文件后会自动重建内存中的歌曲目录
             result = update_dxdata_with_comparison(DXDATA_URL, DXDATA_LIST)
-            read_dxdata()  # 重新加载到内存
 
             # 使用多语言函数构建消息
             message_text = build_dxdata_update_message(result, user_id)
@@ -3210,11 +3378,17 @@ def handle_location_message(event):
     lng = event.message.longitude
     user_id = event.source.user_id
 
-    stores = asyncio.run(get_nearby_maimai_stores(lat, lng, USERS[user_id]['version']))
+    try:
+        stores = run_sega_coroutine(get_nearby_maimai_stores(lat, lng, USERS[user_id]['version']), TASK_TIMEOUT_SECONDS)
+    except concurrent.futures.TimeoutError:
+        logger.warning(f"[Store] ⚠ Store search timed out: user_id={user_id}, timeout={TASK_TIMEOUT_SECONDS}s")
+        stores = "TIMEOUT"
 
     # 检查维护状态
     if stores == "MAINTENANCE":
         reply_message = maintenance_error(user_id)
+    elif stores == "TIMEOUT":
+        reply_message = timeout_error(user_id)
     elif not stores:
         reply_message = store_error(user_id)
     else:
@@ -3473,6 +3647,8 @@ def admin_panel():
         'image_queue_size': image_queue.qsize(),
         'web_queue_size': webtask_queue.qsize(),
         'max_queue_size': MAX_QUEUE_SIZE,
+        'sega_jobs': get_sega_job_stats(),
+        'sega_rate_limits': sega_limiter.get_stats(),
         'thread_count': thread_count,
         'total_tasks_processed': total_tasks,
         'avg_response_time': avg_response,
@@ -3601,6 +3777,61 @@ def admin_cancel_task():
         'message': f'Task {task_id} marked for cancellation'
     })
 
+@app.route("/admin/bulk_update", methods=["POST"])
+@csrf.exempt
+def admin_bulk_update():
+    """批量更新用户（scope: all / jp / intl，或指定 user_ids）"""
+    if not check_admin_auth():
+        return jsonify({'error': 'Unauthorized'}), 401
+
+    data = request.get_json() or {}
+    user_ids = data.get('user_ids')
+    scope = data.get('scope', 'all')
+
+    if not user_ids:
+        if scope not in ('all', 'jp', 'intl'):
+            return jsonify({'error': 'Invalid scope'}), 400
+        user_ids = [
+            user_id for user_id, user in USERS.items()
+            if scope == 'all' or user.get('version', 'jp') == scope
+        ]
+
+    job = start_admin_bulk_update(user_ids)
+    if job is None:
+        return jsonify({
+            'success': False,
+            'message': 'A bulk update is already running'
+        }), 409
+
+    return jsonify({
+        'success': True,
+        'message': f'Bulk update started for {len(job.user_ids)} users',
+        'status': job.snapshot()
+    })
+
+@app.route("/admin/bulk_update_status", methods=["GET"])
+def admin_bulk_update_status():
+    """获取批量更新进度"""
+    if not check_admin_auth():
+        return jsonify({'error': 'Unauthorized'}), 401
+
+    return jsonify({'success': True, 'status': get_bulk_update_status()})
+
+@app.route("/admin/bulk_update_cancel", methods=["POST"])
+@csrf.exempt
+def admin_bulk_update_cancel():
+    """取消批量更新"""
+    if not check_admin_auth():
+        return jsonify({'error': 'Unauthorized'}), 401
+
+    if not cancel_bulk_update():
+        return jsonify({
+            'success': False,
+            'message': 'No bulk update is running'
+        }), 404
+
+    return jsonify({'success': True, 'message': 'Bulk update cancellation requested'})
+
 @app.route("/admin/get_logs", methods=["GET"])
 def admin_get_logs():
     """获取最新日志"""
@@ -4398,19 +4629,20 @@ def admin_dxdata_status():
         return jsonify({'error': 'Unauthorized'}), 401
 
     try:
-        read_dxdata()
+        catalog = get_song_catalog()
+        songs = catalog.songs
         # 统计歌曲数
-        total_songs = len(SONGS)
-        std_songs = len([s for s in SONGS if s['type'] == 'std'])
-        dx_songs = len([s for s in SONGS if s['type'] == 'dx'])
-        utage_songs = len([s for s in SONGS if s['type'] == 'utage'])
+        total_songs = len(songs)
+        std_songs = len([s for s in songs if s['type'] == 'std'])
+        dx_songs = len([s for s in songs if s['type'] == 'dx'])
+        utage_songs = len([s for s in songs if s['type'] == 'utage'])
 
         # 统计谱面数（不包括宴会曲）
         total_sheets = 0
         jp_sheets = 0
         intl_sheets = 0
 
-        for song in SONGS:
+        for song in songs:
             if song['type'] == 'utage':
                 continue
             for sheet in song['sheets']:
@@ -4420,8 +4652,7 @@ def admin_dxdata_status():
                 if sheet['regions'].get('intl', False):
                     intl_sheets += 1
 
-        # 使用 VERSIONS 全局变量
-        total_versions = len(VERSIONS)
+        total_versions = len(catalog.versions)
 
         return jsonify({
             'songs': {
@@ -5119,15 +5350,19 @@ def api_get_records(user_id):
         # 读取用户记录
         recent = (record_type == "rct50")
         recent_type = (record_type == "best40")
-        song_record = read_record(user_id, recent, recent_type)
-        if not len(song_record):
-            return jsonify({
-                "error": "No records found",
-                "message": f"User {user_id} has no score records"
-            }), 404
+        selected = load_summary_records(user_id, record_type, command)
+        if selected is None:
+            song_record = read_record(user_id, recent, recent_type)
+            if not len(song_record):
+                return jsonify({
+                    "error": "No records found",
+                    "message": f"User {user_id} has no score records"
+                }), 404
 
-        # 调用 select_records 函数获取筛选后的记录
-        up_songs, down_songs = select_records(song_record, record_type, command, ver)
+            # 调用 select_records 函数获取筛选后的记录
+            up_songs, down_songs = select_records(song_record, record_type, command, ver)
+        else:
+            up_songs, down_songs = selected
 
         if not up_songs and not down_songs:
             return jsonify({
@@ -5143,8 +5378,8 @@ def api_get_records(user_id):
             "user_id": user_id,
             "type": record_type,
             "count": len(up_songs) + len(down_songs),
-            "old_songs": up_songs,
-            "new_songs": down_songs
+            "old_songs": strip_typed_fields(up_songs),
+            "new_songs": strip_typed_fields(down_songs)
         })
 
     except Exception as e:
@@ -5208,10 +5443,10 @@ def api_search_songs():
         logger.info(f"[API] Search songs: query='{query}', token_id={token_info['token_id']}, note={token_info['note']}")
 
         # 读取歌曲数据
-        read_dxdata(ver)
+        songs = get_song_catalog(ver).songs
 
         # 使用优化的歌曲匹配函数
-        matching_songs = find_matching_songs(query, SONGS, max_results=max_results, threshold=0.85)
+        matching_songs = find_matching_songs(query, songs, max_results=max_results, threshold=0.85)
 
         # 检查结果
         if not matching_songs:
@@ -5251,7 +5486,7 @@ def api_search_songs():
                     played_data.append(rcd)
 
             if played_data:
-                result.append(played_data)
+                result.append(strip_typed_fields(played_data))
                 
         if not result:
             return jsonify({
@@ -5304,11 +5539,9 @@ def api_get_versions():
         token_info = request.token_info
         logger.info(f"[API] Get versions: token_id={token_info['token_id']}, note={token_info['note']}")
 
-        read_dxdata()
-
         return jsonify({
             "success": True,
-            "versions": VERSIONS
+            "versions": list(get_song_catalog().versions)
         })
 
     except Exception as e:
@@ -5334,6 +5567,14 @@ if __name__ == "__main__":
         logger.info("[System] → Loading tip/ad data...")
         load_tip_ad_data()
 
+        # 预先构建歌曲目录快照
+        logger.info("[System] → Loading song catalog...")
+        get_song_catalog()
+
+        # 解码所有图标到内存图集
+        logger.info("[System] → Loading icon atlas...")
+        preload_icon_atlas()
+
         system_check_results = run_system_check()
 
         # 如果有关键问题，显示警告
@@ -5347,6 +5588,9 @@ if __name__ == "__main__":
         logger.info(f"[System] ⚠ System check failed: error={e}")
         logger.info("[System] → Continuing startup anyway...")
 
+    # 启动出图进程池（需在启动其他线程之前 fork）
+    start_render_pool()
+
     # 启动 worker 线程
     for i in range(MAX_CONCURRENT_IMAGE_TASKS):
         threading.Thread(target=image_worker, daemon=True, name=f"ImageWorker-{i+1}").start()
@@ -5356,7 +5600,16 @@ if __name__ == "__main__":
 
     logger.info(f"[System] ✓ Workers started: image={MAX_CONCURRENT_IMAGE_TASKS}, web={WEB_MAX_CONCURRENT_TASKS}")
 
-    # 启动内存管理器
+    # 启动 SEGA 请求事件循环（所有 SEGA I/O 共用）
+    get_sega_loop()
+
+    # 启动内存管理器（管理后台显示各缓存的统计）
+    memory_manager.register_cache("covers", get_cover_cache_stats)
+    memory_manager.register_cache("icon_atlas", get_icon_atlas_stats)
+    memory_manager.register_cache("thumbnails", get_tile_cache_stats)
+    memory_manager.register_cache("render_pool", get_render_pool_stats)
+    memory_manager.register_cache("text_layout", get_text_layout_stats)
+    memory_manager.register_cache("friend_records", get_friend_cache_stats)
     memory_manager.start()
     logger.info("[System] ✓ Memory manager started")
 
@@ -5374,7 +5627,16 @@ if __name__ == "__main__":
             cleanup_result = clean_unbound_users()
             cleaned_unbound_users = cleanup_result.get('deleted_count', 0)
 
-            logger.info(f"[System] ✓ Custom cleanup completed: nicknames={cleaned_nicknames}, rate_limits={cleaned_rate_limits}, unbound_users={cleaned_unbound_users}")
+            # 清理过期的登录 Cookie 缓存
+            cleaned_logins = cleanup_login_cache()
+
+            # 清理过期的好友成绩缓存
+            cleaned_friends = cleanup_friend_cache()
+
+            # 限制缩略图磁盘缓存的大小
+            cleaned_tiles = cleanup_tile_disk()
+
+            logger.info(f"[System] ✓ Custom cleanup completed: nicknames={cleaned_nicknames}, rate_limits={cleaned_rate_limits}, unbound_users={cleaned_unbound_users}, login_cache={cleaned_logins}, friend_cache={cleaned_friends}, tile_disk={cleaned_tiles}")
         except Exception as e:
             logger.error(f"[System] ✗ Custom cleanup error: error={e}", exc_info=True)
 
@@ -0,0 +1,287 @@
+"""
+批量更新模块
+
+管理员一次刷新大量用户时使用：按上次更新时间从旧到新排序，
+在 SEGA 事件循环中按区域限制并发抓取（每个抓取同时占用一个全局并发名额），出错时该区域整体退避后重试，
+抓取结果交给单独的写入线程，按批合并为一个数据库事务写入。
+
+抓取与写入的具体逻辑由调用方以回调形式传入：
+    fetch(user_id, ver)  协程，返回 (状态, 数据)
+                         状态: "ok" 完成 / "retry" 数据不完整，可重试 / "failed" 失败 / "maintenance" 维护中
+    write_batch(items)   同步函数，items 为 [(user_id, ver, 数据), ...]，返回 {user_id: 错误信息}
+"""
+
+import asyncio
+import contextlib
+import logging
+import queue
+import random
+import threading
+import time
+from collections import deque
+from datetime import datetime
+
+from modules.sega_session_manager import sega_job_slot, submit_sega_coroutine
+
+logger = logging.getLogger(__name__)
+
+# 各区域同时抓取的用户数
+BULK_REGION_LIMITS = {"jp": 6, "intl": 3}
+
+# 单个用户的抓取超时（秒）与最大重试次数
+BULK_USER_TIMEOUT = 90
+BULK_MAX_RETRIES = 2
+
+# 区域退避：连续失败时等待 BASE * 2^(n-1) 秒，最长 MAX 秒
+BULK_BACKOFF_BASE = 2.0
+BULK_BACKOFF_MAX = 60.0
+
+# 写入线程每批最多合并的用户数，以及凑批的最长等待时间（秒）
+BULK_WRITE_BATCH_SIZE = 20
+BULK_WRITE_FLUSH_SECONDS = 1.0
+
+# 进度中保留的最近事件数
+BULK_RECENT_EVENTS = 50
+
+_current_job = None
+_job_lock = threading.Lock()
+
+
+class BulkUpdateJob:
+    """一次批量更新的进度"""
+
+    __slots__ = (
+        "job_id", "user_ids", "status", "done", "succeeded", "failed", "skipped",
+        "started_at", "finished_at", "cancelled", "events", "_lock"
+    )
+
+    def __init__(self, user_ids):
+        self.job_id = f"bulk_{int(time.time())}"
+        self.user_ids = user_ids
+        self.status = "running"
+        self.done = 0
+        self.succeeded = 0
+        self.failed = 0
+        self.skipped = 0
+        self.started_at = time.time()
+        self.finished_at = None
+        self.cancelled = False
+        self.events = deque(maxlen=BULK_RECENT_EVENTS)
+        self._lock = threading.Lock()
+
+    def record(self, user_id, result, message=""):
+        """记录一个用户的最终结果 (succeeded / failed / skipped)"""
+        with self._lock:
+            self.done += 1
+            setattr(self, result, getattr(self, result) + 1)
+            self.events.append({
+                "user_id": user_id,
+                "result": result,
+                "message": message,
+                "time": datetime.now().strftime("%H:%M:%S"),
+            })
+
+    def snapshot(self):
+        """供管理后台显示的进度"""
+        with self._lock:
+            end = self.finished_at or time.time()
+            return {
+                "job_id": self.job_id,
+                "status": self.status,
+                "total": len(self.user_ids),
+                "done": self.done,
+                "succeeded": self.succeeded,
+                "failed": self.failed,
+                "skipped": self.skipped,
+                "elapsed_seconds": round(end - self.started_at, 1),
+                "events": list(self.events),
+            }
+
+
+class _RegionGate:
+    """区域并发限制与退避状态（只在事件循环中使用）"""
+
+    __slots__ = ("semaphore", "resume_at", "failures", "maintenance")
+
+    def __init__(self, limit):
+        self.semaphore = asyncio.Semaphore(limit)
+        self.resume_at = 0.0
+        self.failures = 0
+        self.maintenance = False
+
+    @contextlib.asynccontextmanager
+    async def slot(self):
+        async with self.semaphore:
+            delay = self.resume_at - asyncio.get_running_loop().time()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            yield
+
+    def backoff(self):
+        self.failures += 1
+        delay = min(BULK_BACKOFF_BASE * 2 ** (self.failures - 1), BULK_BACKOFF_MAX)
+        delay *= random.uniform(0.8, 1.2)
+        self.resume_at = max(self.resume_at, asyncio.get_running_loop().time() + delay)
+        return delay
+
+    def reset(self):
+        self.failures = 0
+
+
+class _BatchWriter:
+    """写入线程：合并抓取结果，按批调用 write_batch"""
+
+    def __init__(self, job, write_batch):
+        self.job = job
+        self.write_batch = write_batch
+        self.queue = queue.Queue()
+        self.thread = threading.Thread(target=self._run, daemon=True, name="BulkUpdateWriter")
+        self.thread.start()
+
+    def put(self, user_id, ver, payload, result="succeeded", message=""):
+        self.queue.put((user_id, ver, payload, result, message))
+
+    def close(self):
+        self.queue.put(None)
+        self.thread.join()
+
+    def _run(self):
+        closed = False
+        while not closed:
+            batch = []
+            deadline = None
+            while len(batch) < BULK_WRITE_BATCH_SIZE:
+                timeout = None if deadline is None else max(0.0, deadline - time.monotonic())
+                try:
+                    item = self.queue.get(timeout=timeout)
+                except queue.Empty:
+                    break
+                if item is None:
+                    closed = True
+                    break
+                batch.append(item)
+                if deadline is None:
+                    deadline = time.monotonic() + BULK_WRITE_FLUSH_SECONDS
+            if batch:
+                self._flush(batch)
+
+    def _flush(self, batch):
+        try:
+            failed = self.write_batch([(user_id, ver, payload) for user_id, ver, payload, _, _ in batch])
+        except Exception as e:
+            logger.error(f"[BulkUpdate] ✗ Batch write error: users={len(batch)}, error={e}", exc_info=True)
+            failed = {user_id: str(e) for user_id, _, _, _, _ in batch}
+
+        for user_id, _, _, result, message in batch:
+            if user_id in failed:
+                self.job.record(user_id, "failed", failed[user_id])
+            else:
+                self.job.record(user_id, result, message)
+
+
+async def _update_user(job, writer, gates, fetch, user_id, ver):
+    gate = gates[ver]
+
+    for attempt in range(BULK_MAX_RETRIES + 1):
+        async with gate.slot():
+            # 等待期间可能已被取消或进入维护
+            if job.cancelled or gate.maintenance:
+                job.record(user_id, "skipped", "cancelled" if job.cancelled else "maintenance")
+                return
+            try:
+                async with sega_job_slot():
+                    status, payload = await asyncio.wait_for(fetch(user_id, ver), BULK_USER_TIMEOUT)
+            except Exception as e:
+                status, payload = "retry", None
+                message = f"{type(e).__name__}: {e}"
+            else:
+                message = payload if status == "failed" else "incomplete data"
+
+        if status == "ok":
+            gate.reset()
+            writer.put(user_id, ver, payload)
+            return
+        if status == "maintenance":
+            gate.maintenance = True
+            logger.warning(f"[BulkUpdate] ⚠ Server maintenance, skipping region: region={ver}")
+            job.record(user_id, "skipped", "maintenance")
+            return
+        if status == "failed":
+            job.record(user_id, "failed", message)
+            return
+
+        # 数据不完整或请求出错：区域整体退避后重试
+        if attempt < BULK_MAX_RETRIES:
+            delay = gate.backoff()
+            logger.warning(f"[BulkUpdate] ⚠ Retrying: user_id={user_id}, attempt={attempt + 1}, backoff={delay:.1f}s, reason={message}")
+
+    # 重试用尽：已取得的部分数据仍然写入，结果记为失败
+    if payload is not None:
+        writer.put(user_id, ver, payload, "failed", message)
+    else:
+        job.record(user_id, "failed", message)
+
+
+async def _run_bulk_update(job, fetch, write_batch, region_of):
+    writer = _BatchWriter(job, write_batch)
+    gates = {region: _RegionGate(limit) for region, limit in BULK_REGION_LIMITS.items()}
+
+    try:
+        await asyncio.gather(*(
+            _update_user(job, writer, gates, fetch, user_id, region_of(user_id))
+            for user_id in job.user_ids
+        ))
+    finally:
+        await asyncio.to_thread(writer.close)
+        with job._lock:
+            job.status = "cancelled" if job.cancelled else "finished"
+            job.finished_at = time.time()
+
+    logger.info(
+        f"[BulkUpdate] ✓ Finished: job_id={job.job_id}, total={len(job.user_ids)}, succeeded={job.succeeded}, "
+        f"failed={job.failed}, skipped={job.skipped}, elapsed={job.finished_at - job.started_at:.1f}s"
+    )
+
+
+def start_bulk_update(user_ids, fetch, write_batch, region_of):
+    """
+    开始批量更新（同一时间只运行一个）
+
+    Args:
+        user_ids: 按处理顺序排列的用户ID列表
+        fetch: 抓取协程函数 fetch(user_id, ver) -> (状态, 数据)
+        write_batch: 批量写入函数 write_batch([(user_id, ver, 数据), ...]) -> {user_id: 错误信息}
+        region_of: 用户ID -> 区域 (jp/intl)
+
+    Returns:
+        BulkUpdateJob or None: 已有批量更新在运行时返回 None
+    """
+    global _current_job
+    with _job_lock:
+        if _current_job is not None and _current_job.status == "running":
+            return None
+        job = BulkUpdateJob(list(user_ids))
+        _current_job = job
+
+    logger.info(f"[BulkUpdate] → Started: job_id={job.job_id}, users={len(job.user_ids)}")
+    # 调度协程本身不占用全局名额，其中的每个抓取分别计入
+    submit_sega_coroutine(_run_bulk_update(job, fetch, write_batch, region_of), limited=False)
+    return job
+
+
+def cancel_bulk_update():
+    """取消正在运行的批量更新（已开始抓取的用户会完成）"""
+    with _job_lock:
+        job = _current_job
+    if job is None or job.status != "running":
+        return False
+    job.cancelled = True
+    logger.info(f"[BulkUpdate] → Cancel requested: job_id={job.job_id}")
+    return True
+
+
+def get_bulk_update_status():
+    """当前或最近一次批量更新的进度，没有时返回 None"""
+    with _job_lock:
+        job = _current_job
+    return job.snapshot() if job is not None else None
@@ -8,7 +8,6 @@ import copy
 import json
 import os
 import secrets
-import csv
 
 from cryptography.fernet import Fernet
 from modules.json_encrypt import *
@@ -74,6 +73,12 @@ default_config = {
         "user_data": "",
         "bind_token": "",
         "imgur_client_id": ""
+    },
+    "cache": {
+        "cover_cache_mb": 64,
+        "tile_cache_mb": 64,
+        "tile_disk_dir": "",
+        "tile_disk_mb": 256
     }
 }
 
@@ -159,6 +164,13 @@ ICON_COMBO_DIR = FILE_PATH["icon_combo"]
 ICON_SYNC_DIR = FILE_PATH["icon_sync"]
 ICON_BASE_DIR = FILE_PATH["icon_base"]
 
+# 缓存配置字段
+CACHE_CONFIG = _config["cache"]
+COVER_CACHE_MAX_BYTES = int(CACHE_CONFIG["cover_cache_mb"] * 1024 * 1024)
+TILE_CACHE_MAX_BYTES = int(CACHE_CONFIG["tile_cache_mb"] * 1024 * 1024)
+TILE_DISK_DIR = CACHE_CONFIG["tile_disk_dir"]  # 为空时不写入磁盘
+TILE_DISK_MAX_BYTES = int(CACHE_CONFIG["tile_disk_mb"] * 1024 * 1024)
+
 # 数据库配置字段
 RECORD_DATABASE = _config["record_database"]
 DB_HOST = RECORD_DATABASE["host"]
@@ -185,57 +197,11 @@ BIND_TOKEN_KEY = KEYS["bind_token"].encode()
 IMGUR_CLIENT_ID = KEYS.get("imgur_client_id", "")
 
 # 全局缓存数据
-SONGS = []
-VERSIONS = []
 USERS = {}
 
 # 用户数据脏标记（用于延迟写入）
 _user_data_dirty = False
 
-def read_dxdata(ver="jp"):
-    global SONGS, VERSIONS
-    dxdata_file = json.load(open(DXDATA_LIST, 'r', encoding='utf-8'))
-    SONGS.clear()
-
-    def is_int(s):
-        return s.isdigit()
-
-    if ver == "intl":
-        csv_map = {}
-        with open(OVERRIDE_LIST, 'r', encoding='utf-8') as f:
-            for row in csv.reader(f):
-                if row:
-                    csv_map[row[0]] = row[1:]
-
-        for song in dxdata_file['songs']:
-            if song['title'] not in csv_map:
-                continue
-            if song['type'] != csv_map[song['title']][0]:
-                continue
-            row = csv_map[song['title']][1:]
-            *keys, value = row
-            cur = song
-            for k in keys[:-1]:
-                if is_int(k):
-                    k = int(k)
-                    while len(cur) <= k:
-                        cur.append({})
-                    cur = cur[k]
-                else:
-                    cur = cur.setdefault(k, {})
-            last = keys[-1]
-            if is_int(last):
-                last = int(last)
-                while len(cur) <= last:
-                    cur.append(None)
-                cur[last] = value
-            else:
-                cur[last] = value
-
-    SONGS.extend(dxdata_file['songs'])
-    VERSIONS.clear()
-    VERSIONS.extend(dxdata_file['versions'])
-
 def load_user():
     global USERS, _user_data_dirty
     if not USERS:  # 只在未加载时读取
@@ -5,6 +5,7 @@ import copy
 import hashlib
 from datetime import datetime
 from modules.config_loader import MAIMAI_VERSION, DXDATA_VERSION_FILE
+from modules.song_catalog import reload_song_catalog
 
 def merge_json(source, target):
     """递归合并两个 JSON 结构（dict / list / 基础类型）"""
@@ -313,6 +314,9 @@ def update_dxdata_with_comparison(urls, save_to: str = None):
         with open(save_to, "w", encoding="utf-8") as file:
             json.dump(filtered_data, file, ensure_ascii=False, indent=2)
 
+        # 新文件写入后重建内存中的歌曲目录快照
+        reload_song_catalog()
+
     # 获取新数据统计
     new_stats = get_dxdata_stats(new_data)
 
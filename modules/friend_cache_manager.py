@@ -0,0 +1,141 @@
+"""
+好友成绩缓存模块
+
+按 (区域, 好友码) 缓存解析后的好友信息与好友成绩，群聊中同一好友码被多人重复查询时不再重复请求 SEGA。
+    - 新鲜（FRIEND_CACHE_FRESH 秒内）：直接使用缓存
+    - 过期但未超过 FRIEND_CACHE_MAX_AGE：先用缓存出图，同时在后台刷新（同一好友码只刷新一次）
+    - 超过 FRIEND_CACHE_MAX_AGE：视为未缓存
+
+缓存保存的是 get_detailed_info 之前的原始解析结果，读写时均复制，调用方可以放心修改返回的数据
+"""
+
+import logging
+import threading
+import time
+from collections import OrderedDict
+
+logger = logging.getLogger(__name__)
+
+# 直接使用缓存的时间（秒）
+FRIEND_CACHE_FRESH = 300
+
+# 缓存最长保留时间（秒），超过后不再使用
+FRIEND_CACHE_MAX_AGE = 1800
+
+# 最多缓存的好友数（超出时淘汰最久未使用的）
+FRIEND_CACHE_MAX_ENTRIES = 500
+
+# (region, friend_code) -> (friend_info, friend_records, fetched_at)
+_friend_cache = OrderedDict()
+_friend_cache_lock = threading.Lock()
+
+# 正在后台刷新的键
+_refreshing = set()
+
+_friend_cache_stats = {"hits": 0, "stale_hits": 0, "misses": 0}
+
+
+def _cache_key(friend_code, ver):
+    return ("intl" if ver == "intl" else "jp", str(friend_code))
+
+
+def _copy_data(friend_info, friend_records):
+    return dict(friend_info), [dict(record) for record in friend_records]
+
+
+def get_cached_friend(friend_code, ver="jp"):
+    """
+    读取缓存的好友数据
+
+    Args:
+        friend_code: 好友码
+        ver: 服务器版本 (jp/intl)
+
+    Returns:
+        tuple or None: (friend_info, friend_records, stale)，未缓存或已超过最长保留时间时返回 None
+    """
+    key = _cache_key(friend_code, ver)
+    now = time.time()
+
+    with _friend_cache_lock:
+        entry = _friend_cache.get(key)
+        if entry is None or now - entry[2] > FRIEND_CACHE_MAX_AGE:
+            if entry is not None:
+                del _friend_cache[key]
+            _friend_cache_stats["misses"] += 1
+            return None
+
+        _friend_cache.move_to_end(key)
+        friend_info, friend_records, fetched_at = entry
+        stale = now - fetched_at > FRIEND_CACHE_FRESH
+        _friend_cache_stats["stale_hits" if stale else "hits"] += 1
+
+    return (*_copy_data(friend_info, friend_records), stale)
+
+
+def store_friend_data(friend_code, ver, friend_info, friend_records):
+    """
+    缓存好友数据（get_detailed_info 之前的解析结果）
+
+    Args:
+        friend_code: 好友码
+        ver: 服务器版本 (jp/intl)
+        friend_info: get_friend_info 的结果
+        friend_records: get_friend_records 的结果
+    """
+    if not friend_info or not friend_records:
+        return
+
+    entry = (*_copy_data(friend_info, friend_records), time.time())
+    key = _cache_key(friend_code, ver)
+
+    with _friend_cache_lock:
+        _friend_cache[key] = entry
+        _friend_cache.move_to_end(key)
+        while len(_friend_cache) > FRIEND_CACHE_MAX_ENTRIES:
+            _friend_cache.popitem(last=False)
+
+
+def begin_friend_refresh(friend_code, ver="jp"):
+    """
+    标记开始后台刷新
+
+    Returns:
+        bool: 已有刷新在进行时返回 False
+    """
+    key = _cache_key(friend_code, ver)
+    with _friend_cache_lock:
+        if key in _refreshing:
+            return False
+        _refreshing.add(key)
+        return True
+
+
+def end_friend_refresh(friend_code, ver="jp"):
+    """标记后台刷新结束"""
+    with _friend_cache_lock:
+        _refreshing.discard(_cache_key(friend_code, ver))
+
+
+def cleanup_friend_cache():
+    """
+    清理超过最长保留时间的缓存
+
+    Returns:
+        int: 清理的条目数
+    """
+    now = time.time()
+    with _friend_cache_lock:
+        expired = [key for key, entry in _friend_cache.items() if now - entry[2] > FRIEND_CACHE_MAX_AGE]
+        for key in expired:
+            del _friend_cache[key]
+
+    if expired:
+        logger.info(f"[FriendCache] ✓ Cleaned up: expired={len(expired)}")
+    return len(expired)
+
+
+def get_friend_cache_stats():
+    """缓存统计 {"entries", "refreshing", "hits", "stale_hits", "misses"}"""
+    with _friend_cache_lock:
+        return dict(_friend_cache_stats, entries=len(_friend_cache), refreshing=len(_refreshing))
@@ -3,6 +3,10 @@
 统一管理图片的下载、缓存和加载
 
 使用独立的 session 实例避免污染
+
+图标（类型 / 评级 / DX 星 / Combo / Sync）在启动时全部解码进内存图集，
+各尺寸的缩放结果也缓存在内存中，生成缩略图时直接从内存粘贴；
+封面按 (cover_name, 尺寸, 是否圆角) 缓存处理完成的图像，总大小按字节限制（LRU 淘汰）
 """
 import os
 import requests
@@ -10,9 +14,19 @@ import logging
 from PIL import Image
 from io import BytesIO
 from functools import lru_cache
+from collections import OrderedDict
 import threading
 from concurrent.futures import ThreadPoolExecutor, as_completed
-from modules.config_loader import COVERS_DIR
+from modules.config_loader import (
+    COVERS_DIR,
+    COVER_CACHE_MAX_BYTES,
+    ICON_TYPE_DIR,
+    ICON_SCORE_DIR,
+    ICON_DX_STAR_DIR,
+    ICON_COMBO_DIR,
+    ICON_SYNC_DIR
+)
+from modules.image_manager import round_corner
 
 
 # 获取logger
@@ -72,6 +86,111 @@ def download_and_cache_icon(url, save_path):
         return None
 
 
+# ==================== 图标图集 ====================
+
+# 启动时预加载的图标目录
+ICON_ATLAS_DIRS = (ICON_TYPE_DIR, ICON_SCORE_DIR, ICON_DX_STAR_DIR, ICON_COMBO_DIR, ICON_SYNC_DIR)
+
+# 缩放结果的缓存上限（尺寸由缩略图布局决定，正常情况下远达不到）
+ICON_RESIZED_MAX_ENTRIES = 1024
+
+# 文件路径 -> 解码后的 RGBA 图标
+_icon_atlas = {}
+# (文件路径, 尺寸) -> 缩放后的图标
+_icon_resized = {}
+_icon_atlas_lock = threading.Lock()
+
+
+def preload_icon_atlas(dirs=ICON_ATLAS_DIRS):
+    """
+    解码图标目录下的所有 PNG 放入图集（启动时调用）
+
+    Args:
+        dirs: 图标目录列表
+
+    Returns:
+        int: 载入的图标数
+    """
+    loaded = {}
+    for directory in dirs:
+        if not os.path.isdir(directory):
+            continue
+        for name in os.listdir(directory):
+            if not name.endswith(".png"):
+                continue
+            path = os.path.join(directory, name)
+            try:
+                with Image.open(path) as icon_img:
+                    loaded[os.path.normpath(path)] = icon_img.convert("RGBA")
+            except Exception as e:
+                logger.warning(f"[ImageCache] ⚠ Failed to load icon: path={path}, error={e}")
+
+    with _icon_atlas_lock:
+        _icon_atlas.update(loaded)
+
+    logger.info(f"[ImageCache] ✓ Icon atlas loaded: icons={len(loaded)}")
+    return len(loaded)
+
+
+def get_atlas_icon(url, save_path):
+    """
+    从图集获取解码后的图标，图集中没有时下载（或读取本地文件）后加入图集
+
+    返回的图像在线程间共享，调用方只能读取（粘贴、缩放），不能修改
+
+    Args:
+        url: 图标URL
+        save_path: 本地路径
+
+    Returns:
+        PIL.Image 或 None
+    """
+    key = os.path.normpath(save_path)
+    icon_img = _icon_atlas.get(key)
+    if icon_img is not None:
+        return icon_img
+
+    icon_img = download_and_cache_icon(url, save_path)
+    if icon_img is None:
+        return None
+
+    with _icon_atlas_lock:
+        return _icon_atlas.setdefault(key, icon_img)
+
+
+def get_resized_icon(url, save_path, size):
+    """
+    获取缩放到指定尺寸的图标（同一图标同一尺寸只缩放一次）
+
+    Args:
+        url: 图标URL
+        save_path: 本地路径
+        size: 图标尺寸 (width, height)
+
+    Returns:
+        PIL.Image 或 None（共享图像，只读）
+    """
+    key = (os.path.normpath(save_path), tuple(size))
+    icon_img = _icon_resized.get(key)
+    if icon_img is not None:
+        return icon_img
+
+    source = get_atlas_icon(url, save_path)
+    if source is None:
+        return None
+
+    icon_img = source.resize(size, Image.LANCZOS)
+    with _icon_atlas_lock:
+        if len(_icon_resized) >= ICON_RESIZED_MAX_ENTRIES:
+            _icon_resized.clear()
+        return _icon_resized.setdefault(key, icon_img)
+
+
+def get_icon_atlas_stats():
+    """图集统计 {"icons", "resized"}"""
+    return {"icons": len(_icon_atlas), "resized": len(_icon_resized)}
+
+
 def paste_icon_optimized(img, song_data, key, size, position, save_dir, url_func):
     """
     优化版的贴图标函数
@@ -84,22 +203,27 @@ def paste_icon_optimized(img, song_data, key, size, position, save_dir, url_func
         position: 粘贴位置 (x, y)
         save_dir: 缓存目录
         url_func: URL生成函数
+
+    Returns:
+        bool: 图标已贴上或无需贴图标时为 True，图标获取失败时为 False
     """
     if key not in song_data or not song_data[key]:
-        return
+        return True
 
     try:
         file_path = os.path.join(save_dir, f"{song_data[key]}.png")
         url = url_func(song_data[key])
 
-        icon_img = download_and_cache_icon(url, file_path)
+        icon_img = get_resized_icon(url, file_path, size)
         if icon_img:
-            icon_img = icon_img.resize(size, Image.LANCZOS)
             img.paste(icon_img, position, mask=icon_img)
+            return True
 
     except Exception as e:
         logger.error(f"[ImageCache] ✗ Failed to paste icon: key={key}, error={e}")
 
+    return False
+
 
 def get_cover_image(cover_url, cover_name, covers_dir=None):
     """
@@ -173,3 +297,129 @@ def get_cover_image(cover_url, cover_name, covers_dir=None):
     except Exception as e:
         logger.error(f"[ImageCache] ✗ Failed to download cover: cover_name={cover_name}, error={e}")
         return None
+
+
+# ==================== 封面缓存 ====================
+
+class ImageLRUCache:
+    """
+    处理完成的图像的 LRU 缓存，按图像占用的字节数限制总大小
+
+    缓存的图像在线程间共享，调用方只能读取（粘贴），不能修改。
+    on_evict(key, image) 在图像被淘汰时调用（锁外执行）
+    """
+
+    __slots__ = ("max_bytes", "entries", "current_bytes", "hits", "misses", "evictions", "on_evict", "lock")
+
+    def __init__(self, max_bytes, on_evict=None):
+        self.max_bytes = max_bytes
+        self.entries = OrderedDict()  # key -> (image, nbytes)
+        self.current_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.on_evict = on_evict
+        self.lock = threading.Lock()
+
+    def get(self, key):
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self.entries.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def put(self, key, image):
+        nbytes = image.width * image.height * len(image.getbands())
+        if nbytes > self.max_bytes:
+            return image
+
+        evicted = []
+        with self.lock:
+            existing = self.entries.get(key)
+            if existing is not None:
+                self.entries.move_to_end(key)
+                return existing[0]
+
+            self.entries[key] = (image, nbytes)
+            self.current_bytes += nbytes
+            while self.current_bytes > self.max_bytes:
+                evicted_key, (evicted_image, evicted_bytes) = self.entries.popitem(last=False)
+                self.current_bytes -= evicted_bytes
+                self.evictions += 1
+                evicted.append((evicted_key, evicted_image))
+
+        if self.on_evict is not None:
+            for evicted_key, evicted_image in evicted:
+                try:
+                    self.on_evict(evicted_key, evicted_image)
+                except Exception as e:
+                    logger.error(f"[ImageCache] ✗ Evict callback failed: key={evicted_key}, error={e}")
+        return image
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+            self.current_bytes = 0
+
+    def reset(self, max_bytes):
+        """清空并修改容量（出图子进程初始化时使用）"""
+        with self.lock:
+            self.entries.clear()
+            self.current_bytes = 0
+            self.max_bytes = max_bytes
+
+    def get_stats(self):
+        with self.lock:
+            total = self.hits + self.misses
+            return {
+                "entries": len(self.entries),
+                "bytes": self.current_bytes,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": round(self.hits / total, 3) if total else 0.0,
+            }
+
+
+cover_cache = ImageLRUCache(COVER_CACHE_MAX_BYTES)
+
+
+def get_cover_tile(cover_url, cover_name, size, rounded=True, resample=Image.Resampling.LANCZOS):
+    """
+    获取处理完成的正方形封面（圆角 + 缩放），结果按 (cover_name, size, rounded, resample) 缓存
+
+    Args:
+        cover_url: 封面图片 URL
+        cover_name: 封面文件名
+        size: 边长（像素）
+        rounded: 是否圆角（圆角在缩放前的原图上处理）
+        resample: 缩放使用的重采样方式
+
+    Returns:
+        PIL.Image 或 None（共享图像，只读）
+    """
+    if not cover_name:
+        return None
+
+    key = (cover_name, size, rounded, resample)
+    tile = cover_cache.get(key)
+    if tile is not None:
+        return tile
+
+    cover_img = get_cover_image(cover_url=cover_url, cover_name=cover_name)
+    if cover_img is None:
+        return None
+
+    if rounded:
+        cover_img = round_corner(cover_img)
+    tile = cover_img.resize((size, size), resample)
+    return cover_cache.put(key, tile)
+
+
+def get_cover_cache_stats():
+    """封面缓存统计（命中率、占用字节数等）"""
+    return cover_cache.get_stats()
@@ -1,6 +1,8 @@
 import qrcode
 import logging
+import threading
 import numpy as np
+from collections import OrderedDict
 from PIL import Image, ImageDraw, ImageFont
 from modules.config_loader import FONT_PATH, LOGO_PATH
 
@@ -17,6 +19,89 @@ font_record_title = ImageFont.truetype(FONT_PATH, 170)
 # 获取logger
 logger = logging.getLogger(__name__)
 
+# 文字排版缓存：(字体, fontmode, 文本, 最大宽度) -> (截断后的文本, bbox)
+# 歌曲名、称号等在不同用户之间大量重复，预热后几乎都能命中
+TEXT_LAYOUT_CACHE_MAX_ENTRIES = 8192
+TEXT_ELLIPSIS = "..."
+
+_text_layout_cache = OrderedDict()
+_text_layout_lock = threading.Lock()
+_text_layout_stats = {"hits": 0, "misses": 0}
+
+
+def _font_key(font):
+    path = getattr(font, "path", None)
+    if path is None:
+        return id(font)
+    return (path, font.size, getattr(font, "index", 0))
+
+
+def _truncate_to_width(draw, text, font, max_width):
+    """二分查找能放下省略号的最长前缀"""
+    if draw.textlength(text, font=font) <= max_width:
+        return text
+
+    low, high = 0, len(text) - 1
+    while low < high:
+        middle = (low + high + 1) // 2
+        if draw.textlength(text[:middle] + TEXT_ELLIPSIS, font=font) <= max_width:
+            low = middle
+        else:
+            high = middle - 1
+    return text[:low] + TEXT_ELLIPSIS
+
+
+def text_layout(draw, text, font, max_width=None):
+    """
+    文字排版（带缓存）：超出最大宽度时截断并加省略号，同时返回截断后文本的 bbox
+
+    Args:
+        draw: ImageDraw 对象
+        text: 文本
+        font: 字体
+        max_width: 最大宽度，None 表示不截断
+
+    Returns:
+        tuple: (文本, 以 (0, 0) 为起点的 bbox)
+    """
+    key = (_font_key(font), draw.fontmode, text, max_width)
+    with _text_layout_lock:
+        layout = _text_layout_cache.get(key)
+        if layout is not None:
+            _text_layout_cache.move_to_end(key)
+            _text_layout_stats["hits"] += 1
+            return layout
+        _text_layout_stats["misses"] += 1
+
+    fitted = text if max_width is None else _truncate_to_width(draw, text, font, max_width)
+    layout = (fitted, draw.textbbox((0, 0), fitted, font=font))
+
+    with _text_layout_lock:
+        _text_layout_cache[key] = layout
+        while len(_text_layout_cache) > TEXT_LAYOUT_CACHE_MAX_ENTRIES:
+            _text_layout_cache.popitem(last=False)
+    return layout
+
+
+def text_bbox(draw, text, font):
+    """draw.textbbox((0, 0), text, font=font) 的缓存版本"""
+    return text_layout(draw, text, font)[1]
+
+
+def set_text_layout_cache_limit(max_entries):
+    """修改文字排版缓存的条数上限（出图子进程初始化时使用）"""
+    global TEXT_LAYOUT_CACHE_MAX_ENTRIES
+    with _text_layout_lock:
+        TEXT_LAYOUT_CACHE_MAX_ENTRIES = max_entries
+        while len(_text_layout_cache) > max_entries:
+            _text_layout_cache.popitem(last=False)
+
+
+def get_text_layout_stats():
+    """文字排版缓存统计 {"entries", "hits", "misses"}"""
+    with _text_layout_lock:
+        return dict(_text_layout_stats, entries=len(_text_layout_cache))
+
 def draw_aligned_colon_text(draw, lines, top_left, font, spacing=10, fill=(0, 0, 0)):
     """
     将每行的冒号 ":" 作为对齐点，冒号前后分别对齐显示
@@ -36,29 +121,19 @@ def draw_aligned_colon_text(draw, lines, top_left, font, spacing=10, fill=(0, 0,
             right_texts.append("")
 
     # 计算左侧最大宽度
-    max_left_width = max(draw.textbbox((0, 0), text, font=font)[2] for text in left_texts) + 10
+    max_left_width = max(text_bbox(draw, text, font)[2] for text in left_texts) + 10
 
     # 绘制
     for left, right in zip(left_texts, right_texts):
         draw.text((x, y), left, font=font, fill=fill)
         draw.text((x + max_left_width, y), right, font=font, fill=fill)
-        y += draw.textbbox((0, 0), left, font=font)[3] + spacing
+        y += text_bbox(draw, left, font)[3] + spacing
 
 def truncate_text(draw, text, font, max_width):
     """
-    如果文本超出最大宽度，自动截断并加省略号
+    如果文本超出最大宽度，自动截断并加省略号（结果缓存，见 text_layout）
     """
-    ellipsis = "..."
-    text_width = draw.textlength(text, font=font)
-    ellipsis_width = draw.textlength(ellipsis, font=font)
-
-    if text_width <= max_width:
-        return text
-
-    while text and draw.textlength(text + ellipsis, font=font) > max_width:
-        text = text[:-1]
-
-    return text + ellipsis
+    return text_layout(draw, text, font, max_width)[0]
 
 def resize_by_width(img, target_width):
     original_width, original_height = img.size
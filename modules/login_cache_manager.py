@@ -0,0 +1,117 @@
+"""
+登录 Cookie 缓存模块
+
+按 (user_id, 区域) 缓存 SEGA 登录后的 cookies，避免每次更新都走完整的登录流程。
+缓存内容使用 Fernet 加密保存在内存中，并利用 Fernet 令牌的时间戳限制有效期；
+SEGA ID 变化时缓存自动失效
+"""
+
+import json
+import logging
+import threading
+
+from cryptography.fernet import Fernet, InvalidToken
+
+from modules.config_loader import USER_DATA_KEY
+
+logger = logging.getLogger(__name__)
+
+# 缓存有效期（秒）
+LOGIN_CACHE_TTL = 1800
+
+_fernet = Fernet(USER_DATA_KEY)
+
+# (user_id, region) -> Fernet 令牌
+_login_cache = {}
+_login_cache_lock = threading.Lock()
+
+
+def _cache_key(user_id, ver):
+    return (user_id, "intl" if ver == "intl" else "jp")
+
+
+def store_login_cookies(user_id, ver, sega_id, cookies):
+    """
+    缓存登录得到的 cookies
+
+    Args:
+        user_id: 用户ID
+        ver: 服务器版本 (jp/intl)
+        sega_id: 登录使用的 SEGA ID
+        cookies: login_to_maimai 返回的 cookies（SimpleCookie 或 dict）
+    """
+    if not cookies:
+        return
+
+    values = {
+        name: (morsel.value if hasattr(morsel, "value") else morsel)
+        for name, morsel in cookies.items()
+    }
+    token = _fernet.encrypt(json.dumps({"sega_id": sega_id, "cookies": values}).encode())
+
+    with _login_cache_lock:
+        _login_cache[_cache_key(user_id, ver)] = token
+
+
+def get_cached_cookies(user_id, ver, sega_id):
+    """
+    读取缓存的 cookies
+
+    Returns:
+        dict or None: 未缓存、已过期或 SEGA ID 不一致时返回 None
+    """
+    key = _cache_key(user_id, ver)
+    with _login_cache_lock:
+        token = _login_cache.get(key)
+    if token is None:
+        return None
+
+    try:
+        payload = json.loads(_fernet.decrypt(token, ttl=LOGIN_CACHE_TTL))
+    except InvalidToken:
+        invalidate_login_cookies(user_id, ver)
+        return None
+
+    if payload.get("sega_id") != sega_id:
+        invalidate_login_cookies(user_id, ver)
+        return None
+
+    return payload["cookies"]
+
+
+def invalidate_login_cookies(user_id, ver=None):
+    """
+    删除缓存的 cookies
+
+    Args:
+        user_id: 用户ID
+        ver: 服务器版本，None 表示删除所有区域
+    """
+    with _login_cache_lock:
+        if ver is None:
+            _login_cache.pop(_cache_key(user_id, "jp"), None)
+            _login_cache.pop(_cache_key(user_id, "intl"), None)
+        else:
+            _login_cache.pop(_cache_key(user_id, ver), None)
+
+
+def cleanup_login_cache():
+    """
+    清理已过期的缓存
+
+    Returns:
+        int: 清理的条目数
+    """
+    with _login_cache_lock:
+        expired = []
+        for key, token in _login_cache.items():
+            try:
+                _fernet.decrypt(token, ttl=LOGIN_CACHE_TTL)
+            except InvalidToken:
+                expired.append(key)
+        for key in expired:
+            del _login_cache[key]
+
+    if expired:
+        logger.info(f"[LoginCache] ✓ Cleaned up: expired={len(expired)}")
+    return len(expired)
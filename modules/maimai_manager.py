@@ -1,11 +1,18 @@
 import requests
 import random
+import re
 import logging
 import asyncio
+import functools
+import queue
 import aiohttp
+from urllib.parse import urlsplit
 from lxml import etree
 from modules.record_manager import get_detailed_info
-from modules.rate_limiter import maimai_limiter
+from modules.rate_limiter import sega_limiter
+from modules.sega_session_manager import sega_session, mark_sega_maintenance, is_sega_maintenance
+from modules.maimai_xpath import XPATHS
+from modules.login_cache_manager import get_cached_cookies, store_login_cookies, invalidate_login_cookies
 
 logger = logging.getLogger(__name__)
 
@@ -52,13 +59,13 @@ def parse_level_value(input_str):
             return None
 
 def extract_onclick_url_from_button(li, keyword):
-    btn = li.xpath(f'.//button[contains(@class, "{keyword}")]/@onclick')
+    btn = XPATHS["store.button_onclick"](li, keyword=keyword)
     if btn:
         return btn[0].split("'")[1]
 
-    all_buttons = li.xpath('.//button')
+    all_buttons = XPATHS["store.buttons"](li)
     for b in all_buttons:
-        text = "".join(b.xpath('.//text()')).strip()
+        text = "".join(XPATHS["common.text"](b)).strip()
         if "GoogleMap" in text or "Details" in text:
             onclick = b.attrib.get("onclick", "")
             if "window.open" in onclick or "location.href" in onclick:
@@ -148,47 +155,391 @@ def calc_score(notes, judgements):
             total_deduction += scores[k] * v
     return round(101 - total_deduction, 4)
 
-# ==================== 异步版本函数 ====================
+# 登录失效（需要重新登录 / 同意条款）页面的特征文本
+_LOGIN_REQUIRED_MARKERS = (
+    "Please agree to the following terms of service before log in.",
+    "再度ログインしてください",
+)
 
-async def fetch_dom(session: aiohttp.ClientSession, url: str, session_id: str, ver="jp") -> etree._Element:
-    """异步版本的 fetch_dom，支持并发请求"""
-    # 限速保护
-    maimai_limiter.wait_if_needed(session_id)
+# playerData 页面中的游玩次数（jp: 総プレイ回数 / intl: play count），有多项时取最大的总次数
+PLAY_COUNT_PATTERN = re.compile(r"(?:プレイ回数|play count)\D{0,20}?([\d,]+)", re.IGNORECASE)
 
-    # 随机 User-Agent
+# 流式解析时每次读取的字节数
+STREAM_CHUNK_SIZE = 64 * 1024
+
+
+def _is_login_required(html):
+    """页面是否为登录失效（需要重新登录 / 同意条款）页面"""
+    return any(marker in html for marker in _LOGIN_REQUIRED_MARKERS)
+
+
+def _build_headers(url):
+    """按服务器生成请求头（随机 User-Agent）"""
     user_agent = _get_random_user_agent()
 
     if url.startswith("https://maimaidx-eng.com"):
-        headers = {
+        return {
             "Referer": "https://lng-tgk-aime-gw.am-all.net/common_auth/login?site_id=maimaidxex&redirect_url=https://maimaidx-eng.com/maimai-mobile/&back_url=https://maimai.sega.com/",
             "User-Agent": user_agent,
             "Host": "maimaidx-eng.com"
         }
-    else:
-        headers = {
-            "Referer": "https://maimaidx.jp/maimai-mobile/login/",
-            "User-Agent": user_agent,
-            "Host": "maimaidx.jp"
-        }
+    return {
+        "Referer": "https://maimaidx.jp/maimai-mobile/login/",
+        "User-Agent": user_agent,
+        "Host": "maimaidx.jp"
+    }
+
+# 参与区域维护状态的主机（店铺检索 location.am-all.net 等其他主机的 503 不代表 maimai 维护）
+_MAINTENANCE_HOSTS = ("maimaidx.jp", "maimaidx-eng.com")
+
+
+def _tracks_maintenance(url):
+    """该地址是否检查 / 记录区域维护状态"""
+    return urlsplit(url).hostname in _MAINTENANCE_HOSTS
+
+# ==================== 异步版本函数 ====================
+
+async def fetch_dom(session: aiohttp.ClientSession, url: str, session_id: str, ver="jp") -> etree._Element:
+    """异步版本的 fetch_dom，支持并发请求"""
+    tracks_maintenance = _tracks_maintenance(url)
+
+    # 维护期内不访问网络
+    if tracks_maintenance and is_sega_maintenance(ver):
+        return "MAINTENANCE"
+
+    # 限速保护（按主机的令牌桶，不阻塞事件循环）
+    await sega_limiter.acquire(url)
+
+    headers = _build_headers(url)
 
     try:
         async with session.get(url, headers=headers, ssl=False) as resp:
             if resp.status == 503:
+                sega_limiter.penalize(url, "503")
+                if tracks_maintenance:
+                    mark_sega_maintenance(ver)
                 logger.warning(f"[Maimai] ⚠ Server maintenance (503): url={url}")
                 return "MAINTENANCE"
+            if resp.status == 429:
+                sega_limiter.penalize(url, "429")
             resp.raise_for_status()
             html = await resp.text()
 
-            if ("Please agree to the following terms of service before log in." in html or
-                "再度ログインしてください" in html):
+            if _is_login_required(html):
+                sega_limiter.penalize(url, "login required")
                 return None
 
+            sega_limiter.reward(url)
             return await asyncio.to_thread(etree.HTML, html)
     except Exception as e:
         logger.error(f"[Maimai] ✗ Fetch failed: url={url}, error={e}")
         return None
 
 
+class _BlockParseError(Exception):
+    """解析单个成绩块时出错（与网络错误区分，原样抛给调用方）"""
+
+    def __init__(self, error):
+        super().__init__(error)
+        self.error = error
+
+
+class _BlockStream:
+    """
+    成绩页面的流式解析器
+
+    边接收边解析，每当一个 class 包含 class_name 的 div 闭合时立即交给 parse_block 处理，
+    随后清除已处理的节点，整页 DOM 不会同时驻留在内存中。
+    块嵌套时按文档顺序处理外层块及其内部的所有匹配块，与 //div[contains(@class, ...)] 的结果一致
+
+    解析在一个工作线程中进行（run），事件循环只负责接收数据、检查登录失效标记并放入 chunks 队列，
+    与整页解析时使用 asyncio.to_thread 一样不占用共享的 SEGA 事件循环
+    """
+
+    __slots__ = ("class_name", "parse_block", "parser", "results", "chunks", "_tail", "_marker_bytes")
+
+    def __init__(self, class_name, parse_block, encoding="utf-8"):
+        self.class_name = class_name
+        self.parse_block = parse_block
+        self.parser = etree.HTMLPullParser(events=("end",), tag="div", encoding=encoding)
+        self.results = []
+        # 数据块；None 表示数据结束，False 表示放弃解析
+        self.chunks = queue.SimpleQueue()
+        self._marker_bytes = tuple(marker.encode(encoding) for marker in _LOGIN_REQUIRED_MARKERS)
+        self._tail = b""
+
+    def _matches(self, element):
+        return self.class_name in (element.get("class") or "")
+
+    def _drain(self):
+        for _, element in self.parser.read_events():
+            if not self._matches(element):
+                continue
+            # 外层还有匹配块时，留到外层闭合时统一处理
+            if any(self._matches(ancestor) for ancestor in element.iterancestors("div")):
+                continue
+
+            for block in element.iter("div"):
+                if self._matches(block):
+                    try:
+                        result = self.parse_block(block)
+                    except Exception as e:
+                        raise _BlockParseError(e) from e
+                    if result is not None:
+                        self.results.append(result)
+
+            element.clear(keep_tail=True)
+            while element.getprevious() is not None:
+                del element.getparent()[0]
+
+    def feed(self, chunk):
+        """
+        输入一段数据（在事件循环中调用，解析交给工作线程）
+
+        Returns:
+            bool: 检测到登录失效页面时返回 False
+        """
+        data = self._tail + chunk
+        if any(marker in data for marker in self._marker_bytes):
+            return False
+        keep = max(len(marker) for marker in self._marker_bytes) - 1
+        self._tail = data[-keep:]
+
+        self.chunks.put(chunk)
+        return True
+
+    def close(self):
+        """数据结束"""
+        self.chunks.put(None)
+
+    def abort(self):
+        """放弃解析（工作线程丢弃剩余数据后退出）"""
+        self.chunks.put(False)
+
+    def run(self):
+        """
+        工作线程：按顺序解析队列中的数据，直到数据结束或放弃
+
+        Returns:
+            bool: 数据完整解析时返回 True
+        """
+        while True:
+            chunk = self.chunks.get()
+            if chunk is False:
+                return False
+            if chunk is None:
+                self.parser.close()
+                self._drain()
+                return True
+            self.parser.feed(chunk)
+            self._drain()
+
+
+async def fetch_blocks(session: aiohttp.ClientSession, url: str, session_id: str, class_name: str, parse_block, ver="jp"):
+    """流式获取成绩页面，逐块解析
+
+    与 fetch_dom 的返回约定一致：维护时返回 "MAINTENANCE"，请求失败或登录失效时返回 None。
+    parse_block 抛出的异常会原样抛出
+
+    Args:
+        session: ClientSession
+        url: 页面地址
+        session_id: 限速键
+        class_name: 成绩块 div 的 class（子串匹配）
+        parse_block: 解析函数，接收成绩块元素，返回结果或 None（跳过）
+        ver: 版本 (jp/intl)
+
+    Returns:
+        list: parse_block 的结果列表（按文档顺序）
+    """
+    tracks_maintenance = _tracks_maintenance(url)
+
+    # 维护期内不访问网络
+    if tracks_maintenance and is_sega_maintenance(ver):
+        return "MAINTENANCE"
+
+    # 限速保护（按主机的令牌桶，不阻塞事件循环）
+    await sega_limiter.acquire(url)
+
+    headers = _build_headers(url)
+
+    try:
+        async with session.get(url, headers=headers, ssl=False) as resp:
+            if resp.status == 503:
+                sega_limiter.penalize(url, "503")
+                if tracks_maintenance:
+                    mark_sega_maintenance(ver)
+                logger.warning(f"[Maimai] ⚠ Server maintenance (503): url={url}")
+                return "MAINTENANCE"
+            if resp.status == 429:
+                sega_limiter.penalize(url, "429")
+            resp.raise_for_status()
+
+            stream = _BlockStream(class_name, parse_block, resp.charset or "utf-8")
+            parsing = asyncio.ensure_future(asyncio.to_thread(stream.run))
+            try:
+                async for chunk in resp.content.iter_chunked(STREAM_CHUNK_SIZE):
+                    # 解析出错时工作线程已退出，不再接收剩余数据
+                    if parsing.done():
+                        break
+                    if not stream.feed(chunk):
+                        sega_limiter.penalize(url, "login required")
+                        return None
+                stream.close()
+            finally:
+                # 正常结束时 close 已在 abort 之前放入队列，abort 只在提前返回或出错时生效；
+                # 等待工作线程退出，解析异常在此抛出
+                stream.abort()
+                await parsing
+
+            sega_limiter.reward(url)
+            return stream.results
+    except _BlockParseError as e:
+        raise e.error
+    except Exception as e:
+        logger.error(f"[Maimai] ✗ Fetch failed: url={url}, error={e}")
+        return None
+
+
+class _PageAbort(Exception):
+    """页面结果为维护或获取失败，终止同一批的其余请求"""
+
+    def __init__(self, result):
+        super().__init__(result)
+        self.result = result
+
+
+async def fetch_pages(coros, abort_on_none=True):
+    """并发获取多个页面，任一页面返回维护（或获取失败）时立即取消其余请求
+
+    Args:
+        coros: fetch_dom / fetch_blocks 协程列表
+        abort_on_none: 页面返回 None（请求失败或登录失效）时是否也终止
+
+    Returns:
+        list: 各页面结果（与 coros 顺序一致）；提前终止时返回 "MAINTENANCE" 或 None
+    """
+    async def run(coro):
+        result = await coro
+        if result == "MAINTENANCE" or (result is None and abort_on_none):
+            raise _PageAbort(result)
+        return result
+
+    try:
+        async with asyncio.TaskGroup() as group:
+            tasks = [group.create_task(run(coro)) for coro in coros]
+    except BaseExceptionGroup as e:
+        aborts, others = e.split(_PageAbort)
+        if others is not None:
+            raise others.exceptions[0]
+        results = [abort.result for abort in aborts.exceptions]
+        return "MAINTENANCE" if "MAINTENANCE" in results else None
+
+    return [task.result() for task in tasks]
+
+
+def _parse_icon_tags(icons):
+    """成绩图标地址 -> (sync_icon, combo_icon, score_icon)"""
+    sync_icon = combo_icon = score_icon = ""
+    for index, icon in enumerate(icons):
+        icon_tag = icon.split('/')[-1].split('.')[0].replace("music_icon_", "")
+        if index == 0:
+            sync_icon = icon_tag
+        elif index == 1:
+            combo_icon = icon_tag
+        elif index == 2:
+            score_icon = icon_tag
+    return sync_icon, combo_icon, score_icon
+
+
+def _parse_type_icon(type_icon):
+    if type_icon:
+        if "standard.png" in type_icon[0]:
+            return "std"
+        if "dx.png" in type_icon[0]:
+            return "dx"
+    return "N/A"
+
+
+def _parse_record_block(block, difficulty):
+    """解析成绩页面（genre=99）中的一个成绩块，无效块返回 None"""
+    name_div = XPATHS["record.name"](block)
+    if not name_div:
+        return None
+    name = name_div[0]
+
+    score_div = XPATHS["record.score"](block)
+    if not score_div:
+        return None
+    score = score_div[0].strip()
+
+    img_nodes = XPATHS["record.dx_img"](block)
+    if img_nodes:
+        dx_score = img_nodes[0].tail.strip() if img_nodes[0].tail else "N/A"
+    else:
+        dx_score = "N/A"
+
+    type = _parse_type_icon(XPATHS["record.kind_icon"](block))
+
+    sync_icon, combo_icon, score_icon = _parse_icon_tags(XPATHS["record.icons"](block))
+
+    return {
+        "name": name,
+        "difficulty": difficulty,
+        "type": type,
+        "score": score,
+        "dx_score": dx_score,
+        "score_icon": score_icon,
+        "combo_icon": combo_icon,
+        "sync_icon": sync_icon
+    }
+
+
+_KAOMOJI = [
+    "(´･ω･)",
+    "(つ≧▽≦)つ",
+    "(・∀・)",
+    "( ﾟДﾟ)",
+    "(∩^o^)⊃"
+]
+
+
+def _parse_friend_block(block, difficulty):
+    """解析好友对战页面中的一个成绩块，无效块或解析失败返回 None"""
+    try:
+        name_node = XPATHS["friend_record.name"](block)
+        if not name_node:
+            return None
+        name = name_node[0].strip()
+
+        score_cells = XPATHS["friend_record.score"](block, difficulty=difficulty)
+        if len(score_cells) <= 1:
+            return None
+        score = score_cells[1].strip()
+        if score in ("― %", "- %"):
+            return None
+
+        type = _parse_type_icon(XPATHS["friend_record.kind_icon"](block))
+
+        sync_icon, combo_icon, score_icon = _parse_icon_tags(XPATHS["friend_record.icons"](block))
+
+        return {
+            "name": name,
+            "difficulty": difficulty,
+            "type": type,
+            "score": score,
+            # 好友页面没有 DX 分数
+            "dx_score": random.choice(_KAOMOJI),
+            "score_icon": score_icon,
+            "combo_icon": combo_icon,
+            "sync_icon": sync_icon
+        }
+
+    except Exception as e:
+        logger.error(f"[Maimai] ✗ Failed to parse friend record block: error={e}")
+        return None
+
+
 async def login_to_maimai(sega_id: str, password: str, ver="jp"):
     """异步版本的 login_to_maimai
 
@@ -200,22 +551,22 @@ async def login_to_maimai(sega_id: str, password: str, ver="jp"):
     Returns:
         dict: cookies 字典，可用于其他异步函数
     """
-    # 限速保护
-    maimai_limiter.wait_if_needed(f"login_{sega_id}")
+    # 维护期内不访问网络
+    if is_sega_maintenance(ver):
+        return "MAINTENANCE"
 
     # 随机 User-Agent
     user_agent = _get_random_user_agent()
 
-    # 优化：增加连接池大小
-    connector = aiohttp.TCPConnector(ssl=False, limit=10, ttl_dns_cache=300)
-
     if ver == "intl":
-        async with aiohttp.ClientSession(connector=connector) as session:
+        async with sega_session(ver) as session:
+            login_url = "https://lng-tgk-aime-gw.am-all.net/common_auth/login?site_id=maimaidxex&redirect_url=https://maimaidx-eng.com/maimai-mobile/&back_url=https://maimai.sega.com/"
+            await sega_limiter.acquire(login_url)
             try:
-                async with session.get(
-                    "https://lng-tgk-aime-gw.am-all.net/common_auth/login?site_id=maimaidxex&redirect_url=https://maimaidx-eng.com/maimai-mobile/&back_url=https://maimai.sega.com/"
-                ) as resp:
+                async with session.get(login_url) as resp:
                     if resp.status == 503:
+                        sega_limiter.penalize(login_url, "503")
+                        mark_sega_maintenance(ver)
                         logger.warning("[Maimai] ⚠ Server maintenance (503): server=INTL")
                         return "MAINTENANCE"
                     resp.raise_for_status()
@@ -224,6 +575,7 @@ async def login_to_maimai(sega_id: str, password: str, ver="jp"):
                 raise
 
             # POST 登录
+            await sega_limiter.acquire(login_url)
             async with session.post(
                 "https://lng-tgk-aime-gw.am-all.net/common_auth/login/sid/",
                 data={
@@ -237,6 +589,7 @@ async def login_to_maimai(sega_id: str, password: str, ver="jp"):
                 redirect_url = login_resp.headers.get("Location")
 
             # 跟随重定向
+            await sega_limiter.acquire(redirect_url or "https://maimaidx-eng.com")
             async with session.get(
                 redirect_url,
                 headers={
@@ -251,10 +604,14 @@ async def login_to_maimai(sega_id: str, password: str, ver="jp"):
             return session.cookie_jar.filter_cookies("https://maimaidx-eng.com")
 
     else:  # jp
-        async with aiohttp.ClientSession(connector=connector) as session:
+        async with sega_session(ver) as session:
+            login_url = "https://maimaidx.jp/maimai-mobile/login/"
+            await sega_limiter.acquire(login_url)
             try:
-                async with session.get("https://maimaidx.jp/maimai-mobile/login/") as response:
+                async with session.get(login_url) as response:
                     if response.status == 503:
+                        sega_limiter.penalize(login_url, "503")
+                        mark_sega_maintenance(ver)
                         logger.warning("[Maimai] ⚠ Server maintenance (503): server=JP")
                         return "MAINTENANCE"
                     response.raise_for_status()
@@ -265,12 +622,13 @@ async def login_to_maimai(sega_id: str, password: str, ver="jp"):
 
             # 异步解析 HTML 获取 token
             dom = await asyncio.to_thread(etree.HTML, html)
-            token_list = dom.xpath('//input[@name="token"]/@value')
+            token_list = XPATHS["login.token"](dom)
             if not token_list:
                 raise Exception("Unable to fetch login token")
             token = token_list[0]
 
             # POST 登录
+            await sega_limiter.acquire(login_url)
             async with session.post(
                 "https://maimaidx.jp/maimai-mobile/submit/",
                 data={
@@ -285,12 +643,62 @@ async def login_to_maimai(sega_id: str, password: str, ver="jp"):
                 pass
 
             # 选择 AIME 卡
+            await sega_limiter.acquire(login_url)
             async with session.get("https://maimaidx.jp/maimai-mobile/aimeList/submit/?idx=0") as aime_choose:
                 pass
 
             return session.cookie_jar.filter_cookies("https://maimaidx.jp")
 
 
+async def check_login(cookies: dict, ver="jp"):
+    """检查 cookies 是否仍然有效（只请求首页）
+
+    Args:
+        cookies: 登录后的 cookies 字典
+        ver: 版本 (jp/intl)
+
+    Returns:
+        bool or str: 有效返回 True，需要重新登录返回 False，维护时返回 "MAINTENANCE"
+    """
+    base = "https://maimaidx-eng.com/maimai-mobile" if ver == "intl" else "https://maimaidx.jp/maimai-mobile"
+
+    async with sega_session(ver, cookies) as session:
+        dom = await fetch_dom(session, f"{base}/home/", id(cookies), ver)
+
+    if dom == "MAINTENANCE":
+        return "MAINTENANCE"
+    return dom is not None
+
+
+async def login_with_cache(user_id: str, sega_id: str, password: str, ver="jp"):
+    """优先使用缓存的 cookies 登录，缓存失效时才执行完整登录
+
+    Args:
+        user_id: 用户ID（缓存键）
+        sega_id: SEGA ID
+        password: 密码
+        ver: 版本 (jp/intl)
+
+    Returns:
+        与 login_to_maimai 相同：cookies，维护时返回 "MAINTENANCE"
+    """
+    cookies = get_cached_cookies(user_id, ver, sega_id)
+    if cookies:
+        status = await check_login(cookies, ver)
+        if status == "MAINTENANCE":
+            return "MAINTENANCE"
+        if status:
+            logger.info(f"[Maimai] ✓ Reused cached login: user_id={user_id}, ver={ver}")
+            return cookies
+        invalidate_login_cookies(user_id, ver)
+        logger.info(f"[Maimai] → Cached login expired, logging in again: user_id={user_id}, ver={ver}")
+
+    cookies = await login_to_maimai(sega_id, password, ver)
+    if cookies and cookies != "MAINTENANCE":
+        store_login_cookies(user_id, ver, sega_id, cookies)
+    return cookies
+
+
 async def get_maimai_info(cookies: dict, ver="jp"):
     """异步版本的 get_maimai_info，4个页面并发请求
 
@@ -304,9 +712,7 @@ async def get_maimai_info(cookies: dict, ver="jp"):
     base = "https://maimaidx-eng.com/maimai-mobile" if ver == "intl" else "https://maimaidx.jp/maimai-mobile"
     session_id = id(cookies)
 
-    # 优化：增加连接池大小
-    connector = aiohttp.TCPConnector(ssl=False, limit=20, ttl_dns_cache=300)
-    async with aiohttp.ClientSession(cookies=cookies, connector=connector) as session:
+    async with sega_session(ver, cookies) as session:
         # 并发请求所有页面
         urls = [
             f"{base}/playerData/",
@@ -315,39 +721,40 @@ async def get_maimai_info(cookies: dict, ver="jp"):
             f"{base}/collection/trophy/"
         ]
 
-        tasks = [fetch_dom(session, url, session_id, ver) for url in urls]
-        doms = await asyncio.gather(*tasks)
+        doms = await fetch_pages([fetch_dom(session, url, session_id, ver) for url in urls])
 
         # 检查维护状态
-        for dom in doms:
-            if dom == "MAINTENANCE":
-                return {"error": "MAINTENANCE"}
-            if dom is None:
-                return {}
+        if doms == "MAINTENANCE":
+            return {"error": "MAINTENANCE"}
+        if doms is None:
+            return {}
 
         player_dom, collection_dom, nameplate_dom, trophy_dom = doms
 
         # 解析主信息
-        user_name = player_dom.xpath('//div[contains(@class, "name_block")]/text()')
-        rating_block_url = player_dom.xpath('//img[contains(@class, "h_30") and contains(@class, "f_r")]/@src')
-        rating = player_dom.xpath('//div[@class="rating_block"]/text()')
-        cource_rank_url = player_dom.xpath('//img[contains(@class, "h_35") and contains(@class, "f_l")]/@src')
-        class_rank_url = player_dom.xpath('//img[contains(@class, "p_l_10") and contains(@class, "h_35") and contains(@class, "f_l")]/@src')
+        user_name = XPATHS["info.name"](player_dom)
+        rating_block_url = XPATHS["info.rating_block"](player_dom)
+        rating = XPATHS["info.rating"](player_dom)
+        cource_rank_url = XPATHS["info.course_rank"](player_dom)
+        class_rank_url = XPATHS["info.class_rank"](player_dom)
+
+        # 游玩次数（用于判断上次更新后是否有新的游玩）
+        play_counts = [int(count.replace(",", "")) for count in PLAY_COUNT_PATTERN.findall(XPATHS["info.page_text"](player_dom))]
 
         # 头像
-        icon_url = collection_dom.xpath('//img[contains(@class, "w_80") and contains(@class, "m_r_10") and contains(@class, "f_l")]/@src')
+        icon_url = XPATHS["info.icon"](collection_dom)
 
         # 姓名框
-        nameplate_url = nameplate_dom.xpath('//img[contains(@class, "w_396") and contains(@class, "m_r_10")]/@src')
+        nameplate_url = XPATHS["info.nameplate"](nameplate_dom)
 
         # 称号
-        trophy_type_block = trophy_dom.xpath('//div[contains(@class, "block_info") and contains(@class, "f_11") and contains(@class, "orange")]/text()')
+        trophy_type_block = XPATHS["info.trophy_type"](trophy_dom)
         trophy_type = trophy_type_block[0].strip().lower() if trophy_type_block else "rainbow"
         trophy_type = "rainbow" if trophy_type == "ランダム" else trophy_type
-        trophy_blocks = trophy_dom.xpath('//div[contains(@class, "trophy_inner_block") and contains(@class, "f_13")]')
+        trophy_blocks = XPATHS["info.trophy_inner"](trophy_dom)
         if trophy_blocks:
             trophy_block = trophy_blocks[0]
-            trophy_texts = trophy_block.xpath('.//text()')
+            trophy_texts = XPATHS["common.text"](trophy_block)
             trophy_content = trophy_texts[1] if len(trophy_texts) > 1 else "ERROR"
         else:
             trophy_content = "ERROR"
@@ -361,7 +768,8 @@ async def get_maimai_info(cookies: dict, ver="jp"):
             "icon_url": icon_url[0] if icon_url else "N/A",
             "nameplate_url": nameplate_url[0] if nameplate_url else "N/A",
             "trophy_url": f"https://maimaidx.jp/maimai-mobile/img/trophy_{trophy_type}.png",
-            "trophy_content": trophy_content if trophy_content else "N/A"
+            "trophy_content": trophy_content if trophy_content else "N/A",
+            "play_count": str(max(play_counts)) if play_counts else "N/A"
         }
 
         return user_info
@@ -381,76 +789,25 @@ async def get_maimai_records(cookies: dict, ver="jp"):
 
     session_id = id(cookies)  # 使用 cookies 对象 id 作为限速键
 
-    # 优化：增加连接池大小
-    connector = aiohttp.TCPConnector(ssl=False, limit=20, ttl_dns_cache=300)
-    async with aiohttp.ClientSession(cookies=cookies, connector=connector) as session:
+    async with sega_session(ver, cookies) as session:
         # 并发请求所有难度
         tasks = []
         for page_num in range(5):
             url = f"{base}/record/musicGenre/search/?genre=99&diff={page_num}"
-            tasks.append(fetch_dom(session, url, session_id, ver))
-
-        doms = await asyncio.gather(*tasks)
+            parse_block = functools.partial(_parse_record_block, difficulty=difficulty[page_num])
+            tasks.append(fetch_blocks(session, url, session_id, "w_450", parse_block, ver))
 
-        # 解析结果
-        music_record = []
-        for page_num, dom in enumerate(doms):
-            if dom is None:
-                return []
-            if dom == "MAINTENANCE":
-                return "MAINTENANCE"
+        pages = await fetch_pages(tasks)
 
-            music_blocks = dom.xpath('//div[contains(@class, "w_450")]')
-
-            for block in music_blocks:
-                name_div = block.xpath('.//div[contains(@class, "music_name_block")]/text()')
-                if not name_div:
-                    continue
-                name = name_div[0]
-
-                score_div = block.xpath('.//div[contains(@class, "music_score_block") and contains(@class, "w_112")]/text()')
-                if not score_div:
-                    continue
-                score = score_div[0].strip()
-
-                img_nodes = block.xpath('.//div[contains(@class, "music_score_block") and contains(@class, "w_190")]/img')
-                if img_nodes:
-                    dx_score = img_nodes[0].tail.strip() if img_nodes[0].tail else "N/A"
-                else:
-                    dx_score = "N/A"
+        if pages is None:
+            return []
+        if pages == "MAINTENANCE":
+            return "MAINTENANCE"
 
-                type_icon = block.xpath('.//img[contains(@class, "music_kind_icon")]/@src')
-                if type_icon:
-                    if "standard.png" in type_icon[0]:
-                        type = "std"
-                    elif "dx.png" in type_icon[0]:
-                        type = "dx"
-                    else:
-                        type = "N/A"
-                else:
-                    type = "N/A"
-
-                icons = block.xpath('.//img[contains(@class, "h_30")]/@src')
-                sync_icon = combo_icon = score_icon = ""
-                for index, icon in enumerate(icons):
-                    icon_tag = icon.split('/')[-1].split('.')[0].replace("music_icon_", "")
-                    if index == 0:
-                        sync_icon = icon_tag
-                    elif index == 1:
-                        combo_icon = icon_tag
-                    elif index == 2:
-                        score_icon = icon_tag
-
-                music_record.append({
-                    "name": name,
-                    "difficulty": difficulty[page_num],
-                    "type": type,
-                    "score": score,
-                    "dx_score": dx_score,
-                    "score_icon": score_icon,
-                    "combo_icon": combo_icon,
-                    "sync_icon": sync_icon
-                })
+        # 合并结果
+        music_record = []
+        for records in pages:
+            music_record.extend(records)
 
         return music_record
 
@@ -468,9 +825,7 @@ async def get_recent_records(cookies: dict, ver="jp"):
     base = "https://maimaidx-eng.com/maimai-mobile" if ver == "intl" else "https://maimaidx.jp/maimai-mobile"
     session_id = id(cookies)
 
-    # 优化：增加连接池大小
-    connector = aiohttp.TCPConnector(ssl=False, limit=10, ttl_dns_cache=300)
-    async with aiohttp.ClientSession(cookies=cookies, connector=connector) as session:
+    async with sega_session(ver, cookies) as session:
         url = f"{base}/record/"
         dom = await fetch_dom(session, url, session_id, ver)
 
@@ -480,27 +835,27 @@ async def get_recent_records(cookies: dict, ver="jp"):
             return "MAINTENANCE"
 
         recent_record = []
-        music_blocks = dom.xpath('//div[contains(@class, "p_10") and contains(@class, "t_l")]')
+        music_blocks = XPATHS["recent.block"](dom)
 
         if music_blocks:
             for block in music_blocks:
-                name_div = block.xpath('.//div[contains(@class, "basic_block") and contains(@class, "break")]/text()')
+                name_div = XPATHS["recent.name"](block)
                 if not name_div:
                     continue
                 name = name_div[1].strip()
 
-                score_div = block.xpath('.//div[contains(@class, "playlog_achievement_txt")]')
+                score_div = XPATHS["recent.achievement"](block)
                 if not score_div:
                     continue
-                score = ''.join(score_div[0].xpath('.//text()')).strip()
+                score = ''.join(XPATHS["common.text"](score_div[0])).strip()
 
-                score_icon = block.xpath('.//img[contains(@class, "playlog_scorerank")]/@src')
+                score_icon = XPATHS["recent.score_icon"](block)
                 score_icon = score_icon[0].split("/")[-1].split(".")[0] if score_icon else "?"
 
-                dx_score = block.xpath('.//div[contains(@class, "playlog_score_block")]//div[contains(@class, "white")]/text()')
+                dx_score = XPATHS["recent.dx_score"](block)
                 dx_score = dx_score[0].strip() if dx_score else "?"
 
-                type_icon = block.xpath('.//img[contains(@class, "playlog_music_kind_icon")]/@src')
+                type_icon = XPATHS["recent.kind_icon"](block)
                 if type_icon:
                     if "standard.png" in type_icon[0]:
                         type = "std"
@@ -511,7 +866,7 @@ async def get_recent_records(cookies: dict, ver="jp"):
                 else:
                     type = "utage"
 
-                diff_img = block.xpath('.//img[contains(@class, "playlog_diff")]/@src')
+                diff_img = XPATHS["recent.diff"](block)
                 if diff_img:
                     diff_raw = diff_img[0].split("/")[-1]  # "diff_master.png"
                     if diff_raw.startswith("diff_") and diff_raw.endswith(".png"):
@@ -521,7 +876,7 @@ async def get_recent_records(cookies: dict, ver="jp"):
                 else:
                     difficulty = "unknown"
 
-                icons = block.xpath('.//img[contains(@class, "h_35") and contains(@class, "m_5") and contains(@class, "f_l")]/@src')
+                icons = XPATHS["recent.icons"](block)
 
                 combo_icon = sync_icon = "none"
 
@@ -560,37 +915,35 @@ async def get_friends_list(cookies: dict, ver="jp"):
     base = "https://maimaidx-eng.com/maimai-mobile" if ver == "intl" else "https://maimaidx.jp/maimai-mobile"
     session_id = id(cookies)
 
-    # 优化：增加连接池大小
-    connector = aiohttp.TCPConnector(ssl=False, limit=10, ttl_dns_cache=300)
-    async with aiohttp.ClientSession(cookies=cookies, connector=connector) as session:
+    async with sega_session(ver, cookies) as session:
         tasks = []
         url = f"{base}/friend/"
         tasks.append(fetch_dom(session, url, session_id, ver))
         url = f"{base}/friend/pages/?idx=2&type=0"
         tasks.append(fetch_dom(session, url, session_id, ver))
         
-        doms = await asyncio.gather(*tasks)
+        doms = await fetch_pages(tasks)
+
+        if doms is None:
+            return []
+        if doms == "MAINTENANCE":
+            return "MAINTENANCE"
 
         friends = []
         blocks = []
         for dom in doms:
-            if dom is None:
-                return []
-            if dom == "MAINTENANCE":
-                return "MAINTENANCE"
-
-            blocks.extend(dom.xpath('//div[contains(@class, "see_through_block")]'))
+            blocks.extend(XPATHS["friend_list.block"](dom))
 
         if not blocks:
             return []
 
         for block in blocks:
             try:
-                name = block.xpath('.//div[@class="name_block t_l f_l f_16 underline"]/text()')[0].strip()
-                rating = block.xpath('.//div[@class="rating_block"]/text()')[0].strip()
-                friend_id = block.xpath('.//form/input[@name="idx"]/@value')[0].strip()
+                name = XPATHS["friend_list.name"](block)[0].strip()
+                rating = XPATHS["friend_list.rating"](block)[0].strip()
+                friend_id = XPATHS["friend_list.idx"](block)[0].strip()
                 is_favorite = bool(
-                    block.xpath(f'.//form[@action="{base}/friend/favoriteOff/"]')
+                    XPATHS["friend_list.favorite"](block, action=f"{base}/friend/favoriteOff/")
                 )
 
                 if is_favorite:
@@ -632,8 +985,7 @@ async def get_friend_info(cookies: dict, friend_id: str, ver="jp"):
     base = "https://maimaidx-eng.com/maimai-mobile" if ver == "intl" else "https://maimaidx.jp/maimai-mobile"
     session_id = id(cookies)
 
-    connector = aiohttp.TCPConnector(ssl=False)
-    async with aiohttp.ClientSession(cookies=cookies, connector=connector) as session:
+    async with sega_session(ver, cookies) as session:
         # 并发请求所有页面
         url = f"{base}/friend/search/searchUser/?friendCode={friend_id}"
         dom = await fetch_dom(session, url, session_id, ver)
@@ -645,14 +997,14 @@ async def get_friend_info(cookies: dict, friend_id: str, ver="jp"):
             return {}
 
         # 解析主信息
-        user_name = dom.xpath('//div[contains(@class, "name_block")]/text()')
-        rating_block_url = dom.xpath('//img[contains(@class, "h_30") and contains(@class, "f_r")]/@src')
-        rating = dom.xpath('//div[@class="rating_block"]/text()')
-        cource_rank_url = dom.xpath('//img[contains(@class, "h_35") and contains(@class, "f_l")]/@src')
-        class_rank_url = dom.xpath('//img[contains(@class, "p_l_10") and contains(@class, "h_35") and contains(@class, "f_l")]/@src')
+        user_name = XPATHS["info.name"](dom)
+        rating_block_url = XPATHS["info.rating_block"](dom)
+        rating = XPATHS["info.rating"](dom)
+        cource_rank_url = XPATHS["info.course_rank"](dom)
+        class_rank_url = XPATHS["info.class_rank"](dom)
 
         # 头像
-        icon_url = dom.xpath('//img[contains(@class, "w_112") and contains(@class, "f_l")]/@src')
+        icon_url = XPATHS["friend_info.icon"](dom)
 
         # 姓名框
         nameplate_list = [
@@ -669,13 +1021,13 @@ async def get_friend_info(cookies: dict, friend_id: str, ver="jp"):
         nameplate_url = f"https://maimaidx.jp/maimai-mobile/img/NamePlate/{nameplate_name}.png"
 
         # 称号
-        trophy_classes = dom.xpath('//div[contains(@class, "trophy_block")]/@class')[0]
+        trophy_classes = XPATHS["friend_info.trophy_class"](dom)[0]
         trophy_type = [c for c in trophy_classes.split() if c.startswith('trophy_') and c != 'trophy_block'][0]
         trophy_type = trophy_type.replace('trophy_', '').lower()
-        trophy_blocks = dom.xpath('//div[contains(@class, "trophy_inner_block") and contains(@class, "f_13")]')
+        trophy_blocks = XPATHS["info.trophy_inner"](dom)
         if trophy_blocks:
             trophy_block = trophy_blocks[0]
-            trophy_texts = trophy_block.xpath('.//text()')
+            trophy_texts = XPATHS["common.text"](trophy_block)
             trophy_content = trophy_texts[1] if len(trophy_texts) > 1 else "ERROR"
         else:
             trophy_content = "ERROR"
@@ -709,84 +1061,26 @@ async def get_friend_records(cookies: dict, friend_id: str, ver="jp"):
     difficulty = ['basic', 'advanced', 'expert', 'master', 'remaster']
     session_id = id(cookies)
 
-
-    kaomoji = [
-        "(´･ω･)",
-        "(つ≧▽≦)つ",
-        "(・∀・)",
-        "( ﾟДﾟ)",
-        "(∩^o^)⊃"
-    ]
-
-    connector = aiohttp.TCPConnector(ssl=False)
-    async with aiohttp.ClientSession(cookies=cookies, connector=connector) as session:
+    async with sega_session(ver, cookies) as session:
         # 并发请求所有难度
         tasks = []
         for diff in range(5):
             url = f"{base}/friend/friendGenreVs/battleStart/?scoreType=2&genre=99&diff={diff}&idx={friend_id}"
-            tasks.append(fetch_dom(session, url, session_id, ver))
+            parse_block = functools.partial(_parse_friend_block, difficulty=difficulty[diff])
+            tasks.append(fetch_blocks(session, url, session_id, f"music_{difficulty[diff]}_score_back", parse_block, ver))
 
-        doms = await asyncio.gather(*tasks)
+        # 单个难度获取失败时跳过该难度，只有维护时终止
+        pages = await fetch_pages(tasks, abort_on_none=False)
 
-        # 解析成绩
+        if pages == "MAINTENANCE":
+            return "MAINTENANCE"
+
+        # 合并结果
         friend_records = []
-        for diff, dom in enumerate(doms):
-            if dom is None:
+        for records in pages:
+            if records is None:
                 continue
-            if dom == "MAINTENANCE":
-                return "MAINTENANCE"
-
-            blocks = dom.xpath(f'//div[contains(@class, "music_{difficulty[diff]}_score_back")]')
-
-            for block in blocks:
-                try:
-                    name_node = block.xpath('.//div[contains(@class, "music_name_block")]/text()')
-                    if not name_node:
-                        continue
-                    name = name_node[0].strip()
-
-                    score_cells = block.xpath(f'.//td[contains(@class, "{difficulty[diff]}_score_label")]/text()')
-                    if len(score_cells) <= 1:
-                        continue
-                    score = score_cells[1].strip()
-                    if score in ("― %", "- %"):
-                        continue
-
-                    type_img = block.xpath('.//img[contains(@class, "music_kind_icon")]/@src')
-                    if type_img:
-                        if "standard.png" in type_img[0]:
-                            type = "std"
-                        elif "dx.png" in type_img[0]:
-                            type = "dx"
-                        else:
-                            type = "N/A"
-                    else:
-                        type = "N/A"
-
-                    icons = block.xpath('.//td[@class="t_r f_0"]/img/@src')
-                    sync_icon = combo_icon = score_icon = ""
-                    for index, icon in enumerate(icons):
-                        icon_tag = icon.split('/')[-1].split('.')[0].replace("music_icon_", "")
-                        if index == 0:
-                            sync_icon = icon_tag
-                        elif index == 1:
-                            combo_icon = icon_tag
-                        elif index == 2:
-                            score_icon = icon_tag
-
-                    friend_records.append({
-                        "name": name,
-                        "difficulty": difficulty[diff],
-                        "type": type,
-                        "score": score,
-                        "dx_score": random.choice(kaomoji),
-                        "score_icon": score_icon,
-                        "combo_icon": combo_icon,
-                        "sync_icon": sync_icon
-                    })
-
-                except Exception as e:
-                    logger.error(f"[Maimai] ✗ Failed to parse friend record block: error={e}")
+            friend_records.extend(records)
 
         return friend_records
 
@@ -805,8 +1099,7 @@ async def get_nearby_maimai_stores(lat, lng, ver="jp"):
     version_num = "98" if ver == "intl" else "96"
     url = f"https://location.am-all.net/alm/location?gm={version_num}&lat={lat}&lng={lng}"
 
-    connector = aiohttp.TCPConnector(ssl=False)
-    async with aiohttp.ClientSession(connector=connector) as session:
+    async with sega_session(ver) as session:
         session_id = id(session)
         dom = await fetch_dom(session, url, session_id, ver)
 
@@ -816,12 +1109,12 @@ async def get_nearby_maimai_stores(lat, lng, ver="jp"):
             return "MAINTENANCE"
 
         stores = []
-        li_elements = dom.xpath('//ul[@class="store_list"]/li')
+        li_elements = XPATHS["store.block"](dom)
 
         for li in li_elements:
-            name = li.xpath('.//span[@class="store_name"]/text()')
-            address = li.xpath('.//span[@class="store_address"][1]/text()')
-            distance = li.xpath('.//span[@class="store_address"][2]/text()')
+            name = XPATHS["store.name"](li)
+            address = XPATHS["store.address"](li)
+            distance = XPATHS["store.distance"](li)
 
             map_url = extract_onclick_url_from_button(li, "store_bt_google_map_en")
             map_url = map_url.split('@')[0] if '@' in map_url else map_url
@@ -0,0 +1,160 @@
+"""
+maimai 页面 XPath 表
+
+maimai_manager 各解析函数使用的 XPath 表达式在导入时统一编译为 etree.XPath，
+解析时直接调用编译好的对象，不再对每个成绩块重复编译表达式。
+需要参数的表达式使用 XPath 变量（$difficulty 等），调用时以关键字参数传入。
+
+键名为 "分组.名称"，分组中的 "block" 为该分组成绩块 / 列表项的定位表达式，
+其余 .// 开头的表达式在块内求值（耗时对比时也按此方式求值）。
+
+直接运行本模块可对保存的页面做编译前后的耗时对比：
+    python -m modules.maimai_xpath record_master.html friend.html ...
+"""
+
+import sys
+import time
+
+from lxml import etree
+
+EXPRESSIONS = {
+    # 通用
+    "common.text": './/text()',
+
+    # 登录页
+    "login.token": '//input[@name="token"]/@value',
+
+    # 成绩页面（genre=99），流式解析时成绩块按 class 匹配，block 仅用于耗时对比
+    "record.block": '//div[contains(@class, "w_450")]',
+    "record.name": './/div[contains(@class, "music_name_block")]/text()',
+    "record.score": './/div[contains(@class, "music_score_block") and contains(@class, "w_112")]/text()',
+    "record.dx_img": './/div[contains(@class, "music_score_block") and contains(@class, "w_190")]/img',
+    "record.kind_icon": './/img[contains(@class, "music_kind_icon")]/@src',
+    "record.icons": './/img[contains(@class, "h_30")]/@src',
+
+    # 好友对战页面
+    "friend_record.block": '//div[contains(@class, concat("music_", $difficulty, "_score_back"))]',
+    "friend_record.name": './/div[contains(@class, "music_name_block")]/text()',
+    "friend_record.score": './/td[contains(@class, concat($difficulty, "_score_label"))]/text()',
+    "friend_record.kind_icon": './/img[contains(@class, "music_kind_icon")]/@src',
+    "friend_record.icons": './/td[@class="t_r f_0"]/img/@src',
+
+    # 最近游玩记录
+    "recent.block": '//div[contains(@class, "p_10") and contains(@class, "t_l")]',
+    "recent.name": './/div[contains(@class, "basic_block") and contains(@class, "break")]/text()',
+    "recent.achievement": './/div[contains(@class, "playlog_achievement_txt")]',
+    "recent.score_icon": './/img[contains(@class, "playlog_scorerank")]/@src',
+    "recent.dx_score": './/div[contains(@class, "playlog_score_block")]//div[contains(@class, "white")]/text()',
+    "recent.kind_icon": './/img[contains(@class, "playlog_music_kind_icon")]/@src',
+    "recent.diff": './/img[contains(@class, "playlog_diff")]/@src',
+    "recent.icons": './/img[contains(@class, "h_35") and contains(@class, "m_5") and contains(@class, "f_l")]/@src',
+
+    # 好友列表
+    "friend_list.block": '//div[contains(@class, "see_through_block")]',
+    "friend_list.name": './/div[@class="name_block t_l f_l f_16 underline"]/text()',
+    "friend_list.rating": './/div[@class="rating_block"]/text()',
+    "friend_list.idx": './/form/input[@name="idx"]/@value',
+    "friend_list.favorite": './/form[@action=$action]',
+
+    # 玩家信息（playerData / collection 页面）
+    "info.name": '//div[contains(@class, "name_block")]/text()',
+    "info.rating_block": '//img[contains(@class, "h_30") and contains(@class, "f_r")]/@src',
+    "info.rating": '//div[@class="rating_block"]/text()',
+    "info.course_rank": '//img[contains(@class, "h_35") and contains(@class, "f_l")]/@src',
+    "info.class_rank": '//img[contains(@class, "p_l_10") and contains(@class, "h_35") and contains(@class, "f_l")]/@src',
+    "info.icon": '//img[contains(@class, "w_80") and contains(@class, "m_r_10") and contains(@class, "f_l")]/@src',
+    "info.nameplate": '//img[contains(@class, "w_396") and contains(@class, "m_r_10")]/@src',
+    "info.trophy_type": '//div[contains(@class, "block_info") and contains(@class, "f_11") and contains(@class, "orange")]/text()',
+    "info.trophy_inner": '//div[contains(@class, "trophy_inner_block") and contains(@class, "f_13")]',
+    "info.page_text": 'string(//body)',
+
+    # 好友信息（searchUser 页面，其余字段与玩家信息相同）
+    "friend_info.icon": '//img[contains(@class, "w_112") and contains(@class, "f_l")]/@src',
+    "friend_info.trophy_class": '//div[contains(@class, "trophy_block")]/@class',
+
+    # 店铺列表
+    "store.block": '//ul[@class="store_list"]/li',
+    "store.name": './/span[@class="store_name"]/text()',
+    "store.address": './/span[@class="store_address"][1]/text()',
+    "store.distance": './/span[@class="store_address"][2]/text()',
+    "store.button_onclick": './/button[contains(@class, $keyword)]/@onclick',
+    "store.buttons": './/button',
+}
+
+XPATHS = {name: etree.XPath(expression) for name, expression in EXPRESSIONS.items()}
+
+
+# ==================== 耗时对比 ====================
+
+# 对比时带参数表达式使用的变量值
+BENCHMARK_VARIABLES = {
+    "difficulty": "master",
+    "action": "https://maimaidx.jp/maimai-mobile/friend/favoriteOff/",
+    "keyword": "bt_details_en",
+}
+
+
+def _evaluation_plan(dom):
+    """(表达式名, 求值节点列表)，块内表达式在该分组的每个块上求值"""
+    plan = []
+    for name in EXPRESSIONS:
+        group, _, field = name.partition(".")
+        if field == "block":
+            plan.append((name, [dom]))
+            continue
+        block_name = f"{group}.block"
+        if block_name in XPATHS:
+            plan.append((name, XPATHS[block_name](dom, **BENCHMARK_VARIABLES)))
+        else:
+            plan.append((name, [dom]))
+    return plan
+
+
+def benchmark_page(html, rounds=20):
+    """
+    对比同一页面上字符串 XPath 与编译后 XPath 的求值耗时
+
+    Args:
+        html: 页面内容
+        rounds: 重复次数
+
+    Returns:
+        dict: {"evaluations", "string_ms", "compiled_ms"}
+    """
+    dom = etree.HTML(html)
+    plan = _evaluation_plan(dom)
+    evaluations = sum(len(nodes) for _, nodes in plan) * rounds
+
+    start = time.perf_counter()
+    for _ in range(rounds):
+        for name, nodes in plan:
+            expression = EXPRESSIONS[name]
+            for node in nodes:
+                node.xpath(expression, **BENCHMARK_VARIABLES)
+    string_ms = (time.perf_counter() - start) * 1000
+
+    start = time.perf_counter()
+    for _ in range(rounds):
+        for name, nodes in plan:
+            xpath = XPATHS[name]
+            for node in nodes:
+                xpath(node, **BENCHMARK_VARIABLES)
+    compiled_ms = (time.perf_counter() - start) * 1000
+
+    return {"evaluations": evaluations, "string_ms": string_ms, "compiled_ms": compiled_ms}
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 2:
+        print("Usage: python -m modules.maimai_xpath PAGE.html [PAGE.html ...]")
+        sys.exit(1)
+
+    for path in sys.argv[1:]:
+        with open(path, encoding="utf-8") as f:
+            result = benchmark_page(f.read())
+        speedup = result["string_ms"] / result["compiled_ms"] if result["compiled_ms"] else 0
+        print(
+            f"{path}: evaluations={result['evaluations']}, "
+            f"string={result['string_ms']:.1f}ms, compiled={result['compiled_ms']:.1f}ms, "
+            f"speedup={speedup:.1f}x"
+        )
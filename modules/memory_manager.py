@@ -31,6 +31,7 @@ class MemoryManager:
         self.thread = None
         self.last_cleanup_time = None
         self.last_cleanup_stats = None  # 保存最后一次清理的详细统计
+        self.cache_stats = {}  # 缓存名 -> 返回统计信息的函数
 
     def start(self):
         """启动内存管理器"""
@@ -106,6 +107,25 @@ class MemoryManager:
 
         return stats
 
+    def register_cache(self, name: str, stats_func):
+        """
+        注册缓存，get_stats 中会包含其统计信息
+
+        Args:
+            name: 缓存名
+            stats_func: 无参数函数，返回统计信息 dict
+        """
+        self.cache_stats[name] = stats_func
+
+    def _collect_cache_stats(self) -> dict:
+        caches = {}
+        for name, stats_func in list(self.cache_stats.items()):
+            try:
+                caches[name] = stats_func()
+            except Exception as e:
+                logger.error(f"[Memory] ✗ Failed to get cache stats: cache={name}, error={e}")
+        return caches
+
     def get_stats(self) -> dict:
         """
         获取内存管理器状态
@@ -129,7 +149,8 @@ class MemoryManager:
             'gc_counts': display_gc_counts,  # 显示清理前的计数
             'gc_counts_current': current_gc_counts,  # 当前实时计数
             'gc_threshold': gc.get_threshold(),  # (threshold0, threshold1, threshold2)
-            'last_cleanup_stats': self.last_cleanup_stats  # 最后一次清理的详细信息
+            'last_cleanup_stats': self.last_cleanup_stats,  # 最后一次清理的详细信息
+            'caches': self._collect_cache_stats()  # 已注册缓存的统计
         }
 
 
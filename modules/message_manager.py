@@ -173,6 +173,12 @@ rate_limit_msg_text = {
     "zh": "⏳ 稍等一下！我正在处理相同的请求！\n等我完成再试试吧~"
 }
 
+timeout_error_text = {
+    "ja": "⌛ 公式サイトの応答が遅くて時間切れになっちゃった…\n混み合ってるみたいだから、少し待ってからもう一度試してみてね〜",
+    "en": "⌛ The official site took too long to respond...\nIt seems busy right now, so please wait a bit and try again~",
+    "zh": "⌛ 官方网站响应太慢，超时了…\n现在好像比较忙，请稍等一会儿再试~"
+}
+
 maintenance_error_text = {
     "ja": "🔧 あれ？公式サイトがメンテナンス中みたい！\n夜間とかメンテナンス時間はアクセスできないから、またあとで試してみてね〜",
     "en": "🔧 Oh? The official site seems to be under maintenance!\nIt's not accessible during maintenance hours, so please try again later~",
@@ -854,6 +860,10 @@ def rate_limit_msg(user_id=None):
     """生成频率限制消息"""
     return create_text_message(rate_limit_msg_text, user_id, get_support_quick_reply(user_id))
 
+def timeout_error(user_id=None):
+    """生成 SEGA 请求超时（繁忙）消息"""
+    return create_text_message(timeout_error_text, user_id, get_support_quick_reply(user_id))
+
 def maintenance_error(user_id=None):
     """生成维护错误消息"""
     return create_text_message(maintenance_error_text, user_id, get_support_quick_reply(user_id))
@@ -1677,6 +1687,16 @@ update_result_flex_text = {
         'en': 'Failed',
         'zh': '失败'
     },
+    'changes_label': {
+        'ja': '成績の変化',
+        'en': 'Record Changes',
+        'zh': '成绩变化'
+    },
+    'changes_format': {
+        'ja': '新規 {inserted} / 更新 {improved} / 変更 {updated} / 削除 {deleted}',
+        'en': 'New {inserted} / Improved {improved} / Changed {updated} / Removed {deleted}',
+        'zh': '新增 {inserted} / 提升 {improved} / 变化 {updated} / 删除 {deleted}'
+    },
     'alt_text_success': {
         'ja': 'アップデート完了',
         'en': 'Update Completed',
@@ -1689,7 +1709,7 @@ update_result_flex_text = {
     }
 }
 
-def generate_update_result_flex(user_id, username, rating, update_time, elapsed_time, func_status, success=True):
+def generate_update_result_flex(user_id, username, rating, update_time, elapsed_time, func_status, success=True, record_changes=None):
     """
     生成更新结果 Flex Message
 
@@ -1702,6 +1722,7 @@ def generate_update_result_flex(user_id, username, rating, update_time, elapsed_
         func_status: 各功能状态字典
         friends_count: 好友列表数量
         success: 是否成功
+        record_changes: Best 成绩变化统计（write_record 的返回值，可选）
 
     Returns:
         FlexMessage: 更新结果 Flex Message
@@ -1865,6 +1886,30 @@ def generate_update_result_flex(user_id, username, rating, update_time, elapsed_
         "contents": status_contents
     })
 
+    # Best 成绩变化统计
+    if record_changes:
+        content_rows.append({
+            "type": "box",
+            "layout": "vertical",
+            "margin": "md",
+            "contents": [
+                {
+                    "type": "text",
+                    "text": get_multilingual_text(texts['changes_label'], language=lang),
+                    "size": "xs",
+                    "color": "#999999"
+                },
+                {
+                    "type": "text",
+                    "text": get_multilingual_text(texts['changes_format'], language=lang).format(**record_changes),
+                    "size": "xs",
+                    "color": "#17B169" if record_changes.get("improved") else "#555555",
+                    "margin": "sm",
+                    "wrap": True
+                }
+            ]
+        })
+
     # 获取随机tip和ad并添加到内容中
     random_tip = get_random_tip()
     random_ad = get_random_ad()
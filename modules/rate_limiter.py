@@ -2,13 +2,18 @@
 请求限速器
 避免同一session短时间内过多请求触发风控
 
-注意：限速功能已禁用，wait_if_needed() 不会进行任何等待
+SEGA 请求使用 sega_limiter（按主机的 asyncio 令牌桶），收到 429 / 503 或登录失效页面时自动降速，
+之后随成功请求逐步恢复；等待使用 asyncio.sleep，不会阻塞事件循环
+
+注意：同步的 RateLimiter 限速功能已禁用，wait_if_needed() 不会进行任何等待
 如需启用限速，修改 RATE_LIMIT_ENABLED = True
 """
+import asyncio
 import time
 import threading
 import logging
 from collections import defaultdict
+from urllib.parse import urlsplit
 
 logger = logging.getLogger(__name__)
 
@@ -50,14 +55,129 @@ class RateLimiter:
             self.last_call[session_id] = time.time()
 
 
-# 全局限速器实例
-# 注意：限速功能已通过 RATE_LIMIT_ENABLED = False 禁用
-maimai_limiter = RateLimiter(min_interval_seconds=0.5)
-
 # 通用 API 限速
+# 注意：限速功能已通过 RATE_LIMIT_ENABLED = False 禁用
 api_limiter = RateLimiter(min_interval_seconds=0.3)
 
 
+# ==================== SEGA 请求限速 ====================
+
+# 各主机的令牌桶参数: 主机 -> (每秒请求数, 突发容量)
+SEGA_HOST_RATES = {
+    "maimaidx.jp": (8.0, 16),
+    "maimaidx-eng.com": (4.0, 8),
+    "lng-tgk-aime-gw.am-all.net": (2.0, 4),
+    "location.am-all.net": (2.0, 4),
+}
+SEGA_DEFAULT_RATE = (4.0, 8)
+
+# 降速：速率乘以 DECREASE_FACTOR（不低于 MIN_RATE_RATIO * 基准速率），冷却时间内重复触发只计一次
+RATE_DECREASE_FACTOR = 0.5
+MIN_RATE_RATIO = 0.1
+PENALTY_COOLDOWN = 5.0
+
+# 恢复：每次成功请求速率增加基准速率的 RECOVER_STEP，直到恢复基准速率
+RATE_RECOVER_STEP = 0.02
+
+
+class _TokenBucket:
+    __slots__ = ("base_rate", "rate", "burst", "tokens", "updated", "last_penalty")
+
+    def __init__(self, rate, burst, now):
+        self.base_rate = rate
+        self.rate = rate
+        self.burst = burst
+        self.tokens = float(burst)
+        self.updated = now
+        self.last_penalty = None
+
+
+class AsyncTokenBucketLimiter:
+    """
+    按主机的 asyncio 令牌桶限速器
+
+    令牌可以预支为负数：每个请求立即占用一个令牌，按欠下的令牌数计算等待时间，
+    等待的请求按到达顺序放行。只在 SEGA 事件循环中调用，不需要线程锁
+    """
+
+    def __init__(self, host_rates=None, default_rate=SEGA_DEFAULT_RATE):
+        self.host_rates = host_rates or {}
+        self.default_rate = default_rate
+        self.buckets = {}
+
+    def _bucket(self, url, now):
+        host = urlsplit(url).hostname or url
+        bucket = self.buckets.get(host)
+        if bucket is None:
+            rate, burst = self.host_rates.get(host, self.default_rate)
+            bucket = _TokenBucket(rate, burst, now)
+            self.buckets[host] = bucket
+        return host, bucket
+
+    @staticmethod
+    def _refill(bucket, now):
+        bucket.tokens = min(bucket.burst, bucket.tokens + (now - bucket.updated) * bucket.rate)
+        bucket.updated = now
+
+    async def acquire(self, url):
+        """
+        等待到允许向该主机发送请求
+
+        Args:
+            url: 请求地址（按主机限速）
+        """
+        now = asyncio.get_running_loop().time()
+        _, bucket = self._bucket(url, now)
+        self._refill(bucket, now)
+
+        bucket.tokens -= 1
+        if bucket.tokens < 0:
+            await asyncio.sleep(-bucket.tokens / bucket.rate)
+
+    def penalize(self, url, reason):
+        """
+        收到风控信号（429 / 503 / 登录失效）时降速
+
+        Args:
+            url: 请求地址
+            reason: 原因（用于日志）
+        """
+        now = asyncio.get_running_loop().time()
+        host, bucket = self._bucket(url, now)
+        if bucket.last_penalty is not None and now - bucket.last_penalty < PENALTY_COOLDOWN:
+            return
+
+        self._refill(bucket, now)
+        bucket.last_penalty = now
+        bucket.rate = max(bucket.base_rate * MIN_RATE_RATIO, bucket.rate * RATE_DECREASE_FACTOR)
+        # 清空突发额度，之后的请求按新速率排队
+        bucket.tokens = min(bucket.tokens, 0.0)
+        logger.warning(f"[RateLimit] ⚠ Slowing down: host={host}, reason={reason}, rate={bucket.rate:.2f}/s")
+
+    def reward(self, url):
+        """请求成功后逐步恢复速率"""
+        now = asyncio.get_running_loop().time()
+        host, bucket = self._bucket(url, now)
+        if bucket.rate >= bucket.base_rate:
+            return
+
+        self._refill(bucket, now)
+        bucket.rate = min(bucket.base_rate, bucket.rate + bucket.base_rate * RATE_RECOVER_STEP)
+        if bucket.rate == bucket.base_rate:
+            logger.info(f"[RateLimit] ✓ Rate recovered: host={host}, rate={bucket.rate:.2f}/s")
+
+    def get_stats(self):
+        """各主机当前速率 {host: {"rate", "base_rate"}}"""
+        return {
+            host: {"rate": round(bucket.rate, 2), "base_rate": bucket.base_rate}
+            for host, bucket in list(self.buckets.items())
+        }
+
+
+# SEGA 请求限速器实例（在 SEGA 事件循环中使用）
+sega_limiter = AsyncTokenBucketLimiter(SEGA_HOST_RATES)
+
+
 # ==================== 用户请求频率限制 ====================
 
 # 用户请求频率限制配置
@@ -0,0 +1,199 @@
+"""
+Rating 计算模块
+
+以有序阈值表的形式保存 Rating 系数，提供单曲计算和 NumPy 批量计算两种接口，
+两者结果逐位一致
+"""
+
+import math
+from bisect import bisect_right
+from functools import lru_cache
+
+import numpy as np
+
+# 达成率阈值（升序）及对应系数，达成率 >= 阈值时使用该系数，低于最小阈值时系数为 0
+RA_THRESHOLDS = (
+    10.0000, 20.0000, 30.0000, 40.0000, 50.0000, 60.0000, 70.0000, 75.0000,
+    79.9999, 80.0000, 90.0000, 94.0000, 96.9999, 97.0000, 98.0000, 98.9999,
+    99.0000, 99.5000, 99.9999, 100.0000, 100.4999, 100.5000
+)
+RA_COEFFICIENTS = (
+    0, 0.016, 0.032, 0.048, 0.064, 0.080, 0.096, 0.112, 0.120,
+    0.128, 0.136, 0.152, 0.168, 0.176, 0.200, 0.203, 0.206,
+    0.208, 0.211, 0.214, 0.216, 0.222, 0.224
+)
+
+# 旧版本 (b40) 计算方案
+RA_THRESHOLDS_RECENT = (
+    10.0000, 20.0000, 30.0000, 40.0000, 50.0000, 60.0000, 70.0000, 75.0000,
+    80.0000, 90.0000, 94.0000, 97.0000, 98.0000, 99.0000, 99.5000, 100.0000,
+    100.5000
+)
+RA_COEFFICIENTS_RECENT = (
+    0, 0.01, 0.02, 0.03, 0.04, 0.05, 0.06, 0.07, 0.075,
+    0.085, 0.095, 0.105, 0.125, 0.127, 0.13, 0.132, 0.135,
+    0.14
+)
+
+# 达成率上限，超过部分不计入 Rating
+MAX_RA_SCORE = 100.5
+
+# 达成率最小单位 (0.0001%) 的倒数，边界计算在整数单位上进行
+SCORE_UNITS = 10000
+
+_RA_THRESHOLDS_ARRAY = np.array(RA_THRESHOLDS, dtype=np.float64)
+_RA_COEFFICIENTS_ARRAY = np.array(RA_COEFFICIENTS, dtype=np.float64)
+_RA_THRESHOLDS_RECENT_ARRAY = np.array(RA_THRESHOLDS_RECENT, dtype=np.float64)
+_RA_COEFFICIENTS_RECENT_ARRAY = np.array(RA_COEFFICIENTS_RECENT, dtype=np.float64)
+
+
+def get_single_ra(level: float, score: float, ap_clear: bool = False, recent_type: bool = False) -> int:
+    """
+    计算单曲Rating值
+
+    根据谱面定数和达成率计算Rating值,日服AP有额外加成
+
+    Args:
+        level: 谱面定数 (如 14.5)
+        score: 达成率 (如 100.5000)
+        ap_clear: 是否为 AP/APP
+        recent_type: 是否为 b40 计算方案
+
+    Returns:
+        计算得到的Rating整数值
+    """
+    if recent_type:
+        return get_single_ra_recent(level, score)
+
+    ra_kake = RA_COEFFICIENTS[bisect_right(RA_THRESHOLDS, score)]
+
+    # 计算基础Rating
+    if score <= MAX_RA_SCORE:
+        ra = int(level * score * ra_kake)
+    else:
+        ra = int(level * MAX_RA_SCORE * ra_kake)
+
+    # AP加成
+    if ap_clear:
+        ra += 1
+
+    return ra
+
+
+def get_single_ra_recent(level: float, score: float) -> int:
+    """
+    计算旧版本单曲Rating值
+
+    根据谱面定数和达成率计算Rating值
+
+    Args:
+        level: 谱面定数 (如 14.5)
+        score: 达成率 (如 100.5000)
+
+    Returns:
+        计算得到的Rating整数值
+    """
+    ra_kake = RA_COEFFICIENTS_RECENT[bisect_right(RA_THRESHOLDS_RECENT, score)]
+
+    # 计算基础Rating
+    if score <= MAX_RA_SCORE:
+        ra = int(level * score * ra_kake)
+    else:
+        ra = int(level * MAX_RA_SCORE * ra_kake)
+
+    return ra
+
+
+def calc_ra_array(levels, scores, ap_clears=None, recent_type: bool = False) -> np.ndarray:
+    """
+    批量计算Rating值
+
+    与 get_single_ra 逐元素结果一致，参数支持广播
+
+    Args:
+        levels: 谱面定数数组
+        scores: 达成率数组
+        ap_clears: 是否 AP 加成的布尔数组（可选，b40 方案下忽略）
+        recent_type: 是否为 b40 计算方案
+
+    Returns:
+        np.ndarray: int64 Rating 数组
+    """
+    levels = np.asarray(levels, dtype=np.float64)
+    scores = np.asarray(scores, dtype=np.float64)
+
+    if recent_type:
+        thresholds, coefficients = _RA_THRESHOLDS_RECENT_ARRAY, _RA_COEFFICIENTS_RECENT_ARRAY
+    else:
+        thresholds, coefficients = _RA_THRESHOLDS_ARRAY, _RA_COEFFICIENTS_ARRAY
+
+    ra_kake = coefficients[np.searchsorted(thresholds, scores, side='right')]
+
+    # 与单曲计算相同的运算顺序：(定数 * 达成率) * 系数，再向零取整
+    ra = np.trunc(levels * np.minimum(scores, MAX_RA_SCORE) * ra_kake).astype(np.int64)
+
+    if ap_clears is not None and not recent_type:
+        ra = ra + np.asarray(ap_clears, dtype=bool)
+
+    return ra
+
+
+@lru_cache(maxsize=512)
+def get_ra_boundaries(level: float, min_score: float = 97.0, max_score: float = MAX_RA_SCORE) -> tuple:
+    """
+    计算指定定数下 Rating 发生变化的达成率边界
+
+    在每个系数区间内由 n / (定数 * 系数) 直接求出 Rating 跨过整数 n 的位置，
+    再用 get_single_ra 在 0.0001 精度上校正取整误差；结果按定数缓存
+
+    Args:
+        level: 谱面定数 (如 14.5)
+        min_score: 起始达成率
+        max_score: 结束达成率（含）
+
+    Returns:
+        tuple: ((score, ra), ...)，score 为该 Rating 的最低达成率，按达成率升序
+    """
+    start = round(min_score * SCORE_UNITS)
+    stop = round(max_score * SCORE_UNITS)
+
+    def ra_at(units):
+        return get_single_ra(level, units / SCORE_UNITS)
+
+    # 各系数区间的起点（整数单位）
+    segment_starts = [start] + [
+        round(threshold * SCORE_UNITS) for threshold in RA_THRESHOLDS
+        if start < round(threshold * SCORE_UNITS) <= stop
+    ]
+    segment_ends = segment_starts[1:] + [stop + 1]
+
+    boundaries = []
+    last_ra = 0
+
+    for seg_start, seg_end in zip(segment_starts, segment_ends):
+        ra_kake = RA_COEFFICIENTS[bisect_right(RA_THRESHOLDS, seg_start / SCORE_UNITS)]
+
+        ra = ra_at(seg_start)
+        if ra != last_ra:
+            boundaries.append((seg_start / SCORE_UNITS, ra))
+            last_ra = ra
+
+        if ra_kake == 0 or level <= 0:
+            continue
+
+        seg_last_ra = ra_at(seg_end - 1)
+        while last_ra < seg_last_ra:
+            target = last_ra + 1
+
+            # 解析解，再校正到满足 ra >= target 的最小整数单位
+            units = max(seg_start, math.ceil(target * SCORE_UNITS / (level * ra_kake)))
+            units = min(units, seg_end - 1)
+            while units > seg_start and ra_at(units - 1) >= target:
+                units -= 1
+            while ra_at(units) < target:
+                units += 1
+
+            last_ra = ra_at(units)
+            boundaries.append((units / SCORE_UNITS, last_ra))
+
+    return tuple(boundaries)
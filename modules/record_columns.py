@@ -0,0 +1,203 @@
+"""
+成绩列式存储模块
+
+定义成绩表各枚举列的编码表，负责抓取字符串与数据库类型化列之间的转换：
+数据库行直接转换为成绩字典（rows_to_records），抓取结果直接转换为写入参数（records_to_db_rows）
+
+枚举值无法识别（如 SEGA 新增的图标）时不写入编码 0，而是跳过该条成绩并记录日志，
+避免新值被永久地存成默认值；跳过的谱面由调用方保留数据库中的原有成绩，
+需要在编码表末尾追加新值后重新更新
+"""
+
+import logging
+from decimal import Decimal
+
+logger = logging.getLogger(__name__)
+
+# 枚举列编码表，编码即下标（与 records_db.sql 中的 TINYINT 列对应，只能在末尾追加）
+DIFFICULTIES = ("unknown", "basic", "advanced", "expert", "master", "remaster", "utage")
+CHART_TYPES = ("N/A", "std", "dx", "utage")
+SCORE_ICONS = (
+    "", "d", "c", "b", "bb", "bbb", "a", "aa", "aaa",
+    "s", "sp", "ss", "ssp", "sss", "sssp", "?"
+)
+COMBO_ICONS = ("", "back", "fc", "fcp", "ap", "app", "none")
+SYNC_ICONS = ("", "back", "sync", "fs", "fsp", "fdx", "fdxp", "none")
+
+# 数据库中 DX 分数为 NULL 时的显示值
+DX_SCORE_MISSING = "N/A"
+DX_SCORE_MISSING_RECENT = "?"
+
+_ENUM_COLUMNS = (
+    ("difficulty", DIFFICULTIES),
+    ("type", CHART_TYPES),
+    ("score_icon", SCORE_ICONS),
+    ("combo_icon", COMBO_ICONS),
+    ("sync_icon", SYNC_ICONS),
+)
+_ENUM_CODES = {
+    column: {value: code for code, value in enumerate(values)}
+    for column, values in _ENUM_COLUMNS
+}
+
+# 已提示过的未知枚举值，避免重复刷日志
+_unknown_values = set()
+
+
+class UnknownEnumValue(ValueError):
+    """枚举列的值不在编码表中"""
+
+    def __init__(self, column, value):
+        super().__init__(f"unknown {column}: {value!r}")
+        self.column = column
+        self.value = value
+
+
+def encode_enum(column: str, value) -> int:
+    """
+    将枚举列的字符串转换为编码
+
+    Raises:
+        UnknownEnumValue: 值不在编码表中
+    """
+    code = _ENUM_CODES[column].get(value)
+    if code is None:
+        raise UnknownEnumValue(column, value)
+    return code
+
+
+def strip_typed_fields(records):
+    """去掉 add_typed_fields 补充的内部字段，用于 API 输出（返回新的字典列表）"""
+    return [
+        {key: value for key, value in record.items() if key not in ("achievement", "dx_ratio")}
+        for record in records
+    ]
+
+
+def parse_achievement(score) -> float:
+    """解析 "100.5000%" 形式的达成率，无法解析时返回 0.0"""
+    try:
+        return float(str(score).rstrip("%"))
+    except (TypeError, ValueError):
+        return 0.0
+
+
+def parse_dx_score(dx_score):
+    """
+    解析 "1,234 / 1,500" 形式的 DX 分数
+
+    Returns:
+        tuple: (dx_score, dx_max)，无法解析时为 (None, None)
+    """
+    if not dx_score or "/" not in dx_score:
+        return None, None
+
+    current, _, maximum = dx_score.partition("/")
+    try:
+        dx_max = int(maximum.strip().replace(",", ""))
+        return int(current.strip().replace(",", "")), (dx_max if dx_max > 0 else None)
+    except ValueError:
+        return None, None
+
+
+def format_achievement(achievement: float) -> str:
+    """达成率显示字符串，如 100.5000%"""
+    return f"{achievement:.4f}%"
+
+
+def format_dx_score(dx_score, dx_max, missing: str = DX_SCORE_MISSING) -> str:
+    """DX 分数显示字符串，如 1,234 / 1,500"""
+    if not dx_max:
+        return missing
+    return f"{dx_score:,} / {dx_max:,}"
+
+
+def add_typed_fields(record: dict) -> dict:
+    """
+    为抓取得到的成绩字典补充类型化字段（原地修改）
+
+    achievement: 达成率 (float)
+    dx_ratio: DX 分数比例 (float)，未知时为 None
+    """
+    if 'achievement' not in record:
+        record['achievement'] = parse_achievement(record.get('score'))
+    if 'dx_ratio' not in record:
+        dx_score, dx_max = parse_dx_score(record.get('dx_score'))
+        record['dx_ratio'] = dx_score / dx_max if dx_max else None
+    return record
+
+
+# 数据库列顺序（不含 id / user_id）
+DB_COLUMNS = (
+    "name", "difficulty", "type", "achievement", "dx_score", "dx_max",
+    "score_icon", "combo_icon", "sync_icon"
+)
+
+
+def rows_to_records(rows, recent=False):
+    """
+    数据库行（按 DB_COLUMNS 顺序）转换为成绩字典列表
+
+    保留原有的字符串字段（score / dx_score 等），并附带 achievement / dx_ratio 类型化字段
+    """
+    missing = DX_SCORE_MISSING_RECENT if recent else DX_SCORE_MISSING
+
+    records = []
+    for name, difficulty, type, achievement, dx_score, dx_max, score_icon, combo_icon, sync_icon in rows:
+        achievement = float(achievement)
+        records.append({
+            "name": name,
+            "difficulty": DIFFICULTIES[difficulty],
+            "type": CHART_TYPES[type],
+            "score": format_achievement(achievement),
+            "dx_score": format_dx_score(dx_score, dx_max, missing),
+            "score_icon": SCORE_ICONS[score_icon],
+            "combo_icon": COMBO_ICONS[combo_icon],
+            "sync_icon": SYNC_ICONS[sync_icon],
+            "achievement": achievement,
+            "dx_ratio": dx_score / dx_max if dx_max else None,
+        })
+    return records
+
+
+def records_to_db_rows(records, user_id):
+    """
+    抓取得到的成绩字典列表转换为写入数据库的参数元组列表（DB 列顺序前加 user_id）
+
+    含无法识别的枚举值的成绩会被跳过（记录日志）
+
+    Returns:
+        tuple: (参数元组列表, 跳过的谱面键集合)；谱面键为编码后的 (name, difficulty, type)，
+               difficulty / type 本身无法识别时数据库中不可能有该谱面，不计入
+    """
+    rows = []
+    skipped = set()
+    for song in records:
+        dx_score, dx_max = parse_dx_score(song.get("dx_score"))
+        try:
+            rows.append((
+                user_id,
+                song.get("name"),
+                encode_enum("difficulty", song.get("difficulty")),
+                encode_enum("type", song.get("type")),
+                # 按 4 位小数转为 Decimal，避免浮点误差写入 DECIMAL 列
+                Decimal(format(parse_achievement(song.get("score")), ".4f")),
+                dx_score if dx_max else None,
+                dx_max,
+                encode_enum("score_icon", song.get("score_icon")),
+                encode_enum("combo_icon", song.get("combo_icon")),
+                encode_enum("sync_icon", song.get("sync_icon")),
+            ))
+        except UnknownEnumValue as e:
+            if (e.column, e.value) not in _unknown_values:
+                _unknown_values.add((e.column, e.value))
+                logger.warning(f"[RecordColumns] ⚠ Unknown enum value, skipping record: column={e.column}, value={e.value!r}, name={song.get('name')}")
+            try:
+                skipped.add((
+                    song.get("name"),
+                    encode_enum("difficulty", song.get("difficulty")),
+                    encode_enum("type", song.get("type")),
+                ))
+            except UnknownEnumValue:
+                pass
+    return rows, skipped
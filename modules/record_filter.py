@@ -0,0 +1,118 @@
+"""
+成绩筛选模块
+
+将 select_records 的命令字符串（-lv / -ra / -dx / -scr / -ver）编译为筛选计划，
+计划按命令文本缓存，筛选时对每条成绩只做一次融合判断，不再使用 eval
+"""
+
+import re
+from functools import lru_cache
+
+_COMMAND_PATTERN = re.compile(r"-(\w+)\s+([^ -][^-]*)")
+
+
+def _range_predicate(field, start, stop=None):
+    """单值为下限，两个值为闭区间"""
+    if stop is None:
+        return lambda x: x[field] >= start
+    return lambda x: start <= x[field] <= stop
+
+
+def _dx_predicate(start, stop=None):
+    """DX 比例（百分数）条件，与原先 dx 分数 * 100 的比较方式一致；DX 分数未知时不匹配"""
+    if stop is None:
+        return lambda x: x['dx_ratio'] is not None and x['dx_ratio'] * 100 >= start
+    return lambda x: x['dx_ratio'] is not None and start <= x['dx_ratio'] * 100 <= stop
+
+
+def _compile_clause(cmd, cmd_num):
+    """编译单个筛选条件，未知命令返回 None"""
+    parts = cmd_num.split()
+
+    if cmd == "lv":
+        if len(parts) == 1:
+            return _range_predicate('internalLevelValue', float(parts[0]))
+        lv_start, lv_stop = map(float, parts[:2])
+        return _range_predicate('internalLevelValue', lv_start, lv_stop)
+
+    if cmd == "ra":
+        if len(parts) == 1:
+            return _range_predicate('ra', int(parts[0]))
+        ra_start, ra_stop = map(int, parts[:2])
+        return _range_predicate('ra', ra_start, ra_stop)
+
+    if cmd == "dx":
+        if len(parts) == 1:
+            return _dx_predicate(int(re.sub(r"\D", "", parts[0])))
+        dx_start = int(re.sub(r"\D", "", parts[0]))
+        dx_stop = int(re.sub(r"\D", "", parts[1]))
+        return _dx_predicate(dx_start, dx_stop)
+
+    if cmd == "scr":
+        if len(parts) == 1:
+            return _range_predicate('achievement', float(re.sub(r"[^0-9.]", "", parts[0])))
+        scr_start = float(re.sub(r"[^0-9.]", "", parts[0]))
+        scr_stop = float(re.sub(r"[^0-9.]", "", parts[1]))
+        return _range_predicate('achievement', scr_start, scr_stop)
+
+    if cmd == "ver":
+        # 处理版本筛选：-ver [version1] [version2] ...，+ 替换为 " PLUS"，忽略大小写
+        versions = frozenset(
+            v.strip().replace("+", " PLUS").lower().replace("dx", "maimaiでらっくす").replace("deluxe", "maimaiでらっくす")
+            for v in parts if v.strip()
+        )
+        return lambda x: (x.get('version') or '').lower() in versions
+
+    return None
+
+
+def _fuse(predicates):
+    """将多个条件合并为一个判断函数"""
+    if len(predicates) == 1:
+        return predicates[0]
+    if len(predicates) == 2:
+        first, second = predicates
+        return lambda x: first(x) and second(x)
+    return lambda x: all(predicate(x) for predicate in predicates)
+
+
+class FilterPlan:
+    """
+    编译后的筛选计划
+
+    predicate 为 None 表示命令中没有有效的筛选条件
+    """
+
+    __slots__ = ("command", "predicate")
+
+    def __init__(self, command, predicates):
+        self.command = command
+        self.predicate = _fuse(predicates) if predicates else None
+
+    def apply(self, records):
+        """单次遍历筛选成绩列表，保持原有顺序"""
+        if self.predicate is None:
+            return records
+        predicate = self.predicate
+        return [record for record in records if predicate(record)]
+
+
+@lru_cache(maxsize=256)
+def compile_filter(command: str) -> FilterPlan:
+    """
+    编译筛选命令
+
+    命令格式错误时抛出 ValueError，与逐条筛选时的行为一致
+
+    Args:
+        command: 命令字符串，如 "-lv 14 15 -scr 100.5"
+
+    Returns:
+        FilterPlan: 筛选计划（按命令文本缓存，可在请求间共享）
+    """
+    predicates = []
+    for cmd, cmd_num in _COMMAND_PATTERN.findall(command):
+        predicate = _compile_clause(cmd, cmd_num)
+        if predicate is not None:
+            predicates.append(predicate)
+    return FilterPlan(command, tuple(predicates))
@@ -15,6 +15,8 @@ from modules.config_loader import (
     ICON_BASE_DIR
 )
 from modules.image_cache import *
+from modules.tile_cache import tile_key, get_tile, put_tile
+from modules.render_pool import run_in_pool, RENDER_POOL_MIN_TILES, RENDER_POOL_WORKERS
 from modules.image_manager import *
 
 # 获取logger
@@ -74,9 +76,9 @@ def create_thumbnail_in_line(song, thumb_size=(400, 100), scale=1.5):
     )
 
     # --- dx_star 星星图标 ---
-    if 'dx_score' in song and song['dx_score']:
+    if song.get('dx_ratio') is not None:
         try:
-            dx_score = eval(song['dx_score'].replace(",", ""))
+            dx_score = song['dx_ratio']
             if 0 <= dx_score < 0.85:
                 star_num = 0
             elif 0.85 <= dx_score < 0.9:
@@ -116,6 +118,54 @@ def create_thumbnail_in_line(song, thumb_size=(400, 100), scale=1.5):
     return final_img
 
 def create_thumbnail(song, thumb_size=(300, 150), padding=15):
+    """
+    成绩缩略图，内容相同的缩略图直接复用缓存
+
+    返回的图像可能与其他调用共享，调用方只能粘贴，不能修改
+    """
+    key = tile_key(song, thumb_size, padding)
+    tile = get_tile(key)
+    if tile is not None:
+        return tile
+
+    tile, complete = _draw_thumbnail(song, thumb_size, padding)
+    # 封面未能加载时不缓存，下次重新绘制
+    return put_tile(key, tile) if complete else tile
+
+def _render_tile_raw(args):
+    """进程池中绘制缩略图，返回原始 RGB 数据 (尺寸, 数据, 封面与图标是否完整)"""
+    song, thumb_size, padding = args
+    tile, complete = _draw_thumbnail(song, thumb_size, padding)
+    return tile.size, tile.tobytes(), complete
+
+def create_thumbnails(songs, thumb_size=(300, 150), padding=15):
+    """
+    批量生成成绩缩略图：缓存未命中的部分较多时交给出图进程池并行绘制
+
+    返回的图像只能粘贴，不能修改（与 create_thumbnail 相同）
+    """
+    keys = [tile_key(song, thumb_size, padding) for song in songs]
+    tiles = [get_tile(key) for key in keys]
+    missing = [index for index, tile in enumerate(tiles) if tile is None]
+
+    results = None
+    if len(missing) >= RENDER_POOL_MIN_TILES:
+        chunksize = max(1, math.ceil(len(missing) / (RENDER_POOL_WORKERS * 4)))
+        results = run_in_pool(_render_tile_raw, [(songs[index], thumb_size, padding) for index in missing], chunksize)
+
+    if results is None:
+        for index in missing:
+            tiles[index] = create_thumbnail(songs[index], thumb_size, padding)
+        return tiles
+
+    for index, (size, data, complete) in zip(missing, results):
+        # 直接引用返回的数据，不复制
+        tile = Image.frombuffer("RGB", size, data, "raw", "RGB", 0, 1)
+        tiles[index] = put_tile(keys[index], tile) if complete else tile
+    return tiles
+
+def _draw_thumbnail(song, thumb_size, padding):
+    """绘制成绩缩略图，返回 (图像, 封面与图标是否完整)"""
     bg_color = _get_difficulty_color(song['difficulty'])
     img = Image.new("RGB", thumb_size, bg_color)
     draw = ImageDraw.Draw(img)
@@ -125,18 +175,20 @@ def create_thumbnail(song, thumb_size=(300, 150), padding=15):
     # --- 封面 ---
     # 根据缩略图尺寸动态计算封面大小 (保持比例: 80/300 ≈ 0.267)
     cover_size = int(thumb_size[0] * 0.267)
+    # 封面或任一图标获取失败时为 False，这样的缩略图不写入缓存
+    complete = True
     if 'cover_name' in song and song['cover_name']:
+        complete = False
         try:
-            # 使用新的 get_cover_image 函数（优先本地，不存在则下载）
-            cover_img = get_cover_image(
+            # 圆角并缩放完成的封面（内存缓存，未命中时优先本地，不存在则下载）
+            cover_img = get_cover_tile(
                 cover_url=song.get('cover_url'),
-                cover_name=song['cover_name']
+                cover_name=song['cover_name'],
+                size=cover_size
             )
             if cover_img:
-                # 使用 LANCZOS 高质量重采样
-                cover_img = round_corner(cover_img)
-                cover_img = cover_img.resize((cover_size, cover_size), Image.Resampling.LANCZOS)
                 img.paste(cover_img, (padding, padding), cover_img)
+                complete = True
         except Exception as e:
             logger.error(f"[RecordGenerator] ✗ Failed to load cover image: error={e}")
 
@@ -144,7 +196,7 @@ def create_thumbnail(song, thumb_size=(300, 150), padding=15):
     # 根据封面尺寸动态计算图标大小
     type_width = int(cover_size * 0.5)  # 40/80 = 0.5
     type_height = int(cover_size * 0.15)  # 12/80 = 0.15
-    paste_icon_optimized(
+    complete &= paste_icon_optimized(
         img, song, key='type',
         size=(type_width, type_height),
         position=(padding + cover_size - type_width, padding + cover_size - type_height),
@@ -173,7 +225,7 @@ def create_thumbnail(song, thumb_size=(300, 150), padding=15):
     # 根据缩略图尺寸动态计算图标大小
     score_icon_width = int(thumb_size[0] * 0.217)  # 65/300 ≈ 0.217
     score_icon_height = int(thumb_size[1] * 0.2)  # 30/150 = 0.2
-    paste_icon_optimized(
+    complete &= paste_icon_optimized(
         img, song, key='score_icon',
         size=(score_icon_width, score_icon_height),
         position=(score_x_offset - score_icon_width + 5, padding + line_spacing),
@@ -193,9 +245,9 @@ def create_thumbnail(song, thumb_size=(300, 150), padding=15):
     draw.line([(0, thumb_size[1]), (thumb_size[0], thumb_size[1])], fill=(255, 255, 255), width=90)
 
     # --- dx_star 星星图标 ---
-    if 'dx_score' in song and song['dx_score']:
+    if song.get('dx_ratio') is not None:
         try:
-            dx_score = eval(song['dx_score'].replace(",", ""))
+            dx_score = song['dx_ratio']
             if 0 <= dx_score < 0.85:
                 star_num = 0
             elif 0.85 <= dx_score < 0.9:
@@ -212,7 +264,7 @@ def create_thumbnail(song, thumb_size=(300, 150), padding=15):
             # 根据缩略图尺寸动态计算星星图标大小
             star_width = int(thumb_size[0] * 0.267)  # 80/300 ≈ 0.267
             star_height = int(thumb_size[1] * 0.107)  # 16/150 ≈ 0.107
-            paste_icon_optimized(
+            complete &= paste_icon_optimized(
                 img, {'star': str(star_num)}, key='star',
                 size=(star_width, star_height),
                 position=(padding + cover_size, thumb_size[1] - int(thumb_size[1] * 0.213)),
@@ -227,7 +279,7 @@ def create_thumbnail(song, thumb_size=(300, 150), padding=15):
     # 根据缩略图尺寸动态计算图标大小
     combo_icon_width = int(thumb_size[0] * 0.133)  # 40/300 ≈ 0.133
     combo_icon_height = int(thumb_size[1] * 0.3)  # 45/150 = 0.3
-    paste_icon_optimized(
+    complete &= paste_icon_optimized(
         img, song, key='combo_icon',
         size=(combo_icon_width, combo_icon_height),
         position=(padding - 5, thumb_size[1] - int(thumb_size[1] * 0.32)),
@@ -236,7 +288,7 @@ def create_thumbnail(song, thumb_size=(300, 150), padding=15):
     )
 
     # --- sync_icon 图标 ---
-    paste_icon_optimized(
+    complete &= paste_icon_optimized(
         img, song, key='sync_icon',
         size=(combo_icon_width, combo_icon_height),
         position=(padding + combo_icon_width - 5, thumb_size[1] - int(thumb_size[1] * 0.32)),
@@ -255,7 +307,7 @@ def create_thumbnail(song, thumb_size=(300, 150), padding=15):
     draw.rectangle([(0, 0), (thumb_size[0] - 1, thumb_size[1] - 1)], outline=border_color, width=3)
 
     final_img = img.convert("RGB")
-    return final_img
+    return final_img, complete
 
 def generate_records_picture(up_songs=[], down_songs=[], title="RECORD"):
     uploaded_data = up_songs + down_songs
@@ -273,12 +325,12 @@ def generate_records_picture(up_songs=[], down_songs=[], title="RECORD"):
     for rcd in up_songs:
         up_ra += rcd['ra']
         up_level += rcd['internalLevelValue']
-        up_score += float(rcd['score'][:-1])
+        up_score += rcd['achievement']
 
     for rcd in down_songs:
         down_ra += rcd['ra']
         down_level += rcd['internalLevelValue']
-        down_score += float(rcd['score'][:-1])
+        down_score += rcd['achievement']
 
     all_ra = round(up_ra + down_ra, 2)
     all_level = up_level + down_level
@@ -322,14 +374,14 @@ def generate_records_picture(up_songs=[], down_songs=[], title="RECORD"):
             right_texts.append("")
 
     # 计算左侧最大宽度（+10px 间距，与 draw_aligned_colon_text 一致）
-    max_left_width = max(draw.textbbox((0, 0), text, font=font_large)[2] for text in left_texts) + 10
+    max_left_width = max(text_bbox(draw, text, font_large)[2] for text in left_texts) + 10
     # 计算右侧最大宽度
-    max_right_width = max(draw.textbbox((0, 0), text, font=font_large)[2] for text in right_texts) if right_texts else 0
+    max_right_width = max(text_bbox(draw, text, font_large)[2] for text in right_texts) if right_texts else 0
 
     # 实际文本总宽度
     max_text_width = max_left_width + max_right_width
 
-    line_height = draw.textbbox((0, 0), "TEST", font=font_large)[3]
+    line_height = text_bbox(draw, "TEST", font_large)[3]
     text_total_height = len(header_text) * (line_height + 7)
 
     # 根据实际文本宽度设置卡片宽度
@@ -355,7 +407,7 @@ def generate_records_picture(up_songs=[], down_songs=[], title="RECORD"):
     )
 
     # 绘制斜体标题
-    bbox = draw.textbbox((0, 0), title, font=font_record_title)
+    bbox = text_bbox(draw, title, font_record_title)
     title_width = bbox[2] - bbox[0]
     title_height = bbox[3] - bbox[1]
 
@@ -380,9 +432,10 @@ def generate_records_picture(up_songs=[], down_songs=[], title="RECORD"):
     title_y = card_y - 40
     combined.paste(title_layer, (title_x, title_y), title_layer)
 
-    up_thumbnails = [create_thumbnail(song, thumb_size) for song in up_songs[:grid_size[0] * grid_size[1]]]
-    down_thumbnails = [create_thumbnail(song, thumb_size) for song in down_songs[:grid_size[0] * grid_size[1]]]
-    thumbnails = up_thumbnails + down_thumbnails
+    max_tiles = grid_size[0] * grid_size[1]
+    thumbnails = create_thumbnails(up_songs[:max_tiles] + down_songs[:max_tiles], thumb_size)
+    up_thumbnails = thumbnails[:len(up_songs[:max_tiles])]
+    down_thumbnails = thumbnails[len(up_thumbnails):]
 
     for i, thumb in enumerate(up_thumbnails):
         x_offset = (i % grid_size[0]) * (thumb_size[0] + spacing) + side_width
@@ -442,11 +495,13 @@ def generate_cover(cover_url, type, icon=None, icon_type=None, size=150, cover_n
     img_height = size
     record_img = Image.new("RGB", (img_width, img_height), (255, 255, 255))
 
-    # 加载封面图片
-    cover_img = get_cover_image(cover_url=cover_url, cover_name=cover_name)
+    # 加载封面图片（保持原有的 BICUBIC 缩放，即 Image.resize 的默认方式）
+    cover_img = get_cover_tile(
+        cover_url=cover_url, cover_name=cover_name, size=size,
+        rounded=False, resample=Image.Resampling.BICUBIC
+    )
 
     if cover_img:
-        cover_img = cover_img.resize((size, size))
         record_img.paste(cover_img, (0, 0))
 
     # 添加 type 图标（std/dx）- 按比例缩放
@@ -482,7 +537,7 @@ def generate_cover(cover_url, type, icon=None, icon_type=None, size=150, cover_n
             file_path = f"{ICON_BASE_DIR}/{icon_type}/{icon}.png"
             url = f"https://maimaidx.jp/maimai-mobile/img/music_icon_{icon}.png"
 
-            icon_img = download_and_cache_icon(url, file_path)
+            icon_img = get_atlas_icon(url, file_path)
             if icon_img:
                 # 转换为 RGBA 以支持透明度
                 record_img = record_img.convert("RGBA")
@@ -491,7 +546,7 @@ def generate_cover(cover_url, type, icon=None, icon_type=None, size=150, cover_n
                 icon_width = int(size * 0.75)  # 原来 0.867，缩小到 0.75
                 aspect_ratio = icon_img.height / icon_img.width
                 new_height = int(icon_width * aspect_ratio)
-                resized_img = icon_img.resize((icon_width, new_height), Image.Resampling.LANCZOS)
+                resized_img = get_resized_icon(url, file_path, (icon_width, new_height))
 
                 # 阴影处理
                 shadow = Image.new("RGBA", record_img.size, (0, 0, 0, 150))
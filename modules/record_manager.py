@@ -4,156 +4,23 @@
 提供数据库操作、Rating计算、成绩数据处理等功能
 """
 
+import heapq
 import logging
+from datetime import datetime
 from typing import List, Dict, Any, Optional
 from modules.config_loader import (
     MAIMAI_VERSION,
-    SONGS,
-    read_dxdata,
     USERS
 )
 from modules.dbpool_manager import get_connection
+from modules.song_catalog import get_song_catalog
+from modules.rating_engine import get_single_ra, get_single_ra_recent, calc_ra_array, get_ra_boundaries
+from modules.record_columns import DB_COLUMNS, rows_to_records, records_to_db_rows, add_typed_fields, strip_typed_fields, parse_achievement, format_achievement
+from modules.summary_manager import invalidate_user_summary, release_user_summary
 
 # 获取logger
 logger = logging.getLogger(__name__)
 
-def get_single_ra(level: float, score: float, ap_clear: bool = False, recent_type: bool = False) -> int:
-    """
-    计算单曲Rating值
-
-    根据谱面定数和达成率计算Rating值,日服AP有额外加成
-
-    Args:
-        level: 谱面定数 (如 14.5)
-        score: 达成率 (如 100.5000)
-        ap_clear: 是否为 AP/APP
-        recent_type: 是否为 b40 计算方案
-
-    Returns:
-        计算得到的Rating整数值
-    """
-    if recent_type:
-        return get_single_ra_recent(level, score)
-
-    # Rating系数映射表
-    if score >= 100.5000:
-        ra_kake = 0.224
-    elif score >= 100.4999:
-        ra_kake = 0.222
-    elif score >= 100.0000:
-        ra_kake = 0.216
-    elif score >= 99.9999:
-        ra_kake = 0.214
-    elif score >= 99.5000:
-        ra_kake = 0.211
-    elif score >= 99.0000:
-        ra_kake = 0.208
-    elif score >= 98.9999:
-        ra_kake = 0.206
-    elif score >= 98.0000:
-        ra_kake = 0.203
-    elif score >= 97.0000:
-        ra_kake = 0.200
-    elif score >= 96.9999:
-        ra_kake = 0.176
-    elif score >= 94.0000:
-        ra_kake = 0.168
-    elif score >= 90.0000:
-        ra_kake = 0.152
-    elif score >= 80.0000:
-        ra_kake = 0.136
-    elif score >= 79.9999:
-        ra_kake = 0.128
-    elif score >= 75.0000:
-        ra_kake = 0.120
-    elif score >= 70.0000:
-        ra_kake = 0.112
-    elif score >= 60.0000:
-        ra_kake = 0.096
-    elif score >= 50.0000:
-        ra_kake = 0.080
-    elif score >= 40.0000:
-        ra_kake = 0.064
-    elif score >= 30.0000:
-        ra_kake = 0.048
-    elif score >= 20.0000:
-        ra_kake = 0.032
-    elif score >= 10.0000:
-        ra_kake = 0.016
-    else:
-        ra_kake = 0
-
-    # 计算基础Rating
-    if score <= 100.5:
-        ra = int(level * score * ra_kake)
-    else:
-        ra = int(level * 100.5 * ra_kake)
-
-    # AP加成
-    if ap_clear:
-        ra += 1
-
-    return ra
-
-def get_single_ra_recent(level: float, score: float) -> int:
-    """
-    计算旧版本单曲Rating值
-
-    根据谱面定数和达成率计算Rating值
-
-    Args:
-        level: 谱面定数 (如 14.5)
-        score: 达成率 (如 100.5000)
-
-    Returns:
-        计算得到的Rating整数值
-    """
-    # Rating系数映射表
-    if score >= 100.5000:
-        ra_kake = 0.14
-    elif score >= 100.0000:
-        ra_kake = 0.135
-    elif score >= 99.5000:
-        ra_kake = 0.132
-    elif score >= 99.0000:
-        ra_kake = 0.13
-    elif score >= 98.0000:
-        ra_kake = 0.127
-    elif score >= 97.0000:
-        ra_kake = 0.125
-    elif score >= 94.0000:
-        ra_kake = 0.105
-    elif score >= 90.0000:
-        ra_kake = 0.095
-    elif score >= 80.0000:
-        ra_kake = 0.085
-    elif score >= 75.0000:
-        ra_kake = 0.075
-    elif score >= 70.0000:
-        ra_kake = 0.07
-    elif score >= 60.0000:
-        ra_kake = 0.06
-    elif score >= 50.0000:
-        ra_kake = 0.05
-    elif score >= 40.0000:
-        ra_kake = 0.04
-    elif score >= 30.0000:
-        ra_kake = 0.03
-    elif score >= 20.0000:
-        ra_kake = 0.02
-    elif score >= 10.0000:
-        ra_kake = 0.01
-    else:
-        ra_kake = 0
-
-    # 计算基础Rating
-    if score <= 100.5:
-        ra = int(level * score * ra_kake)
-    else:
-        ra = int(level * 100.5 * ra_kake)
-
-    return ra
-
 def get_ideal_score(score: float) -> float:
     if 99.0000 <= score < 99.5000:
         return 99.5000, "ssp"
@@ -178,30 +45,190 @@ def read_record(user_id: str, recent: bool = False, recent_type: bool = False) -
         成绩记录列表,每条记录为字典,包含详细信息
     """
     table = "recent_records" if recent else "best_records"
-    logger = logging.getLogger(__name__)
     logger.info(f"[Record] → Reading records: table={table}, user_id={user_id}")
 
     conn = get_connection()
 
     try:
         with conn.cursor() as cursor:
-            cursor.execute(f"SELECT * FROM {table} WHERE user_id = %s", (user_id,))
+            cursor.execute(
+                f"SELECT {', '.join(DB_COLUMNS)} FROM {table} WHERE user_id = %s ORDER BY id",
+                (user_id,)
+            )
             rows = cursor.fetchall()
-            columns = [desc[0] for desc in cursor.description]
+    finally:
+        conn.close()
 
-        records = []
-        for row in rows:
-            item = dict(zip(columns, row))
-            item.pop("id", None)
-            item.pop("user_id", None)
-            records.append(item)
+    records = rows_to_records(rows, recent)
+    return get_detailed_info(records, USERS[user_id].get('version', "jp"), recent_type)
 
-        return get_detailed_info(records, USERS[user_id].get('version', "jp"), recent_type)
+_INSERT_COLUMNS = """
+    user_id, name, difficulty, type, achievement, dx_score, dx_max,
+    score_icon, combo_icon, sync_icon
+"""
 
-    finally:
-        conn.close()
+def _dedupe_records(record_json):
+    """同一谱面 (name, difficulty, type) 出现多次时保留达成率最高的一条，与唯一键保持一致"""
+    keys = set()
+    for entry in record_json:
+        key = (entry.get("name"), entry.get("difficulty"), entry.get("type"))
+        if key in keys:
+            return filter_highest_achievement(record_json)
+        keys.add(key)
+    return record_json
+
+def _diff_best_rows(stored_rows, incoming_rows, skipped_keys=frozenset()):
+    """
+    比较数据库中的 Best 成绩与本次抓取结果
+
+    Args:
+        stored_rows: (id, name, difficulty, type, achievement, ...) 数据库行
+        incoming_rows: records_to_db_rows 的结果
+        skipped_keys: records_to_db_rows 跳过的谱面键，数据库中的这些成绩保持不变（不删除）
+
+    Returns:
+        tuple: (需要写入的行, 需要删除的 id 列表, 需要记入历史的 (行, 原达成率) 列表, 变化统计)
+    """
+    stored = {row[1:4]: row for row in stored_rows}
+
+    upserts = []
+    history = []
+    changes = {"inserted": 0, "updated": 0, "improved": 0, "deleted": 0, "unchanged": 0, "skipped": len(skipped_keys)}
+
+    for row in incoming_rows:
+        key = row[1:4]
+        old = stored.pop(key, None)
+        if old is None:
+            upserts.append(row)
+            history.append((row, None))
+            changes["inserted"] += 1
+        elif tuple(old[4:]) != row[4:]:
+            upserts.append(row)
+            changes["updated"] += 1
+            if row[4] > old[4]:
+                changes["improved"] += 1
+            if _is_improvement(old, row):
+                history.append((row, old[4]))
+        else:
+            changes["unchanged"] += 1
+
+    deletes = [row[0] for key, row in stored.items() if key not in skipped_keys]
+    changes["deleted"] = len(deletes)
+
+    return upserts, deletes, history, changes
+
+def best_rows_changed(changes):
+    """Best 成绩变化统计中是否有写入或删除"""
+    return bool(changes) and (changes["inserted"] or changes["updated"] or changes["deleted"]) > 0
+
+def _is_improvement(old, row):
+    """达成率、DX 分数或任一图标提升（Best 记录的图标编码按等级递增）"""
+    return (
+        row[4] > old[4] or
+        (row[5] or 0) > (old[5] or 0) or
+        any(row[i] > old[i] for i in (7, 8, 9))
+    )
+
+def _append_score_history(cursor, user_id, history, incoming_rows):
+    """
+    在写入 Best 成绩的事务中追加成绩历史
+
+    用户还没有任何历史时，先把本次的全部成绩记为基准快照
+    """
+    try:
+        cursor.execute("SELECT 1 FROM score_history WHERE user_id = %s LIMIT 1", (user_id,))
+        if cursor.fetchone() is None:
+            history = [(row, None) for row in incoming_rows]
+            baseline = 1
+        else:
+            baseline = 0
+
+        if not history:
+            return 0
+
+        ts = datetime.now().replace(microsecond=0)
+        cursor.executemany(f"""
+        INSERT INTO score_history (ts, baseline, prev_achievement, {_INSERT_COLUMNS})
+        VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
+        """, [(ts, baseline, prev) + row for row, prev in history])
+        return len(history)
+
+    except Exception as e:
+        # 历史写入失败不影响成绩写入
+        logger.warning(f"[Record] ⚠ Score history append failed: user_id={user_id}, error={e}")
+        return 0
+
+def _write_best_rows(cursor, user_id, record_json):
+    """在调用方的事务中按差异写入 Best 成绩，返回变化统计"""
+    # 写入前统一转换为类型化列
+    incoming_rows, skipped_keys = records_to_db_rows(_dedupe_records(record_json), user_id)
+
+    # 锁定该用户的已有行，保证比较与写入之间数据不变
+    cursor.execute(
+        f"SELECT id, {', '.join(DB_COLUMNS)} FROM best_records WHERE user_id = %s FOR UPDATE",
+        (user_id,)
+    )
+    stored_rows = cursor.fetchall()
+
+    upserts, deletes, history, changes = _diff_best_rows(stored_rows, incoming_rows, skipped_keys)
+
+    if upserts:
+        cursor.executemany(f"""
+        INSERT INTO best_records ({_INSERT_COLUMNS})
+        VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
+        ON DUPLICATE KEY UPDATE
+            achievement = VALUES(achievement),
+            dx_score = VALUES(dx_score),
+            dx_max = VALUES(dx_max),
+            score_icon = VALUES(score_icon),
+            combo_icon = VALUES(combo_icon),
+            sync_icon = VALUES(sync_icon)
+        """, upserts)
+
+    if deletes:
+        cursor.executemany("DELETE FROM best_records WHERE id = %s", [(row_id,) for row_id in deletes])
+
+    # 提升过的成绩追加到历史表
+    _append_score_history(cursor, user_id, history, incoming_rows)
+
+    # Best 成绩变化后摘要失效，与成绩写入在同一事务中提交（提交后调用方需 release_user_summary）
+    if upserts or deletes:
+        invalidate_user_summary(user_id, cursor)
+
+    return changes
+
+def _replace_recent_rows(cursor, user_id, record_json):
+    """在调用方的事务中整体替换 Recent 记录，返回变化统计"""
+    batch_data, _ = records_to_db_rows(record_json, user_id)
+
+    deleted = cursor.execute("DELETE FROM recent_records WHERE user_id = %s", (user_id,))
+
+    # 优化：批量插入数据，减少数据库往返次数
+    if batch_data:
+        cursor.executemany(f"""
+        INSERT INTO recent_records ({_INSERT_COLUMNS})
+        VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
+        """, batch_data)
+
+    return {"inserted": len(batch_data), "updated": 0, "improved": 0, "deleted": deleted, "unchanged": 0}
+
+def _log_best_changes(user_id, changes):
+    logger.info(
+        f"[Record] ✓ Records diff applied: user_id={user_id}, inserted={changes['inserted']}, "
+        f"updated={changes['updated']}, improved={changes['improved']}, deleted={changes['deleted']}, "
+        f"unchanged={changes['unchanged']}, skipped={changes['skipped']}"
+    )
 
 def write_record(user_id, record_json, recent=False):
+    """
+    写入用户成绩记录
+
+    Best 记录按 (name, difficulty, type) 与已有数据比较，只写入新增和变化的行、删除消失的行；
+    Recent 记录为游玩历史，整体替换
+
+    Returns:
+        dict: 变化统计 {"inserted", "updated", "improved", "deleted", "unchanged"}
+    """
     table = "recent_records" if recent else "best_records"
     logger.info(f"[Record] → Writing records: table={table}, user_id={user_id}")
 
@@ -209,38 +236,74 @@ def write_record(user_id, record_json, recent=False):
 
     try:
         with conn.cursor() as cursor:
-            cursor.execute(f"DELETE FROM {table} WHERE user_id = %s", (user_id,))
+            if recent:
+                changes = _replace_recent_rows(cursor, user_id, record_json)
+            else:
+                changes = _write_best_rows(cursor, user_id, record_json)
+        conn.commit()
+    finally:
+        conn.close()
 
-            sql = f"""
-            INSERT INTO {table} (
-                user_id, name, difficulty, type, score, dx_score,
-                score_icon, combo_icon, sync_icon
-            ) VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s)
-            """
-
-            # 优化：批量插入数据，减少数据库往返次数
-            batch_data = [
-                (
-                    user_id,
-                    song.get("name"),
-                    song.get("difficulty"),
-                    song.get("type"),
-                    song.get("score"),
-                    song.get("dx_score"),
-                    song.get("score_icon"),
-                    song.get("combo_icon"),
-                    song.get("sync_icon"),
-                )
-                for song in record_json
-            ]
-
-            if batch_data:
-                cursor.executemany(sql, batch_data)
+    if not recent:
+        if best_rows_changed(changes):
+            release_user_summary(user_id)
+        _log_best_changes(user_id, changes)
+    return changes
 
+def write_records_batch(entries):
+    """
+    在一个事务中写入多个用户的成绩（批量更新使用）
+
+    整批写入失败时回滚，再逐个用户单独写入，失败的用户不影响其他用户
+
+    Args:
+        entries: [(user_id, Best 成绩或 None, Recent 记录或 None), ...]，None 表示不写入
+
+    Returns:
+        tuple: ({user_id: Best 变化统计或 None}, {user_id: 错误信息})
+    """
+    results = {}
+
+    conn = get_connection()
+
+    try:
+        with conn.cursor() as cursor:
+            for user_id, best, recent in entries:
+                results[user_id] = _write_best_rows(cursor, user_id, best) if best else None
+                if recent:
+                    _replace_recent_rows(cursor, user_id, recent)
         conn.commit()
+
+        for user_id, changes in results.items():
+            if changes is not None:
+                if best_rows_changed(changes):
+                    release_user_summary(user_id)
+                _log_best_changes(user_id, changes)
+        logger.info(f"[Record] ✓ Batch written: users={len(entries)}")
+        return results, {}
+
+    except Exception as e:
+        conn.rollback()
+        # 回滚前可能已有用户的摘要被标记失效，统一完成失效
+        for user_id, best, _ in entries:
+            if best:
+                release_user_summary(user_id)
+        logger.warning(f"[Record] ⚠ Batch write failed, retrying per user: users={len(entries)}, error={e}")
     finally:
         conn.close()
 
+    results = {}
+    failed = {}
+    for user_id, best, recent in entries:
+        try:
+            results[user_id] = write_record(user_id, best) if best else None
+            if recent:
+                write_record(user_id, recent, recent=True)
+        except Exception as e:
+            logger.error(f"[Record] ✗ Write failed: user_id={user_id}, error={e}")
+            failed[user_id] = str(e)
+    return results, failed
+
 def delete_record(user_id, recent=False):
     table = "recent_records" if recent else "best_records"
     logger.info(f"[Record] → Deleting records: table={table}, user_id={user_id}")
@@ -250,47 +313,142 @@ def delete_record(user_id, recent=False):
     try:
         with conn.cursor() as cursor:
             cursor.execute(f"DELETE FROM {table} WHERE user_id = %s", (user_id,))
+            if not recent:
+                cursor.execute("DELETE FROM score_history WHERE user_id = %s", (user_id,))
+                invalidate_user_summary(user_id, cursor)
         conn.commit()
     finally:
         conn.close()
 
+    if not recent:
+        release_user_summary(user_id)
+
+def has_best_records(user_id: str) -> bool:
+    """用户是否已有 Best 成绩"""
+    conn = get_connection()
+
+    try:
+        with conn.cursor() as cursor:
+            cursor.execute("SELECT 1 FROM best_records WHERE user_id = %s LIMIT 1", (user_id,))
+            return cursor.fetchone() is not None
+    finally:
+        conn.close()
+
+def get_recent_improvements(user_id: str, limit: int = 20, since: Optional[datetime] = None) -> List[Dict[str, Any]]:
+    """
+    读取最近的成绩提升记录（不含首次记录的基准快照）
+
+    Args:
+        user_id: 用户ID
+        limit: 最多返回条数
+        since: 只返回该时间之后的记录（可选）
+
+    Returns:
+        成绩字典列表（新到旧），附带 ts 与 prev_score（首次游玩时为 None）
+    """
+    sql = f"""
+    SELECT ts, prev_achievement, {', '.join(DB_COLUMNS)}
+    FROM score_history
+    WHERE user_id = %s AND baseline = 0{" AND ts >= %s" if since else ""}
+    ORDER BY ts DESC, id DESC
+    LIMIT %s
+    """
+    params = (user_id, since, limit) if since else (user_id, limit)
+
+    conn = get_connection()
+
+    try:
+        with conn.cursor() as cursor:
+            cursor.execute(sql, params)
+            rows = cursor.fetchall()
+    finally:
+        conn.close()
+
+    records = rows_to_records([row[2:] for row in rows])
+    for record, row in zip(records, rows):
+        record['ts'] = row[0].strftime("%Y-%m-%d %H:%M:%S")
+        record['prev_score'] = format_achievement(float(row[1])) if row[1] is not None else None
+
+    return get_detailed_info(records, USERS[user_id].get('version', "jp"))
+
+def get_rating_history(user_id: str) -> List[Dict[str, Any]]:
+    """
+    由成绩历史重放出每次更新后的 Rating（b50 方案）
+
+    只读取 score_history，按更新批次累积各谱面的最新成绩；
+    定数和新旧曲划分使用当前的歌曲目录
+
+    Args:
+        user_id: 用户ID
+
+    Returns:
+        [{"ts": "YYYY-mm-dd HH:MM:SS", "rating": int}, ...]，按时间升序
+    """
+    conn = get_connection()
+
+    try:
+        with conn.cursor() as cursor:
+            cursor.execute(f"""
+            SELECT ts, {', '.join(DB_COLUMNS)}
+            FROM score_history
+            WHERE user_id = %s
+            ORDER BY ts, id
+            """, (user_id,))
+            rows = cursor.fetchall()
+    finally:
+        conn.close()
+
+    if not rows:
+        return []
+
+    # 一次性补全并批量计算每条历史记录的 Rating
+    records = get_detailed_info(
+        rows_to_records([row[1:] for row in rows]),
+        USERS[user_id].get('version', "jp")
+    )
+
+    old_best, new_best = {}, {}
+    history = []
+    for i, (row, record) in enumerate(zip(rows, records)):
+        if record['version'] != "UNKNOWN":
+            key = (record['name'], record['difficulty'], record['type'])
+            (new_best if record['new_song'] else old_best)[key] = record['ra']
+
+        # 同一批次的最后一行之后计算该批次的 Rating
+        if i + 1 == len(rows) or rows[i + 1][0] != row[0]:
+            rating = sum(heapq.nlargest(35, old_best.values())) + sum(heapq.nlargest(15, new_best.values()))
+            history.append({"ts": row[0].strftime("%Y-%m-%d %H:%M:%S"), "rating": rating})
+
+    return history
+
 def filter_highest_achievement(data: list) -> list:
     result = {}
     for entry in data:
         key = (entry.get("name"), entry.get("difficulty"), entry.get("type"))
-        if key not in result or float(entry.get("score", "0")[:-1]) > float(result[key].get("score", "0")[:-1]):
+        if key not in result or parse_achievement(entry.get("score", "0")) > parse_achievement(result[key].get("score", "0")):
             result[key] = entry
     return list(result.values())
 
 def get_detailed_info(song_record, ver="jp", recent_type=False):
-    read_dxdata(ver)
-
-    # 构建哈希表加速查找 O(1) 而不是 O(n)
-    song_map = {}
-    for song in SONGS:
-        key = (song['title'], song['type'])
-        if key not in song_map:
-            song_map[key] = song
+    # 谱面索引随歌曲目录快照一同构建，这里只做字典查找
+    chart_index = get_song_catalog(ver).chart_index
+    ap_bonus = (ver == "jp")
 
+    found_records = []
     for record in song_record:
-        found = False
-        key = (record['name'], record['type'])
-
-        if key in song_map:
-            song = song_map[key]
-            for sheet in song['sheets']:
-                if record['difficulty'] == sheet['difficulty']:
-                    found = True
-                    record['internalLevelValue'] = sheet['internalLevelValue']
-                    record['new_song'] = True if song['version'] in MAIMAI_VERSION[ver] else False
-                    record['version'] = song['version']
-                    ap_clear = "ap" in record['combo_icon']
-                    record['ra'] = get_single_ra(float(record['internalLevelValue']), float(record['score'][:-1]), (ap_clear and ver == "jp"), recent_type)
-                    record['cover_url'] = song['cover_url']
-                    record['cover_name'] = song['cover_name']
-                    break
-
-        if not found:
+        add_typed_fields(record)
+        chart = chart_index.get((record['name'], record['type'], record['difficulty']))
+
+        if chart is not None:
+            internal_level, version, new_song, cover_url, cover_name = chart
+            record['internalLevelValue'] = internal_level
+            record['new_song'] = new_song
+            record['version'] = version
+            record['ra'] = 0  # 稍后批量计算
+            record['cover_url'] = cover_url
+            record['cover_name'] = cover_name
+            found_records.append(record)
+        else:
             record['internalLevelValue'] = 0
             record['new_song'] = True
             record['version'] = "UNKNOWN"
@@ -298,4 +456,15 @@ def get_detailed_info(song_record, ver="jp", recent_type=False):
             record['cover_url'] = None
             record['cover_name'] = "UNKNOWN"
 
+    # 批量计算 Rating
+    if found_records:
+        ras = calc_ra_array(
+            [record['internalLevelValue'] for record in found_records],
+            [record['achievement'] for record in found_records],
+            [ap_bonus and "ap" in record['combo_icon'] for record in found_records],
+            recent_type
+        )
+        for record, ra in zip(found_records, ras.tolist()):
+            record['ra'] = ra
+
     return song_record
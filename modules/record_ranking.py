@@ -0,0 +1,132 @@
+"""
+成绩排行模块
+
+best-N 类表格只需要前 15～200 条成绩，这里用 heapq.nlargest 做部分排序代替整表排序。
+同一批成绩的各个范围（旧曲 / 新曲 / 全部）只各计算一次最大所需长度的前 K 条，
+best50 / best100 / allb200 等表格直接从中截取
+"""
+
+import heapq
+from operator import itemgetter
+
+_ra_key = itemgetter('ra')
+
+# 各范围最多需要的条数（best100 旧曲 70 条、新曲 30 条，allb200 共 200 条）
+MAX_TOP = {"old": 70, "new": 30, "all": 200}
+
+# best 表格: 类型 -> (旧曲条数, 新曲条数)
+BEST_LIMITS = {
+    "best50": (35, 15),
+    "best40": (25, 15),
+    "best100": (70, 30),
+    "best35": (35, 0),
+    "best15": (0, 15),
+}
+
+# 按图标筛选的 best 表格: 类型 -> (字段, 计入的图标)，条数同 best50
+FILTERED_LIMITS = {
+    "apb50": ("combo_icon", ("ap", "app")),
+    "fdxb50": ("sync_icon", ("fdx", "fdxp")),
+}
+
+# 不区分新旧曲的表格: 类型 -> 条数
+ALL_LIMITS = {
+    "allb35": 35,
+    "allb50": 50,
+    "allb100": 100,
+    "allb200": 200,
+}
+
+
+def top_by_ra(records, n):
+    """
+    按 Rating 降序取前 n 条
+
+    与 sorted(records, key=lambda x: -x['ra'])[:n] 结果一致，Rating 相同时保持原有顺序
+    """
+    if n <= 0:
+        return []
+    return heapq.nlargest(n, records, key=_ra_key)
+
+
+class RecordRanking:
+    """
+    一组成绩的部分排序结果
+
+    首次取某个范围时一次遍历完成新旧曲划分，并按 MAX_TOP 计算该范围的前 K 条，
+    之后同一范围的各种长度都从缓存的结果中截取
+    """
+
+    # _tops: 范围 -> (K, 前 K 条)；_filtered: FILTERED_LIMITS 类型 -> 筛选后的 RecordRanking
+    __slots__ = ("records", "old_songs", "new_songs", "_tops", "_filtered")
+
+    def __init__(self, records):
+        self.records = records
+
+        old_songs, new_songs = [], []
+        for record in records:
+            (new_songs if record['new_song'] else old_songs).append(record)
+        self.old_songs = old_songs
+        self.new_songs = new_songs
+
+        self._tops = {}
+        self._filtered = {}
+
+    def _scope_records(self, scope):
+        if scope == "old":
+            return self.old_songs
+        if scope == "new":
+            return self.new_songs
+        return self.records
+
+    def top(self, scope, n):
+        """
+        取指定范围 Rating 前 n 条
+
+        Args:
+            scope: old / new / all
+            n: 条数
+
+        Returns:
+            list: 按 Rating 降序的成绩列表
+        """
+        cached = self._tops.get(scope)
+        if cached is None or cached[0] < n:
+            k = max(n, MAX_TOP[scope])
+            cached = (k, top_by_ra(self._scope_records(scope), k))
+            self._tops[scope] = cached
+        return cached[1][:n]
+
+    def best(self, type):
+        """
+        取 best 表格的旧曲 / 新曲部分
+
+        Returns:
+            tuple: (旧曲列表, 新曲列表)
+        """
+        old_limit, new_limit = BEST_LIMITS[type]
+        return self.top("old", old_limit), self.top("new", new_limit)
+
+    def filtered(self, type):
+        """FILTERED_LIMITS 表格对应的筛选结果（同样缓存部分排序）"""
+        ranking = self._filtered.get(type)
+        if ranking is None:
+            field, icons = FILTERED_LIMITS[type]
+            ranking = RecordRanking([record for record in self.records if record.get(field) in icons])
+            self._filtered[type] = ranking
+        return ranking
+
+    def select(self, type):
+        """
+        取 BEST_LIMITS / ALL_LIMITS / FILTERED_LIMITS 中的表格
+
+        Returns:
+            tuple: (旧曲列表, 新曲列表)，不支持该类型时返回 None
+        """
+        if type in BEST_LIMITS:
+            return self.best(type)
+        if type in ALL_LIMITS:
+            return self.top("all", ALL_LIMITS[type]), []
+        if type in FILTERED_LIMITS:
+            return self.filtered(type).best("best50")
+        return None
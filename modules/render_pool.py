@@ -0,0 +1,149 @@
+"""
+出图进程池模块
+
+大量缩略图（allb200、等级列表等）在常驻的进程池中并行绘制，不再受 GIL 限制。
+进程池在启动 worker 线程之前创建并预热（fork 时进程中还没有其他线程），
+子进程继承已加载的字体和图标图集（主进程未载入图集时才在子进程中载入）。
+
+每个子进程有自己的封面缓存和文字排版缓存。主进程的缓存容量按进程数平分给子进程，
+因此封面缓存合计约为 cover_cache_mb × 2（主进程一份 + 全部子进程一份），文字排版缓存同理。
+
+进程池不可用（未启动或子进程异常退出）时 get_render_pool 返回 None，调用方改为在当前线程绘制
+"""
+
+import atexit
+import logging
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+from modules.config_loader import COVER_CACHE_MAX_BYTES
+from modules.image_cache import cover_cache, get_icon_atlas_stats, preload_icon_atlas
+from modules.image_manager import TEXT_LAYOUT_CACHE_MAX_ENTRIES, set_text_layout_cache_limit
+
+logger = logging.getLogger(__name__)
+
+# 进程数（保留一个核心给主进程）
+RENDER_POOL_WORKERS = max(1, (os.cpu_count() or 1) - 1)
+
+# 需要绘制的缩略图少于该数量时直接在当前线程绘制（进程间传输的开销更大）
+RENDER_POOL_MIN_TILES = 20
+
+_pool = None
+_pool_lock = threading.Lock()
+_pool_stats = {"batches": 0, "tiles": 0, "failures": 0}
+_pool_workers = RENDER_POOL_WORKERS
+
+
+def _worker_cache_budgets(workers):
+    """每个子进程的 (封面缓存字节数, 文字排版缓存条数)"""
+    return COVER_CACHE_MAX_BYTES // workers, max(1, TEXT_LAYOUT_CACHE_MAX_ENTRIES // workers)
+
+
+def _init_worker(cover_cache_bytes, text_layout_entries):
+    """子进程初始化：按分配的容量重置继承的缓存，图集未继承时载入"""
+    cover_cache.reset(cover_cache_bytes)
+    set_text_layout_cache_limit(text_layout_entries)
+    if not get_icon_atlas_stats()["icons"]:
+        preload_icon_atlas()
+
+
+def _warmup():
+    return os.getpid()
+
+
+def start_render_pool(workers=RENDER_POOL_WORKERS):
+    """
+    创建并预热进程池（在启动其他线程之前调用）
+
+    Args:
+        workers: 进程数
+
+    Returns:
+        bool: 是否启动成功
+    """
+    global _pool, _pool_workers
+    with _pool_lock:
+        if _pool is not None:
+            return True
+        try:
+            pool = ProcessPoolExecutor(
+                max_workers=workers,
+                mp_context=multiprocessing.get_context("fork"),
+                initializer=_init_worker,
+                initargs=_worker_cache_budgets(workers)
+            )
+            # fork 方式下首次提交时一次性创建全部子进程
+            pool.submit(_warmup).result(timeout=60)
+        except Exception as e:
+            logger.error(f"[RenderPool] ✗ Failed to start: error={e}")
+            return False
+        _pool = pool
+        _pool_workers = workers
+
+    cover_cache_bytes, text_layout_entries = _worker_cache_budgets(workers)
+    logger.info(
+        f"[RenderPool] ✓ Started: workers={workers}, worker_cover_cache_bytes={cover_cache_bytes}, "
+        f"worker_text_layout_entries={text_layout_entries}"
+    )
+    return True
+
+
+def get_render_pool():
+    """返回进程池，未启动或已不可用时返回 None"""
+    return _pool
+
+
+def run_in_pool(func, items, chunksize=1):
+    """
+    在进程池中按顺序对 items 执行 func
+
+    Returns:
+        list or None: 结果列表；进程池不可用时返回 None（调用方自行在当前线程处理）
+    """
+    global _pool
+    pool = _pool
+    if pool is None:
+        return None
+
+    try:
+        results = list(pool.map(func, items, chunksize=chunksize))
+    except BrokenProcessPool as e:
+        # 子进程异常退出：停用进程池（多线程环境下不重新 fork）
+        with _pool_lock:
+            if _pool is pool:
+                _pool = None
+            _pool_stats["failures"] += 1
+        logger.error(f"[RenderPool] ✗ Pool broken, falling back to in-process rendering: error={e}")
+        pool.shutdown(wait=False, cancel_futures=True)
+        return None
+
+    with _pool_lock:
+        _pool_stats["batches"] += 1
+        _pool_stats["tiles"] += len(results)
+    return results
+
+
+def get_render_pool_stats():
+    """进程池统计 {"workers", "running", "batches", "tiles", "failures", "worker_cover_cache_bytes"}"""
+    with _pool_lock:
+        return dict(
+            _pool_stats,
+            workers=_pool_workers,
+            running=_pool is not None,
+            worker_cover_cache_bytes=_worker_cache_budgets(_pool_workers)[0]
+        )
+
+
+def shutdown_render_pool():
+    """关闭进程池（进程退出时调用）"""
+    global _pool
+    with _pool_lock:
+        pool, _pool = _pool, None
+    if pool is not None:
+        pool.shutdown(wait=False, cancel_futures=True)
+
+
+atexit.register(shutdown_render_pool)
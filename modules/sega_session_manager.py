@@ -0,0 +1,259 @@
+"""
+SEGA 连接池模块
+
+所有 SEGA 相关的异步请求都在一个常驻的后台事件循环中执行，
+工作线程通过 run_coroutine_threadsafe 提交协程，同时运行的任务数受全局上限约束。
+每个服务器区域 (jp / intl) 共享一个长期存在的 TCPConnector，复用 TLS 会话、DNS 缓存和 keep-alive 连接；
+每次请求仍创建独立的 ClientSession（不拥有连接器），用户之间的 cookie jar 互不共享
+
+检测到服务器维护（503）后，该区域在 SEGA_MAINTENANCE_HOLD 秒内的新请求直接按维护处理，不再访问网络
+"""
+
+import asyncio
+import atexit
+import concurrent.futures
+import contextlib
+import logging
+import threading
+import time
+
+import aiohttp
+
+logger = logging.getLogger(__name__)
+
+# 事件循环中同时运行的 SEGA 任务上限（超出的任务在循环内排队）
+SEGA_MAX_CONCURRENT_JOBS = 16
+
+# 各区域连接池参数
+CONNECTOR_LIMIT = 50            # 每个区域的最大连接数
+CONNECTOR_LIMIT_PER_HOST = 20   # 每个主机的最大连接数
+DNS_CACHE_TTL = 300             # DNS 缓存时间（秒）
+KEEPALIVE_TIMEOUT = 30          # 空闲连接保留时间（秒）
+
+# 检测到维护后，该区域直接按维护处理的时间（秒），期满后的第一个请求重新探测
+SEGA_MAINTENANCE_HOLD = 300
+
+_loop = None
+_loop_thread = None
+_loop_lock = threading.Lock()
+
+# 全局并发上限，以及运行中 / 排队中的任务数（只在事件循环线程中修改）
+_job_semaphore = None
+_job_stats = {"running": 0, "waiting": 0, "completed": 0}
+
+# 区域 -> TCPConnector，只在后台事件循环中创建和使用
+_connectors = {}
+
+# 区域 -> 维护状态截止时间（time.time()）
+_maintenance_until = {}
+_maintenance_lock = threading.Lock()
+
+
+def _run_loop(loop, ready):
+    asyncio.set_event_loop(loop)
+    ready.set()
+    loop.run_forever()
+
+
+def get_sega_loop():
+    """
+    获取常驻的后台事件循环，首次调用时启动事件循环线程
+
+    Returns:
+        asyncio.AbstractEventLoop
+    """
+    global _loop, _loop_thread, _job_semaphore
+    if _loop is not None:
+        return _loop
+
+    with _loop_lock:
+        if _loop is None:
+            loop = asyncio.new_event_loop()
+            _job_semaphore = asyncio.Semaphore(SEGA_MAX_CONCURRENT_JOBS)
+            ready = threading.Event()
+            thread = threading.Thread(target=_run_loop, args=(loop, ready), daemon=True, name="SegaEventLoop")
+            thread.start()
+            ready.wait()
+            _loop_thread = thread
+            _loop = loop
+            logger.info(f"[SegaSession] ✓ Event loop started: max_jobs={SEGA_MAX_CONCURRENT_JOBS}")
+
+    return _loop
+
+
+@contextlib.asynccontextmanager
+async def sega_job_slot():
+    """
+    占用一个全局并发名额（只能在后台事件循环中使用）
+
+    由不计入上限的调度协程（如批量更新）发起的每个抓取都应在此名额内运行
+    """
+    _job_stats["waiting"] += 1
+    acquired = False
+    try:
+        await _job_semaphore.acquire()
+        acquired = True
+        _job_stats["waiting"] -= 1
+        _job_stats["running"] += 1
+        yield
+    finally:
+        if acquired:
+            _job_stats["running"] -= 1
+            _job_stats["completed"] += 1
+            _job_semaphore.release()
+        else:
+            _job_stats["waiting"] -= 1
+
+
+async def _run_job(coro):
+    """在全局并发上限内运行一个任务"""
+    started = False
+    try:
+        async with sega_job_slot():
+            started = True
+            return await coro
+    finally:
+        if not started:
+            coro.close()
+
+
+def submit_sega_coroutine(coro, limited=True):
+    """
+    将协程提交到后台事件循环，不等待结果
+
+    Args:
+        coro: 协程对象
+        limited: 是否计入全局并发上限；调度协程传 False，并自行用 sega_job_slot 限制其中的抓取
+
+    Returns:
+        concurrent.futures.Future
+    """
+    return asyncio.run_coroutine_threadsafe(_run_job(coro) if limited else coro, get_sega_loop())
+
+
+def run_sega_coroutine(coro, timeout=None):
+    """
+    在后台事件循环中执行协程并等待结果（供同步代码调用，替代 asyncio.run）
+
+    Args:
+        coro: 协程对象
+        timeout: 超时秒数（含排队时间），None 表示不限制；超时后任务被取消
+
+    Returns:
+        协程的返回值
+    """
+    future = submit_sega_coroutine(coro)
+    try:
+        return future.result(timeout)
+    except concurrent.futures.TimeoutError:
+        future.cancel()
+        logger.warning(f"[SegaSession] ⚠ Job timed out: timeout={timeout}s")
+        raise
+
+
+def get_sega_job_stats():
+    """返回后台事件循环的任务统计 {"running", "waiting", "completed", "limit"}"""
+    return dict(_job_stats, limit=SEGA_MAX_CONCURRENT_JOBS)
+
+
+def mark_sega_maintenance(ver="jp", hold=SEGA_MAINTENANCE_HOLD):
+    """
+    记录区域进入维护，hold 秒内的新请求直接返回维护
+
+    Args:
+        ver: 服务器版本 (jp/intl)
+        hold: 保持秒数
+    """
+    region = "intl" if ver == "intl" else "jp"
+    until = time.time() + hold
+    with _maintenance_lock:
+        extended = region in _maintenance_until and _maintenance_until[region] > time.time()
+        _maintenance_until[region] = max(until, _maintenance_until.get(region, 0.0))
+    if not extended:
+        logger.warning(f"[SegaSession] ⚠ Maintenance detected, failing fast: region={region}, hold={hold}s")
+
+
+def is_sega_maintenance(ver="jp"):
+    """区域是否处于已记录的维护期内"""
+    region = "intl" if ver == "intl" else "jp"
+    with _maintenance_lock:
+        until = _maintenance_until.get(region)
+        if until is None:
+            return False
+        if until > time.time():
+            return True
+        del _maintenance_until[region]
+    return False
+
+
+def get_sega_maintenance():
+    """各区域维护状态剩余秒数 {region: seconds}（不在维护期的区域不包含）"""
+    now = time.time()
+    with _maintenance_lock:
+        return {region: round(until - now) for region, until in _maintenance_until.items() if until > now}
+
+
+def _get_connector(ver):
+    """获取区域共享连接器，不在后台事件循环中时返回 None"""
+    try:
+        running_loop = asyncio.get_running_loop()
+    except RuntimeError:
+        return None
+    if running_loop is not _loop:
+        return None
+
+    region = "intl" if ver == "intl" else "jp"
+    connector = _connectors.get(region)
+    if connector is None or connector.closed:
+        connector = aiohttp.TCPConnector(
+            ssl=False,
+            limit=CONNECTOR_LIMIT,
+            limit_per_host=CONNECTOR_LIMIT_PER_HOST,
+            ttl_dns_cache=DNS_CACHE_TTL,
+            keepalive_timeout=KEEPALIVE_TIMEOUT
+        )
+        _connectors[region] = connector
+        logger.info(f"[SegaSession] ✓ Connector created: region={region}")
+    return connector
+
+
+def sega_session(ver="jp", cookies=None, timeout=None):
+    """
+    创建使用区域共享连接池的 ClientSession
+
+    会话拥有独立的 cookie jar，关闭会话不会关闭共享连接；
+    在后台事件循环之外调用时退化为使用独立连接器
+
+    Args:
+        ver: 服务器版本 (jp/intl)
+        cookies: 初始 cookies（登录后得到的 cookies）
+        timeout: aiohttp.ClientTimeout（可选）
+
+    Returns:
+        aiohttp.ClientSession: 需以 async with 使用
+    """
+    kwargs = {"timeout": timeout} if timeout is not None else {}
+    connector = _get_connector(ver)
+    if connector is None:
+        return aiohttp.ClientSession(cookies=cookies, connector=aiohttp.TCPConnector(ssl=False), **kwargs)
+    return aiohttp.ClientSession(cookies=cookies, connector=connector, connector_owner=False, **kwargs)
+
+
+async def _close_connectors():
+    for region, connector in list(_connectors.items()):
+        await connector.close()
+        _connectors.pop(region, None)
+
+
+def close_sega_sessions():
+    """关闭所有区域连接池（进程退出时调用）"""
+    if _loop is None or not _loop.is_running():
+        return
+    try:
+        asyncio.run_coroutine_threadsafe(_close_connectors(), _loop).result(5)
+        logger.info("[SegaSession] ✓ Connectors closed")
+    except Exception as e:
+        logger.warning(f"[SegaSession] ⚠ Failed to close connectors: error={e}")
+
+
+atexit.register(close_sega_sessions)
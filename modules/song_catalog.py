@@ -0,0 +1,182 @@
+"""
+歌曲目录模块
+
+按 (服务器版本, dxdata 文件 mtime) 构建一次只读的歌曲数据快照，
+jp / intl 两份快照整体原子替换，请求处理时无需重复解析 dxdata.json
+"""
+
+import csv
+import json
+import logging
+import os
+import threading
+
+from modules.config_loader import DXDATA_LIST, OVERRIDE_LIST, MAIMAI_VERSION
+
+logger = logging.getLogger(__name__)
+
+
+class SongCatalog:
+    """
+    歌曲目录快照
+
+    songs / versions 为元组，快照构建完成后不再变化；
+    其中的歌曲字典在所有请求间共享，调用方只能读取，不得修改
+
+    chart_index: (title, type, difficulty) ->
+        (internalLevelValue, version, new_song, cover_url, cover_name)
+    """
+
+    __slots__ = ("ver", "mtime", "songs", "versions", "songs_by_id", "chart_index")
+
+    def __init__(self, ver, mtime, songs, versions):
+        self.ver = ver
+        self.mtime = mtime
+        self.songs = tuple(songs)
+        self.versions = tuple(versions)
+
+        # 与原先线性查找保持一致：重复 ID 时保留第一个
+        songs_by_id = {}
+        for song in self.songs:
+            songs_by_id.setdefault(song.get('id'), song)
+        self.songs_by_id = songs_by_id
+
+        self.chart_index = self._build_chart_index()
+
+    def get_song_by_id(self, song_id):
+        """通过歌曲唯一ID获取歌曲，不存在时返回 None"""
+        return self.songs_by_id.get(song_id)
+
+    def _build_chart_index(self):
+        """构建成绩补全用的谱面索引"""
+        new_versions = MAIMAI_VERSION.get(self.ver, [])
+        seen_songs = set()
+        chart_index = {}
+
+        for song in self.songs:
+            # 同名同类型的歌曲只取第一首，与按 (title, type) 建表的旧逻辑一致
+            song_key = (song['title'], song['type'])
+            if song_key in seen_songs:
+                continue
+            seen_songs.add(song_key)
+
+            chart = (song['version'] in new_versions, song['cover_url'], song['cover_name'])
+            for sheet in song['sheets']:
+                key = (song['title'], song['type'], sheet['difficulty'])
+                if key not in chart_index:
+                    chart_index[key] = (sheet['internalLevelValue'], song['version']) + chart
+
+        return chart_index
+
+
+# 当前快照 {"jp": SongCatalog, "intl": SongCatalog}，整体替换而非原地修改
+_catalogs = {}
+_catalog_lock = threading.Lock()
+
+
+def _apply_intl_override(songs):
+    """按 intl_override.csv 修补国际服数据（原地修改传入的歌曲列表）"""
+    if not os.path.exists(OVERRIDE_LIST):
+        logger.warning(f"[Catalog] ⚠ Override list not found: path={OVERRIDE_LIST}")
+        return
+
+    def is_int(s):
+        return s.isdigit()
+
+    csv_map = {}
+    with open(OVERRIDE_LIST, 'r', encoding='utf-8') as f:
+        for row in csv.reader(f):
+            if row:
+                csv_map[row[0]] = row[1:]
+
+    for song in songs:
+        if song['title'] not in csv_map:
+            continue
+        if song['type'] != csv_map[song['title']][0]:
+            continue
+        row = csv_map[song['title']][1:]
+        *keys, value = row
+        cur = song
+        for k in keys[:-1]:
+            if is_int(k):
+                k = int(k)
+                while len(cur) <= k:
+                    cur.append({})
+                cur = cur[k]
+            else:
+                cur = cur.setdefault(k, {})
+        last = keys[-1]
+        if is_int(last):
+            last = int(last)
+            while len(cur) <= last:
+                cur.append(None)
+            cur[last] = value
+        else:
+            cur[last] = value
+
+
+def _build_catalogs():
+    """从磁盘构建 jp / intl 两份快照"""
+    mtime = os.path.getmtime(DXDATA_LIST)
+    with open(DXDATA_LIST, 'r', encoding='utf-8') as f:
+        raw = f.read()
+
+    # 分别解析两次，保证 intl 的修补不会影响 jp 快照
+    jp_data = json.loads(raw)
+    intl_data = json.loads(raw)
+    _apply_intl_override(intl_data['songs'])
+
+    return {
+        "jp": SongCatalog("jp", mtime, jp_data['songs'], jp_data['versions']),
+        "intl": SongCatalog("intl", mtime, intl_data['songs'], intl_data['versions'])
+    }
+
+
+def get_song_catalog(ver="jp"):
+    """
+    获取指定服务器版本的歌曲目录快照
+
+    首次调用时从磁盘构建，之后直接返回内存中的快照
+
+    Args:
+        ver: 服务器版本 (jp/intl)，未知版本按 jp 处理
+
+    Returns:
+        SongCatalog: 只读快照
+    """
+    global _catalogs
+    catalogs = _catalogs
+    if not catalogs:
+        with _catalog_lock:
+            if not _catalogs:
+                _catalogs = _build_catalogs()
+                logger.info(f"[Catalog] ✓ Loaded: songs={len(_catalogs['jp'].songs)}, versions={len(_catalogs['jp'].versions)}")
+            catalogs = _catalogs
+
+    return catalogs.get(ver, catalogs["jp"])
+
+
+def reload_song_catalog(force=False):
+    """
+    dxdata.json 更新后重新构建快照
+
+    文件 mtime 未变化时不重复构建；新快照构建完成后才替换旧快照，
+    正在使用旧快照的请求不受影响
+
+    Args:
+        force: 忽略 mtime 强制重建
+
+    Returns:
+        bool: 是否发生了重建
+    """
+    global _catalogs
+    with _catalog_lock:
+        current = _catalogs
+        if not force and current and current["jp"].mtime == os.path.getmtime(DXDATA_LIST):
+            return False
+
+        catalogs = _build_catalogs()
+        _catalogs = catalogs
+
+    logger.info(f"[Catalog] ✓ Reloaded: songs={len(catalogs['jp'].songs)}, versions={len(catalogs['jp'].versions)}")
+    return True
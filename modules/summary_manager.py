@@ -0,0 +1,362 @@
+"""
+用户成绩摘要模块
+
+maimai_update 写入成绩后生成物化摘要（新旧曲 best 列表、总 Rating、平均值、
+按版本 / 定数的完成度统计），保存在 user_summary 表并在内存中缓存少量最近使用的摘要。
+Best 成绩写入时摘要失效；服务器版本或歌曲目录变化时摘要视为过期
+
+未进入摘要的表格（best40 / apb50 / fdxb50）使用按用户缓存的 RecordRanking，
+与摘要一同按失效代数失效，同一用户连续查询不同表格时共享新旧曲划分与部分排序结果
+
+每个用户有一个失效代数，Best 成绩写入前后各递增一次。生成摘要前记下代数，
+保存时代数已变化说明期间有成绩写入，该摘要基于旧成绩，不写入缓存
+"""
+
+import json
+import logging
+import threading
+from collections import OrderedDict
+from datetime import datetime
+
+from modules.dbpool_manager import get_connection
+from modules.record_ranking import RecordRanking, MAX_TOP, BEST_LIMITS, ALL_LIMITS, FILTERED_LIMITS
+from modules.song_catalog import get_song_catalog
+
+logger = logging.getLogger(__name__)
+
+# 摘要结构版本，结构变化时递增，旧摘要自动视为过期
+SUMMARY_VERSION = 1
+
+# 内存中最多缓存的摘要数量
+MEMORY_CACHE_SIZE = 64
+
+_memory_cache = OrderedDict()
+_memory_lock = threading.Lock()
+
+# user_id -> 失效代数
+_generations = {}
+
+# (user_id, recent_type) -> (失效代数, ver, catalog_mtime, RecordRanking)
+_ranking_cache = OrderedDict()
+
+# 可直接由摘要提供的表格类型（best40 使用 b40 计算方案，不在摘要中）
+SUMMARY_TYPES = frozenset(
+    [type for type in BEST_LIMITS if type != "best40"] + list(ALL_LIMITS)
+)
+
+# 由缓存的 RecordRanking 提供的表格类型
+RANKING_TYPES = frozenset(["best40"] + list(FILTERED_LIMITS))
+
+# 完成度统计中计为鸟加 / AP 的图标
+_SSS_ICONS = ("sss", "sssp")
+_AP_ICONS = ("ap", "app")
+
+
+def _average(records, key):
+    return round(sum(record[key] for record in records) / len(records), 4) if records else 0
+
+
+def _count_completion(counters, key, record):
+    counter = counters.setdefault(key, {"played": 0, "sss": 0, "ap": 0})
+    counter["played"] += 1
+    if record.get('score_icon') in _SSS_ICONS:
+        counter["sss"] += 1
+    if record.get('combo_icon') in _AP_ICONS:
+        counter["ap"] += 1
+
+
+def build_user_summary(records, ver="jp", ranking=None):
+    """
+    由补全后的 Best 成绩生成摘要
+
+    Args:
+        records: read_record 返回的成绩列表
+        ver: 服务器版本
+        ranking: 可选，records 的 RecordRanking（复用已计算的排序结果）
+
+    Returns:
+        dict: 摘要
+    """
+    if ranking is None:
+        ranking = RecordRanking(records)
+    old_b50, new_b50 = ranking.best("best50")
+
+    versions = {}
+    levels = {}
+    for record in records:
+        _count_completion(versions, record['version'], record)
+        _count_completion(levels, f"{record['internalLevelValue']:.1f}", record)
+
+    return {
+        "summary_version": SUMMARY_VERSION,
+        "ver": ver,
+        "catalog_mtime": get_song_catalog(ver).mtime,
+        "updated_at": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+        "record_count": len(records),
+        "rating": sum(record['ra'] for record in old_b50) + sum(record['ra'] for record in new_b50),
+        "averages": {
+            scope: {
+                "ra": _average(songs, 'ra'),
+                "level": _average(songs, 'internalLevelValue'),
+                "achievement": _average(songs, 'achievement')
+            }
+            for scope, songs in (("old", old_b50), ("new", new_b50))
+        },
+        "old_top": ranking.top("old", MAX_TOP["old"]),
+        "new_top": ranking.top("new", MAX_TOP["new"]),
+        "all_top": ranking.top("all", MAX_TOP["all"]),
+        "versions": versions,
+        "levels": levels,
+    }
+
+
+def select_summary_records(summary, type):
+    """
+    从摘要中取出 best / allb 表格，与 select_records 的结果一致
+
+    Returns:
+        tuple: (旧曲列表, 新曲列表)，摘要不支持该类型时返回 None
+    """
+    if type not in SUMMARY_TYPES:
+        return None
+    if type in BEST_LIMITS:
+        old_limit, new_limit = BEST_LIMITS[type]
+        return _copy_records(summary["old_top"][:old_limit]), _copy_records(summary["new_top"][:new_limit])
+    return _copy_records(summary["all_top"][:ALL_LIMITS[type]]), []
+
+
+def _copy_records(records):
+    # 摘要在内存中共享，返回副本避免调用方修改缓存
+    return [dict(record) for record in records]
+
+
+def summary_generation(user_id):
+    """当前失效代数（生成摘要前读取，传给 refresh_user_summary）"""
+    with _memory_lock:
+        return _generations.get(user_id, 0)
+
+
+def _cache_put(user_id, summary, generation=None):
+    """写入内存缓存，代数已变化时不写入并返回 False"""
+    with _memory_lock:
+        if generation is not None and _generations.get(user_id, 0) != generation:
+            return False
+        _memory_cache[user_id] = summary
+        _memory_cache.move_to_end(user_id)
+        while len(_memory_cache) > MEMORY_CACHE_SIZE:
+            _memory_cache.popitem(last=False)
+    return True
+
+
+def _bump_generation(user_id):
+    with _memory_lock:
+        _generations[user_id] = _generations.get(user_id, 0) + 1
+        _memory_cache.pop(user_id, None)
+        for recent_type in (False, True):
+            _ranking_cache.pop((user_id, recent_type), None)
+
+
+def get_cached_ranking(user_id, ver="jp", recent_type=False):
+    """
+    读取缓存的 RecordRanking（成绩已写入或歌曲目录变化时返回 None）
+
+    Args:
+        user_id: 用户ID
+        ver: 服务器版本
+        recent_type: 是否为 b40 计算方案下的 Rating
+    """
+    key = (user_id, recent_type)
+    with _memory_lock:
+        entry = _ranking_cache.get(key)
+        if entry is None:
+            return None
+        generation, cached_ver, catalog_mtime, ranking = entry
+        if (
+            generation != _generations.get(user_id, 0) or
+            cached_ver != ver or
+            catalog_mtime != get_song_catalog(ver).mtime
+        ):
+            del _ranking_cache[key]
+            return None
+        _ranking_cache.move_to_end(key)
+    return ranking
+
+
+def cache_ranking(user_id, records, ver="jp", generation=None, recent_type=False):
+    """
+    由 read_record 的结果生成并缓存 RecordRanking
+
+    Args:
+        generation: 读取 records 之前的 summary_generation；已变化时只返回不缓存
+
+    Returns:
+        RecordRanking: 调用方只读，不修改其中的成绩
+    """
+    ranking = RecordRanking(records)
+    entry = (generation, ver, get_song_catalog(ver).mtime, ranking)
+    with _memory_lock:
+        if generation is not None and generation == _generations.get(user_id, 0):
+            _ranking_cache[(user_id, recent_type)] = entry
+            _ranking_cache.move_to_end((user_id, recent_type))
+            while len(_ranking_cache) > MEMORY_CACHE_SIZE:
+                _ranking_cache.popitem(last=False)
+    return ranking
+
+
+def select_ranking_records(ranking, type):
+    """从 RecordRanking 中取出表格（返回副本）"""
+    old_songs, new_songs = ranking.select(type)
+    return _copy_records(old_songs), _copy_records(new_songs)
+
+
+def _delete_summary_row(user_id):
+    conn = get_connection()
+    try:
+        with conn.cursor() as cursor:
+            cursor.execute("DELETE FROM user_summary WHERE user_id = %s", (user_id,))
+        conn.commit()
+    finally:
+        conn.close()
+
+
+def _is_current(summary, ver):
+    return (
+        summary.get("summary_version") == SUMMARY_VERSION and
+        summary.get("ver") == ver and
+        summary.get("catalog_mtime") == get_song_catalog(ver).mtime
+    )
+
+
+def save_user_summary(user_id, summary, generation=None):
+    """
+    写入摘要（覆盖旧摘要）
+
+    Args:
+        user_id: 用户ID
+        summary: 摘要
+        generation: 生成摘要前的失效代数；写入后代数已变化时删除刚写入的摘要
+
+    Returns:
+        bool: 摘要是否仍然有效
+    """
+    conn = get_connection()
+
+    try:
+        with conn.cursor() as cursor:
+            cursor.execute(
+                "REPLACE INTO user_summary (user_id, summary) VALUES (%s, %s)",
+                (user_id, json.dumps(summary, ensure_ascii=False))
+            )
+        conn.commit()
+    finally:
+        conn.close()
+
+    if _cache_put(user_id, summary, generation):
+        return True
+
+    # 生成期间有成绩写入：写入的摘要可能覆盖了失效操作，删除后由下次读取重新生成
+    _delete_summary_row(user_id)
+    logger.info(f"[Summary] → Discarded stale summary: user_id={user_id}")
+    return False
+
+
+def refresh_user_summary(user_id, records, ver="jp", generation=None, ranking=None):
+    """
+    重新生成并保存摘要
+
+    Args:
+        user_id: 用户ID
+        records: read_record 返回的 Best 成绩
+        ver: 服务器版本
+        generation: 读取 records 之前的 summary_generation，用于丢弃基于旧成绩的摘要
+        ranking: 可选，records 的 RecordRanking
+
+    Returns:
+        dict: 新摘要（基于 records，可用于本次请求），保存失败时返回 None
+    """
+    try:
+        summary = build_user_summary(records, ver, ranking)
+        if not save_user_summary(user_id, summary, generation):
+            return summary
+        logger.info(f"[Summary] ✓ Refreshed: user_id={user_id}, records={summary['record_count']}, rating={summary['rating']}")
+        return summary
+    except Exception as e:
+        logger.error(f"[Summary] ✗ Refresh failed: user_id={user_id}, error={e}")
+        return None
+
+
+def get_user_summary(user_id, ver="jp"):
+    """
+    读取摘要
+
+    先查内存缓存，再查 user_summary 表；不存在或已过期时返回 None
+
+    Args:
+        user_id: 用户ID
+        ver: 服务器版本
+
+    Returns:
+        dict or None
+    """
+    with _memory_lock:
+        summary = _memory_cache.get(user_id)
+        if summary is not None:
+            _memory_cache.move_to_end(user_id)
+
+    if summary is None:
+        generation = summary_generation(user_id)
+        try:
+            conn = get_connection()
+            try:
+                with conn.cursor() as cursor:
+                    cursor.execute("SELECT summary FROM user_summary WHERE user_id = %s", (user_id,))
+                    row = cursor.fetchone()
+            finally:
+                conn.close()
+        except Exception as e:
+            logger.error(f"[Summary] ✗ Load failed: user_id={user_id}, error={e}")
+            return None
+
+        if not row:
+            return None
+
+        summary = json.loads(row[0])
+        _cache_put(user_id, summary, generation)
+
+    if not _is_current(summary, ver):
+        return None
+
+    return summary
+
+
+def invalidate_user_summary(user_id, cursor=None):
+    """
+    使摘要失效
+
+    Args:
+        user_id: 用户ID
+        cursor: 可选，在调用方的事务中删除摘要；此时调用方提交后必须再调用 release_user_summary
+    """
+    # 写入前递增代数：此后开始生成的摘要读到的仍是旧成绩，提交后的第二次递增会使其失效
+    _bump_generation(user_id)
+
+    try:
+        if cursor is not None:
+            cursor.execute("DELETE FROM user_summary WHERE user_id = %s", (user_id,))
+            return
+
+        _delete_summary_row(user_id)
+    except Exception as e:
+        # 摘要失效失败不影响成绩写入，内存缓存已清除
+        logger.warning(f"[Summary] ⚠ Invalidate failed: user_id={user_id}, error={e}")
+
+    _bump_generation(user_id)
+
+
+def release_user_summary(user_id):
+    """
+    调用方事务提交后完成失效（与 invalidate_user_summary(user_id, cursor) 配合使用）
+
+    提交前生成的摘要基于旧成绩，递增代数后不会再写入缓存
+    """
+    _bump_generation(user_id)
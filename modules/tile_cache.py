@@ -0,0 +1,223 @@
+"""
+成绩缩略图缓存模块
+
+create_thumbnail 的结果只取决于成绩中参与绘制的字段和缩略图尺寸，
+按这些内容的哈希缓存绘制完成的缩略图：重复出图、以及不同用户的相同成绩都直接复用。
+
+缩略图先缓存在内存中（按字节限制的 LRU）；配置了 tile_disk_dir 时，
+从内存淘汰的缩略图交给后台线程以 PNG 压缩写入磁盘（不占用出图的请求线程），
+内存未命中时再从等待写入的缩略图或磁盘读回
+"""
+
+import hashlib
+import json
+import logging
+import os
+import queue
+import threading
+
+from PIL import Image
+
+from modules.config_loader import TILE_CACHE_MAX_BYTES, TILE_DISK_DIR, TILE_DISK_MAX_BYTES
+from modules.image_cache import ImageLRUCache
+
+logger = logging.getLogger(__name__)
+
+# 缩略图样式版本，修改 create_thumbnail 的绘制内容时递增，旧缓存自动失效
+TILE_CACHE_VERSION = 1
+
+# 参与绘制的成绩字段
+TILE_FIELDS = (
+    "name", "difficulty", "type", "score", "dx_score", "dx_ratio",
+    "score_icon", "combo_icon", "sync_icon", "version",
+    "internalLevelValue", "ra", "cover_name"
+)
+
+# 写入磁盘时的 PNG 压缩等级（偏向速度）
+TILE_PNG_COMPRESS_LEVEL = 3
+
+# 等待写入磁盘的缩略图上限，写入跟不上时丢弃新淘汰的缩略图（之后未命中时重新绘制）
+TILE_SPILL_QUEUE_SIZE = 64
+
+_disk_stats = {"disk_hits": 0, "disk_writes": 0, "spill_dropped": 0}
+
+# 已从内存淘汰、等待写入磁盘的缩略图 key -> image
+_spill_pending = {}
+_spill_lock = threading.Lock()
+_spill_queue = queue.Queue(maxsize=TILE_SPILL_QUEUE_SIZE)
+_spill_thread = None
+
+
+def tile_key(song, thumb_size, padding):
+    """
+    缩略图内容哈希
+
+    Args:
+        song: 成绩数据
+        thumb_size: 缩略图尺寸
+        padding: 内边距
+
+    Returns:
+        str: 32 位十六进制摘要
+    """
+    content = [TILE_CACHE_VERSION, list(thumb_size), padding] + [song.get(field) for field in TILE_FIELDS]
+    payload = json.dumps(content, ensure_ascii=False, separators=(",", ":"), default=str)
+    return hashlib.blake2b(payload.encode(), digest_size=16).hexdigest()
+
+
+def _disk_path(key):
+    return os.path.join(TILE_DISK_DIR, key[:2], f"{key}.png")
+
+
+def _spill_to_disk(key, image):
+    """写入磁盘（后台线程中执行）"""
+    path = _disk_path(key)
+    if os.path.exists(path):
+        return
+
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    temp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    try:
+        image.save(temp_path, format="PNG", compress_level=TILE_PNG_COMPRESS_LEVEL)
+        os.replace(temp_path, path)
+    except Exception:
+        try:
+            os.remove(temp_path)
+        except OSError:
+            pass
+        raise
+    _disk_stats["disk_writes"] += 1
+
+
+def _spill_worker():
+    while True:
+        key = _spill_queue.get()
+        with _spill_lock:
+            image = _spill_pending.get(key)
+        try:
+            _spill_to_disk(key, image)
+        except Exception as e:
+            logger.warning(f"[TileCache] ⚠ Failed to write tile: key={key}, error={e}")
+        finally:
+            with _spill_lock:
+                _spill_pending.pop(key, None)
+
+
+def _queue_spill(key, image):
+    """内存淘汰时调用：放入写入队列，由后台线程写入磁盘"""
+    global _spill_thread
+    with _spill_lock:
+        if key in _spill_pending:
+            return
+        try:
+            _spill_queue.put_nowait(key)
+        except queue.Full:
+            _disk_stats["spill_dropped"] += 1
+            return
+        _spill_pending[key] = image
+
+        # 首次淘汰时才启动线程（出图进程池 fork 之后）
+        if _spill_thread is None:
+            _spill_thread = threading.Thread(target=_spill_worker, daemon=True, name="TileSpillWriter")
+            _spill_thread.start()
+
+
+def _load_from_disk(key):
+    path = _disk_path(key)
+    if not os.path.exists(path):
+        return None
+
+    try:
+        with Image.open(path) as tile:
+            image = tile.convert("RGB")
+        # 更新修改时间，磁盘清理时按最近使用保留
+        os.utime(path)
+    except Exception as e:
+        logger.warning(f"[TileCache] ⚠ Failed to read tile, removing: path={path}, error={e}")
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+        return None
+
+    _disk_stats["disk_hits"] += 1
+    return image
+
+
+tile_cache = ImageLRUCache(TILE_CACHE_MAX_BYTES, on_evict=_queue_spill if TILE_DISK_DIR else None)
+
+
+def get_tile(key):
+    """
+    读取缓存的缩略图（内存优先，其次等待写入的缩略图，最后磁盘）
+
+    Returns:
+        PIL.Image 或 None（共享图像，只读）
+    """
+    image = tile_cache.get(key)
+    if image is not None or not TILE_DISK_DIR:
+        return image
+
+    with _spill_lock:
+        image = _spill_pending.get(key)
+    if image is None:
+        image = _load_from_disk(key)
+    if image is None:
+        return None
+    return tile_cache.put(key, image)
+
+
+def put_tile(key, image):
+    """
+    缓存绘制完成的缩略图
+
+    Returns:
+        PIL.Image: 缓存中的图像（已有相同内容时返回已缓存的图像）
+    """
+    return tile_cache.put(key, image)
+
+
+def cleanup_tile_disk():
+    """
+    磁盘缓存超过 TILE_DISK_MAX_BYTES 时删除最久未使用的缩略图
+
+    Returns:
+        int: 删除的文件数
+    """
+    if not TILE_DISK_DIR or not os.path.isdir(TILE_DISK_DIR):
+        return 0
+
+    files = []
+    total = 0
+    for root, _, names in os.walk(TILE_DISK_DIR):
+        for name in names:
+            path = os.path.join(root, name)
+            try:
+                stat = os.stat(path)
+            except OSError:
+                continue
+            files.append((stat.st_mtime, stat.st_size, path))
+            total += stat.st_size
+
+    removed = 0
+    files.sort()
+    for _, size, path in files:
+        if total <= TILE_DISK_MAX_BYTES:
+            break
+        try:
+            os.remove(path)
+        except OSError:
+            continue
+        total -= size
+        removed += 1
+
+    if removed:
+        logger.info(f"[TileCache] ✓ Disk cleanup: removed={removed}, remaining_bytes={total}")
+    return removed
+
+
+def get_tile_cache_stats():
+    """缩略图缓存统计（内存 LRU 统计 + 磁盘读写次数 + 等待写入数）"""
+    with _spill_lock:
+        pending = len(_spill_pending)
+    return dict(tile_cache.get_stats(), spill_pending=pending, **_disk_stats)
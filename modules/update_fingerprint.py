@@ -0,0 +1,79 @@
+"""
+更新指纹模块
+
+maimai_update 在每次成功更新后保存各页面解析结果的指纹（按难度分页的 Best 成绩、最近游玩记录）
+以及游玩签名（游玩次数 + 最近游玩记录）。下次更新时：
+  - 游玩签名未变化：用户没有新的游玩，跳过 5 个难度成绩页面的请求
+  - 页面指纹未变化：跳过对应的数据库写入
+"""
+
+import hashlib
+import json
+
+# 指纹格式版本，解析结果结构变化时递增，旧指纹自动失效
+FINGERPRINT_VERSION = 1
+
+
+def fingerprint(data):
+    """
+    计算解析结果的指纹
+
+    Args:
+        data: 可 JSON 序列化的数据（成绩列表等）
+
+    Returns:
+        str: 32 位十六进制摘要
+    """
+    payload = json.dumps(data, ensure_ascii=False, sort_keys=True, separators=(",", ":"))
+    return hashlib.blake2b(payload.encode(), digest_size=16).hexdigest()
+
+
+def page_fingerprints(records):
+    """
+    按难度（即成绩页面）计算 Best 成绩的指纹
+
+    Returns:
+        dict: 难度 -> 指纹
+    """
+    pages = {}
+    for record in records:
+        pages.setdefault(record['difficulty'], []).append(record)
+    return {difficulty: fingerprint(page) for difficulty, page in pages.items()}
+
+
+def play_signature(user_info, recent_records):
+    """
+    游玩签名：游玩次数与最近游玩记录的组合指纹
+
+    Returns:
+        str or None: 信息不完整时返回 None（不能用于跳过请求）
+    """
+    if not isinstance(user_info, dict) or not user_info:
+        return None
+    if not isinstance(recent_records, list) or not recent_records:
+        return None
+    return fingerprint([user_info.get("play_count", "N/A"), recent_records])
+
+
+def load_fingerprints(user_data, ver):
+    """
+    读取上次成功更新保存的指纹
+
+    Returns:
+        dict: 指纹，版本或服务器不一致时返回空字典
+    """
+    stored = user_data.get("update_fingerprints") or {}
+    if stored.get("version") != FINGERPRINT_VERSION or stored.get("ver") != ver:
+        return {}
+    return stored
+
+
+def build_fingerprints(ver, play, recent, records):
+    """组装要保存的指纹"""
+    return {
+        "version": FINGERPRINT_VERSION,
+        "ver": ver,
+        "play": play,
+        "recent": recent,
+        "records": records,
+    }
@@ -4,21 +4,72 @@ CREATE DATABASE IF NOT EXISTS maimai_records
 
 USE maimai_records;
 
+-- 枚举列编码见 modules/record_columns.py (DIFFICULTIES / CHART_TYPES / *_ICONS)
 CREATE TABLE IF NOT EXISTS best_records (
     id INT PRIMARY KEY AUTO_INCREMENT,
     user_id VARCHAR(64),
 
+    `name` VARCHAR(255) COLLATE utf8mb4_bin,
+    difficulty TINYINT UNSIGNED NOT NULL DEFAULT 0,
+    type TINYINT UNSIGNED NOT NULL DEFAULT 0,
+    achievement DECIMAL(7,4) NOT NULL DEFAULT 0,
+    `dx_score` SMALLINT UNSIGNED NULL,
+    `dx_max` SMALLINT UNSIGNED NULL,
+
+    `score_icon` TINYINT UNSIGNED NOT NULL DEFAULT 0,
+    `combo_icon` TINYINT UNSIGNED NOT NULL DEFAULT 0,
+    `sync_icon` TINYINT UNSIGNED NOT NULL DEFAULT 0,
+
+    -- 增量写入按谱面比较，每个用户每张谱面只保留一行
+    UNIQUE KEY uk_user_chart (user_id, `name`, difficulty, type)
+);
+
+-- 游玩历史中同一谱面可出现多次，不设唯一键
+CREATE TABLE IF NOT EXISTS recent_records (
+    id INT PRIMARY KEY AUTO_INCREMENT,
+    user_id VARCHAR(64),
+
     `name` VARCHAR(255),
-    difficulty VARCHAR(20),
-    type VARCHAR(10),
-    score VARCHAR(20),
-    `dx_score` VARCHAR(20),
+    difficulty TINYINT UNSIGNED NOT NULL DEFAULT 0,
+    type TINYINT UNSIGNED NOT NULL DEFAULT 0,
+    achievement DECIMAL(7,4) NOT NULL DEFAULT 0,
+    `dx_score` SMALLINT UNSIGNED NULL,
+    `dx_max` SMALLINT UNSIGNED NULL,
 
-    `score_icon` VARCHAR(10),
-    `combo_icon` VARCHAR(10),
-    `sync_icon` VARCHAR(10),
+    `score_icon` TINYINT UNSIGNED NOT NULL DEFAULT 0,
+    `combo_icon` TINYINT UNSIGNED NOT NULL DEFAULT 0,
+    `sync_icon` TINYINT UNSIGNED NOT NULL DEFAULT 0,
 
     INDEX(user_id)
 );
 
-CREATE TABLE IF NOT EXISTS recent_records LIKE best_records;
+-- 每个用户的成绩摘要 (modules/summary_manager.py)，Best 成绩写入时删除
+CREATE TABLE IF NOT EXISTS user_summary (
+    user_id VARCHAR(64) PRIMARY KEY,
+    summary MEDIUMTEXT NOT NULL,
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP
+);
+
+-- Best 成绩的追加式历史，只记录新增或提升的谱面 (record_manager.write_record)
+-- baseline = 1 为用户首次写入时的基准快照，prev_achievement 为提升前的达成率（新谱面为 NULL）
+CREATE TABLE IF NOT EXISTS score_history (
+    id BIGINT PRIMARY KEY AUTO_INCREMENT,
+    user_id VARCHAR(64) NOT NULL,
+    ts DATETIME NOT NULL,
+    baseline TINYINT UNSIGNED NOT NULL DEFAULT 0,
+
+    `name` VARCHAR(255) COLLATE utf8mb4_bin NOT NULL,
+    difficulty TINYINT UNSIGNED NOT NULL DEFAULT 0,
+    type TINYINT UNSIGNED NOT NULL DEFAULT 0,
+    achievement DECIMAL(7,4) NOT NULL DEFAULT 0,
+    prev_achievement DECIMAL(7,4) NULL,
+    `dx_score` SMALLINT UNSIGNED NULL,
+    `dx_max` SMALLINT UNSIGNED NULL,
+
+    `score_icon` TINYINT UNSIGNED NOT NULL DEFAULT 0,
+    `combo_icon` TINYINT UNSIGNED NOT NULL DEFAULT 0,
+    `sync_icon` TINYINT UNSIGNED NOT NULL DEFAULT 0,
+
+    INDEX idx_user_ts (user_id, ts),
+    INDEX idx_user_chart (user_id, `name`(64), difficulty, type)
+);
@@ -0,0 +1,136 @@
+-- 将旧版字符串列的成绩表迁移为类型化列 (records_db.sql)
+-- 用法: mysql -u jietng -p maimai_records < records_db_migrate_typed.sql
+-- 编码顺序必须与 modules/record_columns.py 中的编码表一致
+-- 迁移前先检查编码表中没有的值：有任何无法识别的值时列出这些值并中止（不修改任何表），
+-- 需要先在 record_columns.py 与本文件的编码表末尾追加新值
+
+USE maimai_records;
+
+-- 列出无法识别的值（表, 列, 值, 行数）
+SELECT 'best_records' AS tbl, 'difficulty' AS col, difficulty AS value, COUNT(*) AS row_count
+FROM best_records WHERE FIELD(difficulty, 'unknown', 'basic', 'advanced', 'expert', 'master', 'remaster', 'utage') = 0 GROUP BY difficulty
+UNION ALL
+SELECT 'best_records', 'type', type, COUNT(*)
+FROM best_records WHERE FIELD(type, 'N/A', 'std', 'dx', 'utage') = 0 GROUP BY type
+UNION ALL
+SELECT 'best_records', 'score_icon', score_icon, COUNT(*)
+FROM best_records WHERE FIELD(score_icon, '', 'd', 'c', 'b', 'bb', 'bbb', 'a', 'aa', 'aaa',
+                              's', 'sp', 'ss', 'ssp', 'sss', 'sssp', '?') = 0 GROUP BY score_icon
+UNION ALL
+SELECT 'best_records', 'combo_icon', combo_icon, COUNT(*)
+FROM best_records WHERE FIELD(combo_icon, '', 'back', 'fc', 'fcp', 'ap', 'app', 'none') = 0 GROUP BY combo_icon
+UNION ALL
+SELECT 'best_records', 'sync_icon', sync_icon, COUNT(*)
+FROM best_records WHERE FIELD(sync_icon, '', 'back', 'sync', 'fs', 'fsp', 'fdx', 'fdxp', 'none') = 0 GROUP BY sync_icon
+UNION ALL
+SELECT 'recent_records', 'difficulty', difficulty, COUNT(*)
+FROM recent_records WHERE FIELD(difficulty, 'unknown', 'basic', 'advanced', 'expert', 'master', 'remaster', 'utage') = 0 GROUP BY difficulty
+UNION ALL
+SELECT 'recent_records', 'type', type, COUNT(*)
+FROM recent_records WHERE FIELD(type, 'N/A', 'std', 'dx', 'utage') = 0 GROUP BY type
+UNION ALL
+SELECT 'recent_records', 'score_icon', score_icon, COUNT(*)
+FROM recent_records WHERE FIELD(score_icon, '', 'd', 'c', 'b', 'bb', 'bbb', 'a', 'aa', 'aaa',
+                                's', 'sp', 'ss', 'ssp', 'sss', 'sssp', '?') = 0 GROUP BY score_icon
+UNION ALL
+SELECT 'recent_records', 'combo_icon', combo_icon, COUNT(*)
+FROM recent_records WHERE FIELD(combo_icon, '', 'back', 'fc', 'fcp', 'ap', 'app', 'none') = 0 GROUP BY combo_icon
+UNION ALL
+SELECT 'recent_records', 'sync_icon', sync_icon, COUNT(*)
+FROM recent_records WHERE FIELD(sync_icon, '', 'back', 'sync', 'fs', 'fsp', 'fdx', 'fdxp', 'none') = 0 GROUP BY sync_icon;
+
+-- 有无法识别的值时中止（mysql 客户端遇到错误即停止执行后续语句）
+DROP PROCEDURE IF EXISTS check_typed_migration;
+
+DELIMITER //
+CREATE PROCEDURE check_typed_migration()
+BEGIN
+    IF EXISTS (
+        SELECT 1 FROM best_records
+        WHERE FIELD(difficulty, 'unknown', 'basic', 'advanced', 'expert', 'master', 'remaster', 'utage') = 0
+           OR FIELD(type, 'N/A', 'std', 'dx', 'utage') = 0
+           OR FIELD(score_icon, '', 'd', 'c', 'b', 'bb', 'bbb', 'a', 'aa', 'aaa',
+                    's', 'sp', 'ss', 'ssp', 'sss', 'sssp', '?') = 0
+           OR FIELD(combo_icon, '', 'back', 'fc', 'fcp', 'ap', 'app', 'none') = 0
+           OR FIELD(sync_icon, '', 'back', 'sync', 'fs', 'fsp', 'fdx', 'fdxp', 'none') = 0
+    ) OR EXISTS (
+        SELECT 1 FROM recent_records
+        WHERE FIELD(difficulty, 'unknown', 'basic', 'advanced', 'expert', 'master', 'remaster', 'utage') = 0
+           OR FIELD(type, 'N/A', 'std', 'dx', 'utage') = 0
+           OR FIELD(score_icon, '', 'd', 'c', 'b', 'bb', 'bbb', 'a', 'aa', 'aaa',
+                    's', 'sp', 'ss', 'ssp', 'sss', 'sssp', '?') = 0
+           OR FIELD(combo_icon, '', 'back', 'fc', 'fcp', 'ap', 'app', 'none') = 0
+           OR FIELD(sync_icon, '', 'back', 'sync', 'fs', 'fsp', 'fdx', 'fdxp', 'none') = 0
+    ) THEN
+        SIGNAL SQLSTATE '45000'
+            SET MESSAGE_TEXT = 'Unknown enum values found (listed above), migration aborted';
+    END IF;
+END //
+DELIMITER ;
+
+CALL check_typed_migration();
+DROP PROCEDURE check_typed_migration;
+
+RENAME TABLE best_records TO best_records_old, recent_records TO recent_records_old;
+
+CREATE TABLE best_records (
+    id INT PRIMARY KEY AUTO_INCREMENT,
+    user_id VARCHAR(64),
+
+    `name` VARCHAR(255),
+    difficulty TINYINT UNSIGNED NOT NULL DEFAULT 0,
+    type TINYINT UNSIGNED NOT NULL DEFAULT 0,
+    achievement DECIMAL(7,4) NOT NULL DEFAULT 0,
+    `dx_score` SMALLINT UNSIGNED NULL,
+    `dx_max` SMALLINT UNSIGNED NULL,
+
+    `score_icon` TINYINT UNSIGNED NOT NULL DEFAULT 0,
+    `combo_icon` TINYINT UNSIGNED NOT NULL DEFAULT 0,
+    `sync_icon` TINYINT UNSIGNED NOT NULL DEFAULT 0,
+
+    INDEX(user_id)
+);
+
+CREATE TABLE recent_records LIKE best_records;
+
+-- 两张表使用相同的转换规则（此时所有值都已确认在编码表中）
+INSERT INTO best_records (
+    id, user_id, `name`, difficulty, type, achievement, dx_score, dx_max,
+    score_icon, combo_icon, sync_icon
+)
+SELECT
+    id, user_id, `name`,
+    FIELD(difficulty, 'unknown', 'basic', 'advanced', 'expert', 'master', 'remaster', 'utage') - 1,
+    FIELD(type, 'N/A', 'std', 'dx', 'utage') - 1,
+    IF(score REGEXP '^[0-9]+(\\.[0-9]+)?%$', CAST(REPLACE(score, '%', '') AS DECIMAL(7,4)), 0),
+    IF(dx_score REGEXP '^[0-9,]+ */ *[0-9,]+$',
+       CAST(REPLACE(TRIM(SUBSTRING_INDEX(dx_score, '/', 1)), ',', '') AS UNSIGNED), NULL),
+    IF(dx_score REGEXP '^[0-9,]+ */ *[0-9,]+$',
+       NULLIF(CAST(REPLACE(TRIM(SUBSTRING_INDEX(dx_score, '/', -1)), ',', '') AS UNSIGNED), 0), NULL),
+    FIELD(score_icon, '', 'd', 'c', 'b', 'bb', 'bbb', 'a', 'aa', 'aaa',
+          's', 'sp', 'ss', 'ssp', 'sss', 'sssp', '?') - 1,
+    FIELD(combo_icon, '', 'back', 'fc', 'fcp', 'ap', 'app', 'none') - 1,
+    FIELD(sync_icon, '', 'back', 'sync', 'fs', 'fsp', 'fdx', 'fdxp', 'none') - 1
+FROM best_records_old;
+
+INSERT INTO recent_records (
+    id, user_id, `name`, difficulty, type, achievement, dx_score, dx_max,
+    score_icon, combo_icon, sync_icon
+)
+SELECT
+    id, user_id, `name`,
+    FIELD(difficulty, 'unknown', 'basic', 'advanced', 'expert', 'master', 'remaster', 'utage') - 1,
+    FIELD(type, 'N/A', 'std', 'dx', 'utage') - 1,
+    IF(score REGEXP '^[0-9]+(\\.[0-9]+)?%$', CAST(REPLACE(score, '%', '') AS DECIMAL(7,4)), 0),
+    IF(dx_score REGEXP '^[0-9,]+ */ *[0-9,]+$',
+       CAST(REPLACE(TRIM(SUBSTRING_INDEX(dx_score, '/', 1)), ',', '') AS UNSIGNED), NULL),
+    IF(dx_score REGEXP '^[0-9,]+ */ *[0-9,]+$',
+       NULLIF(CAST(REPLACE(TRIM(SUBSTRING_INDEX(dx_score, '/', -1)), ',', '') AS UNSIGNED), 0), NULL),
+    FIELD(score_icon, '', 'd', 'c', 'b', 'bb', 'bbb', 'a', 'aa', 'aaa',
+          's', 'sp', 'ss', 'ssp', 'sss', 'sssp', '?') - 1,
+    FIELD(combo_icon, '', 'back', 'fc', 'fcp', 'ap', 'app', 'none') - 1,
+    FIELD(sync_icon, '', 'back', 'sync', 'fs', 'fsp', 'fdx', 'fdxp', 'none') - 1
+FROM recent_records_old;
+
+-- 确认数据无误后手动删除旧表
+-- DROP TABLE best_records_old, recent_records_old;
@@ -0,0 +1,21 @@
+-- 为 best_records 添加 (user_id, name, difficulty, type) 唯一键，供增量写入使用
+-- 用法: mysql -u jietng -p maimai_records < records_db_migrate_unique_key.sql
+-- 需先完成 records_db_migrate_typed.sql
+
+USE maimai_records;
+
+-- 曲名按二进制比较，避免大小写 / 全半角不同的曲名被视为同一谱面
+ALTER TABLE best_records MODIFY `name` VARCHAR(255) COLLATE utf8mb4_bin;
+
+-- 同一谱面存在多行时只保留达成率最高的一行（相同时保留 id 较小的一行）
+DELETE b1 FROM best_records b1
+JOIN best_records b2
+  ON b1.user_id = b2.user_id
+ AND b1.`name` = b2.`name`
+ AND b1.difficulty = b2.difficulty
+ AND b1.type = b2.type
+ AND (b1.achievement < b2.achievement OR (b1.achievement = b2.achievement AND b1.id > b2.id));
+
+ALTER TABLE best_records
+    ADD UNIQUE KEY uk_user_chart (user_id, `name`, difficulty, type),
+    DROP INDEX user_id;
@@ -0,0 +1,243 @@
+"""
+Rating 计算的一致性测试
+
+与改为阈值表之前的 if/elif 实现（原样冻结在本文件中）逐值比较：
+单曲计算 get_single_ra / get_single_ra_recent 与批量计算 calc_ra_array 都必须与旧实现逐位一致，
+get_rc 使用的 get_ra_boundaries 必须与旧版 get_rc 的 0.0001 步长扫描结果一致
+"""
+
+import numpy as np
+import pytest
+
+from modules.rating_engine import (
+    RA_THRESHOLDS,
+    RA_THRESHOLDS_RECENT,
+    calc_ra_array,
+    get_ra_boundaries,
+    get_single_ra,
+    get_single_ra_recent,
+)
+
+SEED = 20240601
+SAMPLES = 20000
+
+
+# ==================== 旧实现（冻结） ====================
+
+def legacy_get_single_ra(level: float, score: float, ap_clear: bool = False, recent_type: bool = False) -> int:
+    """
+    计算单曲Rating值
+
+    根据谱面定数和达成率计算Rating值,日服AP有额外加成
+
+    Args:
+        level: 谱面定数 (如 14.5)
+        score: 达成率 (如 100.5000)
+        ap_clear: 是否为 AP/APP
+        recent_type: 是否为 b40 计算方案
+
+    Returns:
+        计算得到的Rating整数值
+    """
+    if recent_type:
+        return legacy_get_single_ra_recent(level, score)
+
+    # Rating系数映射表
+    if score >= 100.5000:
+        ra_kake = 0.224
+    elif score >= 100.4999:
+        ra_kake = 0.222
+    elif score >= 100.0000:
+        ra_kake = 0.216
+    elif score >= 99.9999:
+        ra_kake = 0.214
+    elif score >= 99.5000:
+        ra_kake = 0.211
+    elif score >= 99.0000:
+        ra_kake = 0.208
+    elif score >= 98.9999:
+        ra_kake = 0.206
+    elif score >= 98.0000:
+        ra_kake = 0.203
+    elif score >= 97.0000:
+        ra_kake = 0.200
+    elif score >= 96.9999:
+        ra_kake = 0.176
+    elif score >= 94.0000:
+        ra_kake = 0.168
+    elif score >= 90.0000:
+        ra_kake = 0.152
+    elif score >= 80.0000:
+        ra_kake = 0.136
+    elif score >= 79.9999:
+        ra_kake = 0.128
+    elif score >= 75.0000:
+        ra_kake = 0.120
+    elif score >= 70.0000:
+        ra_kake = 0.112
+    elif score >= 60.0000:
+        ra_kake = 0.096
+    elif score >= 50.0000:
+        ra_kake = 0.080
+    elif score >= 40.0000:
+        ra_kake = 0.064
+    elif score >= 30.0000:
+        ra_kake = 0.048
+    elif score >= 20.0000:
+        ra_kake = 0.032
+    elif score >= 10.0000:
+        ra_kake = 0.016
+    else:
+        ra_kake = 0
+
+    # 计算基础Rating
+    if score <= 100.5:
+        ra = int(level * score * ra_kake)
+    else:
+        ra = int(level * 100.5 * ra_kake)
+
+    # AP加成
+    if ap_clear:
+        ra += 1
+
+    return ra
+
+
+def legacy_get_single_ra_recent(level: float, score: float) -> int:
+    """
+    计算旧版本单曲Rating值
+
+    根据谱面定数和达成率计算Rating值
+
+    Args:
+        level: 谱面定数 (如 14.5)
+        score: 达成率 (如 100.5000)
+
+    Returns:
+        计算得到的Rating整数值
+    """
+    # Rating系数映射表
+    if score >= 100.5000:
+        ra_kake = 0.14
+    elif score >= 100.0000:
+        ra_kake = 0.135
+    elif score >= 99.5000:
+        ra_kake = 0.132
+    elif score >= 99.0000:
+        ra_kake = 0.13
+    elif score >= 98.0000:
+        ra_kake = 0.127
+    elif score >= 97.0000:
+        ra_kake = 0.125
+    elif score >= 94.0000:
+        ra_kake = 0.105
+    elif score >= 90.0000:
+        ra_kake = 0.095
+    elif score >= 80.0000:
+        ra_kake = 0.085
+    elif score >= 75.0000:
+        ra_kake = 0.075
+    elif score >= 70.0000:
+        ra_kake = 0.07
+    elif score >= 60.0000:
+        ra_kake = 0.06
+    elif score >= 50.0000:
+        ra_kake = 0.05
+    elif score >= 40.0000:
+        ra_kake = 0.04
+    elif score >= 30.0000:
+        ra_kake = 0.03
+    elif score >= 20.0000:
+        ra_kake = 0.02
+    elif score >= 10.0000:
+        ra_kake = 0.01
+    else:
+        ra_kake = 0
+
+    # 计算基础Rating
+    if score <= 100.5:
+        ra = int(level * score * ra_kake)
+    else:
+        ra = int(level * 100.5 * ra_kake)
+
+    return ra
+
+
+# ==================== 测试 ====================
+
+def _samples():
+    """固定种子的随机样本，外加所有系数阈值、阈值前一个 0.0001 以及超过上限的达成率"""
+    rng = np.random.default_rng(SEED)
+    boundaries = np.array(sorted(set(RA_THRESHOLDS) | set(RA_THRESHOLDS_RECENT)))
+    scores = np.concatenate([
+        np.round(rng.uniform(0, 101, SAMPLES), 4),
+        np.round(rng.uniform(97, 100.5, SAMPLES), 4),
+        boundaries,
+        np.round(boundaries - 0.0001, 4),
+        [0.0, 100.5001, 101.0],
+    ])
+    levels = np.round(rng.uniform(1.0, 15.0, scores.size), 1)
+    ap_clears = rng.random(scores.size) < 0.5
+    return levels, scores, ap_clears
+
+
+@pytest.mark.parametrize("recent_type", [False, True])
+def test_single_matches_legacy(recent_type):
+    levels, scores, ap_clears = _samples()
+    for level, score, ap_clear in zip(levels.tolist(), scores.tolist(), ap_clears.tolist()):
+        expected = legacy_get_single_ra(level, score, ap_clear, recent_type)
+        assert get_single_ra(level, score, ap_clear, recent_type) == expected, (level, score, ap_clear)
+
+
+def test_single_recent_matches_legacy():
+    levels, scores, _ = _samples()
+    for level, score in zip(levels.tolist(), scores.tolist()):
+        assert get_single_ra_recent(level, score) == legacy_get_single_ra_recent(level, score), (level, score)
+
+
+@pytest.mark.parametrize("recent_type", [False, True])
+def test_array_matches_legacy(recent_type):
+    levels, scores, ap_clears = _samples()
+    ras = calc_ra_array(levels, scores, ap_clears, recent_type).tolist()
+    for level, score, ap_clear, ra in zip(levels.tolist(), scores.tolist(), ap_clears.tolist(), ras):
+        assert ra == legacy_get_single_ra(level, score, ap_clear, recent_type), (level, score, ap_clear)
+
+
+def legacy_rc_data(level, min_score=97.0, max_score=100.5):
+    """get_rc 改为 get_ra_boundaries 之前的 0.0001 步长扫描（取自旧版 get_rc）"""
+    rc_data = []
+    last_ra = 0
+
+    for score in np.arange(min_score, max_score + 0.0001, 0.0001):
+        ra = legacy_get_single_ra(level, score)
+        if ra != last_ra:
+            rc_data.append((score, ra))
+            last_ra = ra
+
+    return rc_data
+
+
+def _rounded(rc_data):
+    return [(round(float(score), 4), ra) for score, ra in rc_data]
+
+
+@pytest.mark.parametrize("level", [round(i / 10, 1) for i in range(10, 151)])
+def test_ra_boundaries_match_legacy(level):
+    """get_rc 使用的边界表：1.0～15.0 全部定数"""
+    assert _rounded(get_ra_boundaries(level)) == _rounded(legacy_rc_data(level))
+
+
+@pytest.mark.parametrize("min_score, max_score", [
+    (97.0, 97.0),
+    (96.9999, 97.0001),
+    (80.0, 97.0),
+    (98.9999, 99.0001),
+    (99.4999, 99.5),
+    (100.0, 100.0),
+    (100.4999, 100.5),
+    (0.0, 100.5),
+])
+@pytest.mark.parametrize("level", [1.0, 7.3, 12.0, 13.7, 14.5, 15.0])
+def test_ra_boundaries_edges_match_legacy(level, min_score, max_score):
+    """min_score / max_score 落在系数区间边界上或两侧时与扫描结果一致"""
+    assert _rounded(get_ra_boundaries(level, min_score, max_score)) == _rounded(legacy_rc_data(level, min_score, max_score))
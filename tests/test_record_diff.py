@@ -0,0 +1,78 @@
+"""
+Best 成绩差异写入的测试
+
+抓取结果中含无法识别的枚举值的成绩会被跳过，数据库中该谱面的原有成绩必须保留（不删除）
+"""
+
+from decimal import Decimal
+
+from modules.record_columns import records_to_db_rows
+from modules.record_manager import _diff_best_rows
+
+USER_ID = "U0000"
+
+
+def _record(name, score="100.0000%", difficulty="master", type="dx", score_icon="sss", combo_icon="fc", sync_icon="fs"):
+    return {
+        "name": name,
+        "difficulty": difficulty,
+        "type": type,
+        "score": score,
+        "dx_score": "1,000 / 1,200",
+        "score_icon": score_icon,
+        "combo_icon": combo_icon,
+        "sync_icon": sync_icon,
+    }
+
+
+def _stored(records):
+    """模拟数据库中的行：(id, name, difficulty, type, achievement, ...)"""
+    rows, skipped = records_to_db_rows(records, USER_ID)
+    assert not skipped
+    return [(row_id, *row[1:]) for row_id, row in enumerate(rows, start=1)]
+
+
+def test_unchanged_records():
+    records = [_record("A"), _record("B")]
+    incoming, skipped = records_to_db_rows(records, USER_ID)
+
+    upserts, deletes, history, changes = _diff_best_rows(_stored(records), incoming, skipped)
+
+    assert upserts == [] and deletes == [] and history == []
+    assert changes["unchanged"] == 2 and changes["skipped"] == 0
+
+
+def test_missing_record_is_deleted():
+    stored = _stored([_record("A"), _record("B")])
+    incoming, skipped = records_to_db_rows([_record("A")], USER_ID)
+
+    _, deletes, _, changes = _diff_best_rows(stored, incoming, skipped)
+
+    assert deletes == [2]
+    assert changes["deleted"] == 1
+
+
+def test_skipped_record_is_kept():
+    stored = _stored([_record("A"), _record("B"), _record("C")])
+    incoming, skipped = records_to_db_rows([
+        _record("A", score="100.5000%", score_icon="sssp"),
+        _record("B", combo_icon="new_icon"),
+        _record("C", sync_icon="new_icon"),
+    ], USER_ID)
+
+    assert skipped == {("B", 4, 2), ("C", 4, 2)}
+
+    upserts, deletes, history, changes = _diff_best_rows(stored, incoming, skipped)
+
+    assert deletes == []
+    assert [row[1] for row in upserts] == ["A"]
+    assert upserts[0][4] == Decimal("100.5000")
+    assert [(row[1], previous) for row, previous in history] == [("A", Decimal("100.0000"))]
+    assert changes == {"inserted": 0, "updated": 1, "improved": 1, "deleted": 0, "unchanged": 0, "skipped": 2}
+
+
+def test_unknown_difficulty_is_not_a_stored_key():
+    incoming, skipped = records_to_db_rows([_record("A", difficulty="new_difficulty")], USER_ID)
+
+    assert incoming == []
+    assert skipped == set()